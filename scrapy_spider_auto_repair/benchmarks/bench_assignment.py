@@ -0,0 +1,54 @@
+"""
+    Times get_new_page_compressed_subtree_path on synthetic listing
+    pages in which every row has the same button, so that the button
+    has one occurence per row on both pages, with the dense assignment
+    (the hungarian algorithm on the whole cost matrix) and with the
+    sparse assignment(on the connected component of the button only).
+    The nearest leaves of a button are the name of its item and of its
+    seller. With 97 sellers the rows form small components, and with
+    one seller they form a single component, which is matched greedily
+    once it has more than max_assignment_size cells. The dense
+    assignment is skipped where its cost matrix would take gigabytes.
+    Run from the scrapy_spider_auto_repair directory:
+        python -m benchmarks.bench_assignment
+"""
+from time import perf_counter
+from lxml.etree import HTML
+from spider_auto_repair.auto_repair_code import Page
+
+
+def get_listing_page(n_rows, n_sellers, new_layout):
+    if new_layout:
+        row = '<div><h3><b>Item %d</b></h3><div><i>Sold by %d</i><button>Add to cart</button></div></div>'
+    else:
+        row = '<tr><td><b>Item %d</b></td><td><i>Sold by %d</i></td><td><button>Add to cart</button></td></tr>'
+    rows = ''.join(row % (i, i % n_sellers) for i in range(n_rows))
+    return HTML('<html><body><p>Header</p><table>%s</table><p>Footer</p></body></html>' % rows)
+
+
+def measure(n_rows, n_sellers, assignment):
+    page = Page('spider_auto_repair/Examples/Hello_World.html', 'html')
+    old_tree = get_listing_page(n_rows, n_sellers, False)
+    new_tree = get_listing_page(n_rows, n_sellers, True)
+    subtree = old_tree[0][1][n_rows // 2][2][0]
+    page.get_new_page_compressed_subtree_path(subtree, old_tree, new_tree, assignment = assignment)
+    start = perf_counter()
+    path = page.get_new_page_compressed_subtree_path(subtree, old_tree, new_tree, assignment = assignment)
+    return perf_counter() - start, path
+
+
+def main():
+    print('%8s %8s %10s %10s %20s' % ('rows', 'sellers', 'dense(s)', 'sparse(s)', 'path'))
+    for n_sellers in [97, 1]:
+        for n_rows in [500, 2000, 5000, 20000]:
+            dense_time = None
+            if n_rows <= 5000:
+                dense_time, dense_path = measure(n_rows, n_sellers, 'dense')
+            sparse_time, sparse_path = measure(n_rows, n_sellers, 'sparse')
+            print('%8d %8d %10s %10.3f %20s' % (n_rows, n_sellers,
+                                                '-' if dense_time is None else '%.3f' % dense_time,
+                                                sparse_time, sparse_path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+    Derives the rules once from a synthetic old/new page pair and
+    streams synthetic new pages having the new layout, with other
+    items, through auto_repair_batch. It reports the throughput and
+    the peak Python memory(as traced by tracemalloc) for different
+    numbers of pages, which stays flat as pages are streamed.
+    Run from the scrapy_spider_auto_repair directory:
+        python -m benchmarks.bench_batch_repair
+"""
+from tracemalloc import start
+from tracemalloc import stop
+from tracemalloc import get_traced_memory
+from spider_auto_repair.auto_repair_code import Page
+from spider_auto_repair.auto_repair_api import auto_repair_batch
+from benchmarks.synthetic import get_items
+from benchmarks.synthetic import get_old_layout_page
+from benchmarks.synthetic import get_new_layout_page
+
+
+def get_new_pages(n_pages):
+    for i in range(n_pages):
+        yield get_new_layout_page(get_items(20, seed = i + 1)).encode('utf-8')
+
+
+def main():
+    items = get_items(20)
+    old_page = Page.from_bytes(get_old_layout_page(items).encode('utf-8'), 'html')
+    new_page = Page.from_bytes(get_new_layout_page(items).encode('utf-8'), 'html')
+    lst_extracted_old_subtrees = [old_page.tree.getroot()[1][1][0][3]]
+    print('%8s %10s %14s %10s' % ('pages', 'seconds', 'pages/second', 'peak(KB)'))
+    for n_pages in [100, 1000, 10000]:
+        stats = dict()
+        start()
+        for lst_repaired_subtrees in auto_repair_batch(old_page, [new_page],
+                                                       lst_extracted_old_subtrees,
+                                                       get_new_pages(n_pages), stats = stats):
+            pass
+        peak = get_traced_memory()[1]
+        stop()
+        print('%8d %10.3f %14.1f %10.0f' % (stats['pages'], stats['seconds'],
+                                            stats['pages_per_second'], peak / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+    Compares building the compressed trees of a synthetic old/new page
+    pair by copying them(get_compressed_tree, followed by indexing the
+    copies as get_all_occurences does) with indexing their compressed
+    views(get_compressed_tree_index), which do not copy the trees. Each
+    measurement runs in a fresh process and reports the time taken and
+    the growth of the peak resident memory of that process, which also
+    covers the memory allocated by lxml.
+    Run from the scrapy_spider_auto_repair directory:
+        python -m benchmarks.bench_compressed_view
+"""
+from multiprocessing import get_context
+from resource import getrusage
+from resource import RUSAGE_SELF
+from time import perf_counter
+from lxml.etree import HTML
+from spider_auto_repair.auto_repair_code import Page
+from benchmarks.synthetic import get_items
+from benchmarks.synthetic import get_old_layout_page
+from benchmarks.synthetic import get_new_layout_page
+
+
+def measure(method, n_items):
+    items = get_items(n_items)
+    trees = [HTML(get_old_layout_page(items)), HTML(get_new_layout_page(items))]
+    page = Page('spider_auto_repair/Examples/Hello_World.html', 'html')
+    peak = getrusage(RUSAGE_SELF).ru_maxrss
+    start = perf_counter()
+    for tree in trees:
+        if method == 'copy':
+            compressed_tree, dic = page.get_compressed_tree(tree)
+            page.get_merkle_index(compressed_tree)
+        else:
+            page.get_merkle_index(tree, compressed = True)
+    return perf_counter() - start, getrusage(RUSAGE_SELF).ru_maxrss - peak
+
+
+def main():
+    context = get_context('spawn')
+    print('%8s %8s %10s %14s' % ('items', 'method', 'seconds', 'peak(KB)'))
+    for n_items in [1000, 5000, 10000]:
+        for method in ['copy', 'view']:
+            with context.Pool(1) as pool:
+                seconds, peak = pool.apply(measure, (method, n_items))
+            print('%8d %8s %10.3f %14d' % (n_items, method, seconds, peak))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+    Times get_cost_matrix on n x n occurences of a repeated subtree,
+    each having the k = 2 nearest leaves in a synthetic page in which
+    the leaves repeat across occurences, and checks it against the cosine
+    similarity of the dense indicator vectors of the leaves. The
+    cost matrix used to be filled cell by cell, with one cosine
+    similarity of a 1 x V pair of vectors per cell, which is
+    estimated from the time of the cells of its first row.
+    Run from the scrapy_spider_auto_repair directory:
+        python -m benchmarks.bench_cost_matrix
+"""
+from random import Random
+from time import perf_counter
+from lxml.etree import Element
+from numpy import allclose
+from numpy.linalg import norm
+from spider_auto_repair.auto_repair_code import Page
+
+
+def get_data(n_occurences, rng, leaves):
+    return [(None, [(rng.choice(leaves), 2), (rng.choice(leaves), 3)]) for _ in range(n_occurences)]
+
+
+def main():
+    page = Page('spider_auto_repair/Examples/Hello_World.html', 'html')
+    rng = Random(0)
+    leaves = []
+    for i in range(300):
+        leaf = Element('p')
+        leaf.text = 'leaf %d' % i
+        leaves.append(leaf)
+    page.get_cost_matrix(get_data(1, rng, leaves), get_data(1, rng, leaves))
+    print('%8s %12s %18s %6s' % ('n', 'seconds', 'cell by cell(s)', 'equal'))
+    for n_occurences in [500, 1000, 2000]:
+        data1 = get_data(n_occurences, rng, leaves)
+        data2 = get_data(n_occurences, rng, leaves)
+        start = perf_counter()
+        cost_matrix = page.get_cost_matrix(data1, data2)
+        seconds = perf_counter() - start
+        leaf_ids = dict()
+        leaf_matrix1 = page.get_leaf_matrix(data1, leaf_ids)
+        leaf_matrix2 = page.get_leaf_matrix(data2, leaf_ids)
+        leaf_matrix1.resize((n_occurences, len(leaf_ids)))
+        vectors1 = (leaf_matrix1 > 0).toarray().astype(float)
+        vectors2 = (leaf_matrix2 > 0).toarray().astype(float)
+        equal = allclose(cost_matrix, -(vectors1 @ vectors2.T) / (norm(vectors1, axis=1)[:, None] *
+                                                                   norm(vectors2, axis=1)[None, :]))
+        start = perf_counter()
+        for j in range(n_occurences):
+            vector1 = leaf_matrix1[0].toarray()
+            vector2 = leaf_matrix2[j].toarray()
+            vector1 @ vector2.T / (norm(vector1) * norm(vector2))
+        cell_seconds = (perf_counter() - start) * n_occurences
+        print('%8d %12.3f %18.1f %6s' % (n_occurences, seconds, cell_seconds, equal))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+    Clusters synthetic snapshots of four layouts(the old and the new
+    listing layouts, and a variant of each with different heading and
+    emphasis tags) with a random number of items, and reports the time
+    taken to compute the layout signatures and to cluster them, along
+    with the number of clusters and whether every cluster holds pages
+    of a single layout. It then times the clustering of many distinct
+    signatures of a single layout, which share most bands and end up in
+    one cluster, and of distinct random signatures, for which the bands
+    are what keeps it near-linear.
+    Run from the scrapy_spider_auto_repair directory:
+        python -m benchmarks.bench_layout_clustering
+"""
+from random import Random
+from time import perf_counter
+from spider_auto_repair.auto_repair_code import Page
+from spider_auto_repair.layout import cluster_layouts
+from benchmarks.synthetic import get_items
+from benchmarks.synthetic import get_old_layout_page
+from benchmarks.synthetic import get_new_layout_page
+
+
+def get_snapshot(layout, n_items, seed):
+    items = get_items(n_items, seed)
+    if layout == 0:
+        return get_old_layout_page(items)
+    if layout == 1:
+        return get_new_layout_page(items)
+    if layout == 2:
+        return get_old_layout_page(items).replace('h2>', 'h3>')
+    return get_new_layout_page(items).replace('b>', 'i>')
+
+
+def main():
+    print('%8s %14s %12s %10s %6s' % ('pages', 'signatures(s)', 'cluster(s)', 'clusters', 'pure'))
+    for n_pages in [1000, 5000]:
+        rng = Random(n_pages)
+        layouts = [rng.randrange(4) for _ in range(n_pages)]
+        snapshots = [get_snapshot(layout, rng.randint(1, 60), i).encode('utf-8')
+                     for i, layout in enumerate(layouts)]
+        start = perf_counter()
+        signatures = [Page.from_bytes(snapshot, 'html').layout_signature for snapshot in snapshots]
+        signature_time = perf_counter() - start
+        start = perf_counter()
+        labels = cluster_layouts(signatures)
+        cluster_time = perf_counter() - start
+        pure = all(len(set(layout for layout, label in zip(layouts, labels) if label == cluster)) == 1
+                   for cluster in set(labels))
+        print('%8d %14.3f %12.3f %10d %6s' % (n_pages, signature_time, cluster_time,
+                                              len(set(labels)), pure))
+    print('%8s %12s %10s' % ('single', 'cluster(s)', 'clusters'))
+    for n_signatures in [10000, 100000]:
+        rng = Random(n_signatures)
+        signature = Page.from_bytes(get_snapshot(0, 30, 0).encode('utf-8'), 'html').layout_signature
+        signatures = [signature ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64))
+                      for _ in range(n_signatures)]
+        start = perf_counter()
+        labels = cluster_layouts(signatures)
+        print('%8d %12.3f %10d' % (n_signatures, perf_counter() - start, len(set(labels))))
+    print('%8s %12s %10s' % ('random', 'cluster(s)', 'clusters'))
+    for n_signatures in [10000, 100000]:
+        rng = Random(n_signatures)
+        signatures = [rng.getrandbits(64) for _ in range(n_signatures)]
+        start = perf_counter()
+        labels = cluster_layouts(signatures)
+        print('%8d %12.3f %10d' % (n_signatures, perf_counter() - start, len(set(labels))))
+
+
+if __name__ == '__main__':
+    main()
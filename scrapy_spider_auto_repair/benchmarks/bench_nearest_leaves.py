@@ -0,0 +1,35 @@
+"""
+    Compares computing the nearest leaves of every occurence of the
+    repeated items of a synthetic page, in the compressed view of the
+    page, by one Breadth First Search per occurence(the CompactTree
+    search) with reading them from the index of the nearest leaves
+    (CompactTree.get_nearest_leaves), for different numbers of items
+    and values of k. The time of the index includes building it.
+    Run from the scrapy_spider_auto_repair directory:
+        python -m benchmarks.bench_nearest_leaves
+"""
+from time import perf_counter
+from lxml.etree import HTML
+from spider_auto_repair.compact_tree import get_compact_tree
+from benchmarks.synthetic import get_items
+from benchmarks.synthetic import get_new_layout_page
+
+
+def main():
+    print('%8s %4s %12s %12s %6s' % ('items', 'k', 'search(s)', 'index(s)', 'equal'))
+    for n_items in [500, 1000, 2000]:
+        tree = HTML(get_new_layout_page(get_items(n_items)))
+        for k in [2, 8]:
+            compact_tree = get_compact_tree(tree)
+            occurences = (compact_tree.representatives == range(len(compact_tree.nodes))).nonzero()[0].tolist()
+            start = perf_counter()
+            searched = [compact_tree.get_k_nearest_leaves(i, k, compressed = True) for i in occurences]
+            search_time = perf_counter() - start
+            start = perf_counter()
+            indexed = [compact_tree.get_nearest_leaves(i, k, compressed = True) for i in occurences]
+            index_time = perf_counter() - start
+            print('%8d %4d %12.3f %12.3f %6s' % (n_items, k, search_time, index_time, searched == indexed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+    Measures the time and the Python memory retained per page(as traced
+    by tracemalloc, which does not see the memory held by libxml2) when
+    only the tree of a page is needed, as when cached rules are applied, and when
+    every artifact is built, as Page used to do on construction.
+    Run from the scrapy_spider_auto_repair directory:
+        python -m benchmarks.bench_page_construction
+"""
+from os import remove
+from tempfile import NamedTemporaryFile
+from time import perf_counter
+from tracemalloc import start
+from tracemalloc import stop
+from tracemalloc import get_traced_memory
+from spider_auto_repair.auto_repair_code import Page
+from benchmarks.synthetic import get_items
+from benchmarks.synthetic import get_old_layout_page
+
+
+ARTIFACTS = {'tree': ['tree'],
+             'all': ['broken_code', 'code', 'tree', 'tree_without_attr']}
+
+
+def measure(path, names):
+    start()
+    begin = perf_counter()
+    page = Page(path, 'html')
+    for name in names:
+        getattr(page, name)
+    elapsed = perf_counter() - begin
+    retained = get_traced_memory()[0]
+    stop()
+    return elapsed, retained
+
+
+def main():
+    print('%8s %10s %10s %12s %10s %12s' % ('items', 'size(KB)', 'tree(s)', 'tree(KB)',
+                                            'all(s)', 'all(KB)'))
+    for n_items in [100, 1000, 10000]:
+        with NamedTemporaryFile('w', suffix='.html', delete=False) as file:
+            file.write(get_old_layout_page(get_items(n_items)))
+        row = []
+        for artifacts in ['tree', 'all']:
+            elapsed, retained = measure(file.name, ARTIFACTS[artifacts])
+            row += [elapsed, retained / 1024]
+        with open(file.name) as data:
+            size = len(data.read()) / 1024
+        remove(file.name)
+        print('%8d %10.0f %10.3f %12.0f %10.3f %12.0f' % (n_items, size, *row))
+
+
+if __name__ == '__main__':
+    main()
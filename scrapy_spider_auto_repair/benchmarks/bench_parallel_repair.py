@@ -0,0 +1,42 @@
+"""
+    Repairs several item cards of a synthetic old/new page pair with
+    auto_repair_pages, serially and with process pools of different
+    sizes, and reports the time taken and whether the rules and the
+    repaired subtrees are the same as the serial ones. The speedup is
+    bounded by the number of cores of the machine.
+    Run from the scrapy_spider_auto_repair directory:
+        python -m benchmarks.bench_parallel_repair
+"""
+from os import cpu_count
+from time import perf_counter
+from lxml.etree import tostring
+from spider_auto_repair.auto_repair_code import Page
+from spider_auto_repair.auto_repair_api import auto_repair_pages
+from benchmarks.synthetic import get_items
+from benchmarks.synthetic import get_old_layout_page
+from benchmarks.synthetic import get_new_layout_page
+
+
+def main():
+    items = get_items(200)
+    old_page = Page.from_bytes(get_old_layout_page(items).encode('utf-8'), 'html')
+    new_page = Page.from_bytes(get_new_layout_page(items).encode('utf-8'), 'html')
+    sections = old_page.tree.getroot()[1][1]
+    lst_extracted_old_subtrees = [sections[i][0] for i in range(len(sections))]
+    print('%8s %10s %8s %6s' % ('workers', 'seconds', 'speedup', 'same'))
+    serial = None
+    for workers in sorted({1, 2, 4, cpu_count()}):
+        start = perf_counter()
+        lst_rules, lst_repaired_subtrees = auto_repair_pages(old_page, new_page,
+                                                             lst_extracted_old_subtrees,
+                                                             cache = None, workers = workers)
+        seconds = perf_counter() - start
+        result = (lst_rules, [tostring(subtree) for subtree in lst_repaired_subtrees])
+        if serial is None:
+            serial = (seconds, result)
+        print('%8d %10.3f %8.2f %6s' % (workers, seconds, serial[0] / seconds,
+                                        result == serial[1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+    Searches a synthetic new-layout page for the closest subtree to an
+    item row that is not on the page, serially and with the nodes of the
+    page sharded over process pools of different sizes, and reports the
+    time taken by the first search, which starts the pool, and by a
+    second search reusing it, the speedup of the second search, the
+    number of edit distances computed and whether the result is the same
+    as the serial one. The speedup is bounded by the number of cores of
+    the machine.
+    Run from the scrapy_spider_auto_repair directory:
+        python -m benchmarks.bench_parallel_search
+"""
+from os import cpu_count
+from time import perf_counter
+from lxml.etree import HTML
+from lxml.etree import HTMLParser
+from spider_auto_repair.auto_repair_code import Page
+from benchmarks.synthetic import get_items
+from benchmarks.synthetic import get_new_layout_page
+
+
+def main():
+    parser = HTMLParser(remove_blank_text=True)
+    print('%8s %8s %10s %10s %8s %10s %6s' % ('items', 'workers', 'first(s)', 'repeat(s)',
+                                              'speedup', 'compared', 'same'))
+    for n_items in [1000, 5000]:
+        tree = HTML(get_new_layout_page(get_items(n_items)), parser=parser)
+        query = HTML(get_new_layout_page(get_items(1, seed = n_items)), parser=parser)[0][1][0][0]
+        page = Page('spider_auto_repair/Examples/Hello_World.html', 'html')
+        page.get_search_index(tree)
+        serial = None
+        for workers in sorted({1, 2, 4, cpu_count()}):
+            timings = []
+            for _ in range(2):
+                start = perf_counter()
+                result = page.get_subtree_path(query, tree, workers = workers)
+                timings.append(perf_counter() - start)
+            if serial is None:
+                serial = (timings[1], result)
+            print('%8d %8d %10.3f %10.3f %8.2f %10d %6s' % (n_items, workers, *timings,
+                                                            serial[0] / timings[1],
+                                                            page.num_compared_nodes,
+                                                            result == serial[1]))
+        page.close_search_executor()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+    Times get_repaired_subtree, which copies the query tree once and
+    applies every rule to the copy, against assigning the rules one by
+    one(retrieve_subtree and assign), which copies the query tree once
+    per rule, on the items of a synthetic old layout page repaired from
+    the new layout page with three rules per item, and checks that both
+    give the same bytes.
+    Run from the scrapy_spider_auto_repair directory:
+        python -m benchmarks.bench_rule_application
+"""
+from time import perf_counter
+from lxml.etree import HTML
+from lxml.etree import ElementTree
+from lxml.etree import tostring
+from spider_auto_repair.auto_repair_code import Page
+from benchmarks.synthetic import get_items
+from benchmarks.synthetic import get_old_layout_page
+from benchmarks.synthetic import get_new_layout_page
+
+
+def get_rules(n_items, section_size = 20):
+    rules = []
+    for i in range(n_items):
+        card = [i // section_size, i % section_size, 0]
+        rules.append((card + [0], [0, 1, 0, i, 1, 0]))
+        rules.append((card + [1], [0, 1, 0, i, 2, 0, 0]))
+        rules.append((card + [2], [0, 1, 0, i, 0, 0, 0]))
+    return rules
+
+
+def main():
+    page = Page('spider_auto_repair/Examples/Hello_World.html', 'html')
+    print('%8s %8s %14s %14s %6s' % ('items', 'rules', 'one by one(s)', 'in place(s)', 'equal'))
+    for n_items in [20, 100, 500]:
+        old_items = get_items(n_items)
+        new_items = get_items(n_items, seed = 1)
+        query_tree = ElementTree(HTML(get_old_layout_page(old_items))[1][1])
+        tree = ElementTree(HTML(get_new_layout_page(new_items)))
+        rules = get_rules(n_items)
+        start = perf_counter()
+        repaired_tree = query_tree
+        for rule in rules:
+            repaired_tree = page.assign(repaired_tree, page.retrieve_subtree(tree, rule[1]), rule[0])
+        one_by_one_time = perf_counter() - start
+        start = perf_counter()
+        in_place_tree = page.get_repaired_subtree(rules, query_tree, tree)
+        in_place_time = perf_counter() - start
+        print('%8d %8d %14.3f %14.4f %6s' % (n_items, len(rules), one_by_one_time, in_place_time,
+                                             tostring(repaired_tree) == tostring(in_place_tree)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+    Measures the cost of exporting rules as XPath expressions. The
+    rules repairing the items of a synthetic old layout page from the
+    new layout page(three rules per item) are compiled with and without
+    the id anchors, and on new layout pages with other items, selecting
+    the subtrees of the rules with the precompiled XPath objects and
+    repairing the query tree with apply_xpath_rules are timed against
+    retrieve_subtree and get_repaired_subtree. The ratios are the XPath
+    time over the path time, so a ratio above 1 is a slowdown. It checks
+    that both select the same nodes and give the same bytes.
+    Run from the scrapy_spider_auto_repair directory:
+        python -m benchmarks.bench_rule_compiler
+"""
+from time import perf_counter
+from lxml.etree import HTML
+from lxml.etree import ElementTree
+from lxml.etree import tostring
+from spider_auto_repair.auto_repair_code import Page
+from spider_auto_repair.rule_compiler import compile_rules
+from spider_auto_repair.rule_compiler import get_xpath_rules
+from spider_auto_repair.rule_compiler import apply_xpath_rules
+from benchmarks.synthetic import get_items
+from benchmarks.synthetic import get_old_layout_page
+from benchmarks.synthetic import get_new_layout_page
+from benchmarks.bench_rule_application import get_rules
+
+
+def main():
+    page = Page('spider_auto_repair/Examples/Hello_World.html', 'html')
+    n_pages = 20
+    print('%8s %8s %8s %11s %13s %11s %15s %12s %8s %8s %6s' %
+          ('items', 'rules', 'anchors', 'compile(s)', 'retrieve(s)', 'xpath(s)', 'get_repaired(s)',
+           'apply(s)', 'select', 'repair', 'equal'))
+    for n_items, attributes in [(n_items, attributes) for n_items in [20, 100, 500]
+                                for attributes in [('id',), ()]]:
+        query_tree = ElementTree(HTML(get_old_layout_page(get_items(n_items)))[1][1])
+        reference_tree = ElementTree(HTML(get_new_layout_page(get_items(n_items, seed = 1))))
+        trees = [ElementTree(HTML(get_new_layout_page(get_items(n_items, seed = i + 2))))
+                 for i in range(n_pages)]
+        rules = get_rules(n_items)
+        start = perf_counter()
+        xpath_rules = get_xpath_rules(compile_rules(rules, reference_tree, attributes))
+        compile_time = perf_counter() - start
+        start = perf_counter()
+        retrieved = [[page.retrieve_subtree(tree, rule[1], cpy = False) for rule in rules]
+                     for tree in trees]
+        retrieve_time = perf_counter() - start
+        start = perf_counter()
+        selected = [[rule[1](tree)[0] for rule in xpath_rules] for tree in trees]
+        xpath_time = perf_counter() - start
+        start = perf_counter()
+        repaired_trees = [page.get_repaired_subtree(rules, query_tree, tree) for tree in trees]
+        repaired_time = perf_counter() - start
+        start = perf_counter()
+        applied_trees = [apply_xpath_rules(xpath_rules, query_tree, tree) for tree in trees]
+        apply_time = perf_counter() - start
+        equal = retrieved == selected and all(tostring(repaired_tree) == tostring(applied_tree)
+                                              for repaired_tree, applied_tree in zip(repaired_trees,
+                                                                                     applied_trees))
+        print('%8d %8d %8s %11.4f %13.4f %11.4f %15.4f %12.4f %8.2f %8.2f %6s' %
+              (n_items, len(rules), bool(attributes), compile_time, retrieve_time, xpath_time,
+               repaired_time, apply_time, xpath_time / retrieve_time, apply_time / repaired_time,
+               equal))
+
+
+if __name__ == '__main__':
+    main()
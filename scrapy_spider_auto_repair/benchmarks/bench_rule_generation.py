@@ -0,0 +1,60 @@
+"""
+    Compares rule generation by a full edit-distance search per query
+    node(as rule_dfs used to do) with one hash lookup per query node
+    against indexes of both trees built once(generate_rules) on
+    synthetic listing pages. The query is one section of 20 items of the old page. The search is skipped on
+    the largest pages.
+    Run from the scrapy_spider_auto_repair directory:
+        python -m benchmarks.bench_rule_generation
+"""
+from time import perf_counter
+from lxml.etree import HTML
+from lxml.etree import HTMLParser
+from spider_auto_repair.auto_repair_code import Page
+from benchmarks.synthetic import get_items
+from benchmarks.synthetic import get_old_layout_page
+from benchmarks.synthetic import get_new_layout_page
+
+
+def search_rule_dfs(page, root, tree, rules, path):
+    path_to_subtree, mn = page.get_subtree_path(root, tree)
+    if mn == 0:
+        rules.append((path[:], path_to_subtree[:]))
+        return
+    n = len(root)
+    for i in range(n):
+        path.append(i)
+        search_rule_dfs(page, root[i], tree, rules, path)
+        path.pop()
+
+
+def main():
+    parser = HTMLParser(remove_blank_text=True)
+    print('%8s %8s %8s %12s %12s' % ('items', 'nodes', 'query', 'search(s)', 'lookup(s)'))
+    for n_items in [100, 1000, 10000]:
+        items = get_items(n_items)
+        old_tree = HTML(get_old_layout_page(items), parser=parser)
+        new_tree = HTML(get_new_layout_page(items), parser=parser)
+        subtree = old_tree[1][1][n_items // 40]
+        timings = []
+        lst_rules = []
+        for method in ['search', 'lookup']:
+            if method == 'search' and n_items > 1000:
+                timings.append(float('nan'))
+                continue
+            page = Page('spider_auto_repair/Examples/Hello_World.html', 'html')
+            start = perf_counter()
+            if method == 'search':
+                rules = []
+                search_rule_dfs(page, subtree, new_tree, rules, [])
+            else:
+                rules = page.generate_rules(subtree, new_tree)
+            timings.append(perf_counter() - start)
+            lst_rules.append(rules)
+        assert(all(rules == lst_rules[-1] for rules in lst_rules))
+        print('%8d %8d %8d %12.3f %12.3f' % (n_items, sum(1 for _ in new_tree.iter()),
+                                              sum(1 for _ in subtree.iter()), *timings))
+
+
+if __name__ == '__main__':
+    main()
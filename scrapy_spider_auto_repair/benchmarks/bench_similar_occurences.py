@@ -0,0 +1,39 @@
+"""
+    Times get_all_occurences on a synthetic listing page in which every
+    item has a timestamp, searching for the timestamp of one item exactly
+    (through the hashes of the nodes) and with min_similarity below 1
+    (through get_all_occurences_helper, which rejects the nodes by their
+    length before comparing them), and reports the number of occurences
+    found by each.
+    Run from the scrapy_spider_auto_repair directory:
+        python -m benchmarks.bench_similar_occurences
+"""
+from time import perf_counter
+from lxml.etree import HTML
+from spider_auto_repair.auto_repair_code import Page
+from benchmarks.synthetic import get_items
+from benchmarks.synthetic import get_new_layout_page
+
+
+def main():
+    print('%8s %14s %10s %10s %12s' % ('items', 'min_similarity', 'seconds', 'found', 'compressed'))
+    for n_items in [1000, 5000, 20000]:
+        page_source = get_new_layout_page(get_items(n_items))
+        for i in range(n_items):
+            page_source = page_source.replace('</h2></td>', '</h2><i>Posted 1%d:%02d</i></td>' % (i % 10, i % 60), 1)
+        for compressed in [False, True]:
+            tree = HTML(page_source)
+            page = Page('spider_auto_repair/Examples/Hello_World.html', 'html')
+            page.get_merkle_index(tree, compressed)
+            subtree = tree[0][1][0][n_items // 2][1][1]
+            if compressed:
+                subtree = page.get_representative(subtree)
+            for min_similarity in [1.0, 0.9]:
+                start = perf_counter()
+                occurences = page.get_all_occurences(tree, subtree, compressed, min_similarity)
+                print('%8d %14.2f %10.3f %10d %12s' % (n_items, min_similarity, perf_counter() - start,
+                                                        len(occurences), compressed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+    Measures the startup of a fresh interpreter that imports
+    spider_auto_repair and then either applies cached rules to a new
+    page(auto_repair with rules, i.e., get_repaired_subtree), as a worker
+    that only applies rules does, or repairs the page from scratch
+    (auto_repair without rules), which aligns the occurences of the
+    subtrees. It reports the time taken by the
+    import and by the work, the peak resident memory of the process, and
+    whether scipy was loaded, which only happens on the full-repair path.
+    Every measurement runs in a new process, so that nothing is cached.
+    Run from the scrapy_spider_auto_repair directory:
+        python -m benchmarks.bench_startup
+"""
+from subprocess import run
+from sys import executable
+from json import loads
+
+
+WORKER = '''
+from json import dumps
+from sys import modules
+from time import perf_counter
+start = perf_counter()
+from spider_auto_repair.auto_repair_code import Page, auto_repair
+import_time = perf_counter() - start
+old_page = Page('spider_auto_repair/Examples/Autorepair_Old_Page.html', 'html')
+new_page = Page('spider_auto_repair/Examples/Autorepair_New_page.html', 'html')
+extracted_old_subtree = old_page.tree.getroot()[0][1][0][0]
+start = perf_counter()
+auto_repair(old_page, new_page, extracted_old_subtree, %r)
+work_time = perf_counter() - start
+peak = [int(line.split()[1]) for line in open('/proc/self/status') if line.startswith('VmHWM:')][0]
+print(dumps([import_time, work_time, peak, 'scipy' in modules]))
+'''
+
+
+def measure(path, rules):
+    if path == 'repair':
+        rules = None
+    output = run([executable, '-c', WORKER % (rules,)], capture_output=True, text=True, check=True)
+    return loads(output.stdout)
+
+
+def main():
+    from spider_auto_repair.auto_repair_code import Page
+    from spider_auto_repair.auto_repair_code import auto_repair
+    old_page = Page('spider_auto_repair/Examples/Autorepair_Old_Page.html', 'html')
+    new_page = Page('spider_auto_repair/Examples/Autorepair_New_page.html', 'html')
+    rules, _ = auto_repair(old_page, new_page, old_page.tree.getroot()[0][1][0][0])
+    print('%8s %10s %10s %10s %8s' % ('path', 'import(s)', 'work(s)', 'peak(KB)', 'scipy'))
+    for path in ['rules', 'repair']:
+        runs = [measure(path, rules) for _ in range(5)]
+        import_time, work_time, peak, scipy_loaded = min(runs)
+        print('%8s %10.3f %10.3f %10d %8s' % (path, import_time, work_time, peak, scipy_loaded))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+from random import Random
+
+
+WORDS = ['alpha', 'beta', 'gamma', 'delta', 'price', 'stock', 'shipping',
+         'review', 'colour', 'size', 'brand', 'warranty', 'model', 'new']
+
+
+def get_items(n_items, seed = 0):
+    """
+        This function returns a list of n_items tuples of the form
+        (title, price, description) with reproducible contents.
+        Parameters:
+            1. n_items(type = int)
+            2. seed(type = int)
+    """
+    rng = Random(seed)
+    items = []
+    for i in range(n_items):
+        title = 'Item %d %s' % (i, rng.choice(WORDS))
+        price = '$%d.%02d' % (rng.randint(1, 999), rng.randint(0, 99))
+        description = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 12)))
+        items.append((title, price, description))
+    return items
+
+
+def get_old_layout_page(items, section_size = 20):
+    """
+        This function returns the HTML code of a listing page in the
+        old layout, in which every item is a card of nested divs and
+        the cards are grouped in sections of section_size cards.
+    """
+    sections = []
+    for i in range(0, len(items), section_size):
+        rows = []
+        for title, price, description in items[i:i + section_size]:
+            rows.append('<div class="card"><div class="body"><h2>%s</h2>'
+                        '<span class="price">%s</span><p>%s</p></div></div>'
+                        % (title, price, description))
+        sections.append('<div class="section">%s</div>' % ''.join(rows))
+    return ('<html><head><title>Listing</title></head><body>'
+            '<div id="header"><p>Header</p></div><div id="items">%s</div>'
+            '<div id="footer"><p>Footer</p></div></body></html>' % ''.join(sections))
+
+
+def get_new_layout_page(items):
+    """
+        This function returns the HTML code of the same listing page in
+        the new layout, in which every item is a table row whose fields
+        are reordered and wrapped differently.
+    """
+    rows = []
+    for title, price, description in items:
+        rows.append('<tr><td><div><p>%s</p></div></td><td><h2>%s</h2></td>'
+                    '<td><b><span>%s</span></b></td></tr>'
+                    % (description, title, price))
+    return ('<html><body><div class="nav"><p>Header</p></div>'
+            '<table><tbody>%s</tbody></table><p>Footer</p></body></html>'
+            % ''.join(rows))
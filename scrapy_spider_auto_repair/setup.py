@@ -40,7 +40,6 @@ setup(
     install_requires=[
         'lxml',
         'numpy',
-        'sklearn',
         'scipy'
     ],
 )
@@ -1,8 +1,22 @@
 from .auto_repair_code import Page
 from .auto_repair_code import auto_repair
+from .auto_repair_code import get_prefix_path
+from .auto_repair_code import MIN_SIMILARITY
+from .page_cache import PAGE_CACHE
+from .rule_store import get_layout_fingerprint
+from .rule_store import get_subtree_signature
+from .layout import cluster_layouts
+from .layout import MAX_HAMMING_DISTANCE
+from .layout import get_hamming_distance
+from time import perf_counter
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from lxml.etree import tostring
 
 
-def auto_repair_lst(old_page_path, new_page_path, lst_extracted_old_subtrees, rules = None):
+def auto_repair_lst(old_page_path, new_page_path, lst_extracted_old_subtrees, rules = None,
+                    rule_store = None, workers = None, cache = None,
+                    min_similarity = MIN_SIMILARITY):
     """
         This function is used to repair the incorrect
         data extracted by the broken spider from the new
@@ -19,12 +33,27 @@ def auto_repair_lst(old_page_path, new_page_path, lst_extracted_old_subtrees, ru
         generates the rules and then, corrects the spider
         and outputs rules(called rules, so that they can be
         used directly on pages having similar layout) as well
-        as the lst_repaired_subtrees. See example below.
+        as the lst_repaired_subtrees. If rule_store is passed
+        to this function, the rules for the subtrees without
+        rules are first looked up in rule_store and the rules
+        that have to be generated are saved in it(see
+        auto_repair_pages). If workers is greater than 1,
+        the rules of different subtrees are generated in
+        parallel by that many processes. If cache(passed as an
+        argument) is not None, such as PAGE_CACHE, the pages are
+        looked up in it(see get_page), so repeated calls with the
+        same old page do not parse it again. The subtrees are
+        located in the new page with min_similarity(passed as an
+        argument, see auto_repair). See example below.
         Parameters:
             1. old_page_path(type = string)
             2. new_page_path(type = string)
             3. lst_extracted_old_subtree(type = list of lxml.etree._Element objects)
             4. rules(type = list)
+            5. rule_store(type = RuleStore Object)
+            6. workers(type = int)
+            7. cache(type = PageCache Object)
+            8. min_similarity(type = float)
         Example:
             >>> old_page_path = 'Examples/Autorepair_Old_Page.html'
             >>> new_page_path = 'Examples/Autorepair_New_Page.html'
@@ -40,20 +69,410 @@ def auto_repair_lst(old_page_path, new_page_path, lst_extracted_old_subtrees, ru
             b'<div>\n                    <div>\n                        <p>Username</p>\n            <p>email</p>\n        <p>Captcha1</p>\n                        <p>Captcha2</p>\n                    </div>\n                </div>\n            '
             >>> 
     """
-    new_page = Page(new_page_path, 'html')
-    old_page = Page(old_page_path, 'html')
+    return auto_repair_pages(old_page_path, new_page_path, lst_extracted_old_subtrees, rules,
+                             cache = cache, rule_store = rule_store, workers = workers,
+                             min_similarity = min_similarity)
+
+
+def get_page(page, parser = 'html', cache = None):
+    """
+        This function returns page(passed as an argument) as a Page
+        object. page can be a Page object, which is returned as it
+        is, a byte buffer, an object with a body such as a Scrapy
+        Response, or a path to a file. Code that is already in a
+        string can be passed as Page.from_string(code, parser).
+        If cache(passed as an argument) is None, a new page is
+        always built. Otherwise byte buffers, responses and files
+        are looked up by content in cache, such as PAGE_CACHE, so
+        a page that was seen before is not parsed again, and the
+        page returned is shared with the other callers(see
+        PageCache.get_page). Files are read in text mode either way.
+        Parameters:
+            1. page(type = Page Object, bytes, scrapy.http.Response or string)
+            2. parser(type = string)
+            3. cache(type = PageCache Object)
+        Example:
+            >>> page = get_page(b'<p>Hello World</p>')
+            >>> tostring(page.tree.getroot())
+            b'<html><body><p>Hello World</p></body></html>'
+            >>> get_page(b'<p>Hello World</p>') is page
+            False
+            >>> get_page(b'<p>Hello World</p>', cache = PAGE_CACHE) is get_page(b'<p>Hello World</p>', cache = PAGE_CACHE)
+            True
+            >>>
+    """
+    if isinstance(page, Page):
+        return page
+    if cache is None:
+        if isinstance(page, bytes):
+            return Page.from_bytes(page, parser)
+        if hasattr(page, 'body'):
+            return Page.from_response(page, parser)
+        return Page(page, parser)
+    if isinstance(page, bytes):
+        return cache.get_page(page, parser)
+    if hasattr(page, 'body'):
+        return cache.get_page(page.body, parser, getattr(page, 'encoding', 'utf-8'))
+    with open(page, 'rb') as file:
+        return cache.get_page(file.read(), parser, path = page)
+
+
+def auto_repair_pages(old_page, new_page, lst_extracted_old_subtrees, rules = None,
+                      cache = None, rule_store = None, workers = None, executor = None,
+                      min_similarity = MIN_SIMILARITY):
+    """
+        This function is the same as auto_repair_lst, except
+        that old_page and new_page(passed as arguments) can be
+        Page objects, byte buffers or Scrapy Responses(see
+        get_page), so pages that are already in memory need
+        not be written to files. If cache(passed as an argument)
+        is not None, pages that are not Page objects are looked
+        up in it(see get_page).
+        If rule_store(passed as an argument) is not None, the
+        rules for every subtree without rules are looked up in
+        rule_store under the layout fingerprints of the pages
+        and the signature of the subtree, and are generated and
+        saved in rule_store only if they are not found. If
+        workers(passed as an argument) is greater than 1, the
+        rules that have to be generated are generated in parallel
+        (see generate_rules_in_workers), and the result is the
+        same as when they are generated one after another. The
+        processes of executor(passed as an argument) are used if
+        it is not None, otherwise a new pool is started. The
+        subtrees are located in the new page with min_similarity
+        (passed as an argument, see auto_repair).
+        Parameters:
+            1. old_page(type = Page Object, bytes, scrapy.http.Response or string)
+            2. new_page(type = Page Object, bytes, scrapy.http.Response or string)
+            3. lst_extracted_old_subtree(type = list of lxml.etree._Element objects)
+            4. rules(type = list)
+            5. cache(type = PageCache Object)
+            6. rule_store(type = RuleStore Object)
+            7. workers(type = int)
+            8. executor(type = concurrent.futures.ProcessPoolExecutor)
+            9. min_similarity(type = float)
+        Example:
+            >>> old_page = Page('Examples/Autorepair_Old_Page.html', 'html')
+            >>> new_page = open('Examples/Autorepair_New_Page.html', 'rb').read()
+            >>> lst_extracted_old_subtrees = [old_page.tree.getroot()[0][1][0][0]]
+            >>> lst_rules, lst_repaired_subtrees = auto_repair_pages(old_page, new_page, lst_extracted_old_subtrees)
+            >>> lst_rules
+            [[([0, 0], [0, 0, 0]), ([0, 1], [0, 0, 1])]]
+            >>>
+    """
+    new_page = get_page(new_page, cache = cache)
+    old_page = get_page(old_page, cache = cache)
     lst_rules = []
     lst_repaired_subtrees = []
     if rules is None:
         rules = [None]*len(lst_extracted_old_subtrees)
+    rules = list(rules)
+    keys = [None]*len(rules)
+    if rule_store is not None:
+        fingerprints = None
+        for idx, extracted_old_subtree in enumerate(lst_extracted_old_subtrees):
+            if rules[idx] is None:
+                if fingerprints is None:
+                    fingerprints = (get_layout_fingerprint(old_page.tree),
+                                    get_layout_fingerprint(new_page.tree))
+                keys[idx] = fingerprints + (get_subtree_signature(extracted_old_subtree),)
+                rules[idx] = rule_store.get_rules(*keys[idx])
+    missing = [idx for idx in range(len(rules)) if rules[idx] is None]
+    if workers is not None and workers > 1 and len(missing) > 1:
+        lst_generated_rules = generate_rules_in_workers(old_page, new_page,
+                                                        [lst_extracted_old_subtrees[idx] for idx in missing],
+                                                        workers, executor, min_similarity)
+        for idx, generated_rules in zip(missing, lst_generated_rules):
+            rules[idx] = generated_rules
     idx = 0
     for extracted_old_subtree in lst_extracted_old_subtrees:
-        final_rules, repaired_subtree = auto_repair(old_page, new_page, extracted_old_subtree, rules = rules[idx])
+        final_rules, repaired_subtree = auto_repair(old_page, new_page, extracted_old_subtree, rules = rules[idx],
+                                                    min_similarity = min_similarity)
+        if keys[idx] is not None and idx in missing:
+            rule_store.put_rules(*keys[idx], final_rules)
         lst_rules.append(final_rules)
         lst_repaired_subtrees.append(repaired_subtree)
         idx += 1
     return lst_rules, lst_repaired_subtrees
 
 
+def get_page_source(page):
+    """
+        This function returns a tuple from which page(passed as
+        an argument) can be built again in another process(see
+        get_page_from_source), or None if page was not built from
+        a file, a string or a byte buffer. Only the source of the
+        page is sent to other processes, not its tree.
+        Parameters:
+            1. page(type = Page Object)
+        Example:
+            >>> get_page_source(Page('Examples/Hello_World.html', 'html'))
+            ('Examples/Hello_World.html', None, 'html', None)
+            >>>
+    """
+    if page.path_to_data is None and page.buffer is None:
+        return None
+    return (page.path_to_data, page.buffer, page.parser, page.encoding)
 
 
+def get_page_from_source(source):
+    """
+        This function returns the page built from source(passed
+        as an argument), as returned by get_page_source.
+        Parameters:
+            1. source(type = tuple)
+        Example:
+            >>> page = get_page_from_source((None, b'<p>Hello World</p>', 'html', 'utf-8'))
+            >>> tostring(page.tree.getroot())
+            b'<html><body><p>Hello World</p></body></html>'
+            >>>
+    """
+    path_to_data, buffer, parser, encoding = source
+    if buffer is None:
+        return Page(path_to_data, parser)
+    if isinstance(buffer, bytes):
+        return Page.from_bytes(buffer, parser, encoding)
+    return Page.from_string(buffer, parser)
+
+
+WORKER_PAGES = None
+WORKER_MAX_PAGES = 4
+
+
+def get_worker_page(source):
+    """
+        This function is run by a worker process of
+        generate_rules_in_workers and returns the page built from
+        source(passed as an argument, see get_page_from_source).
+        Every worker keeps the WORKER_MAX_PAGES pages it used last,
+        so a worker of a pool reused across calls, such as in
+        auto_repair_batch, builds the old page once and every new
+        page once, not once per subtree.
+        Parameters:
+            1. source(type = tuple)
+        Example:
+            >>> source = ('Examples/Hello_World.html', None, 'html', None)
+            >>> get_worker_page(source) is get_worker_page(source)
+            True
+            >>>
+    """
+    global WORKER_PAGES
+    if WORKER_PAGES is None:
+        WORKER_PAGES = OrderedDict()
+    if source in WORKER_PAGES:
+        WORKER_PAGES.move_to_end(source)
+        return WORKER_PAGES[source]
+    page = get_page_from_source(source)
+    WORKER_PAGES[source] = page
+    while len(WORKER_PAGES) > WORKER_MAX_PAGES:
+        WORKER_PAGES.popitem(last=False)
+    return page
+
+
+def get_worker_rules(old_page_source, new_page_source, prefix_path,
+                     min_similarity = MIN_SIMILARITY):
+    """
+        This function is run by a worker process of
+        generate_rules_in_workers and returns the rules generated
+        by auto_repair for the subtree present at prefix_path
+        (passed as an argument) in the old page built from
+        old_page_source, repaired from the new page built from
+        new_page_source(passed as arguments, see get_worker_page),
+        with min_similarity(passed as an argument).
+        Parameters:
+            1. old_page_source(type = tuple)
+            2. new_page_source(type = tuple)
+            3. prefix_path(type = list)
+            4. min_similarity(type = float)
+    """
+    old_page = get_worker_page(old_page_source)
+    new_page = get_worker_page(new_page_source)
+    extracted_old_subtree = old_page.retrieve_subtree(old_page.tree, prefix_path, cpy = False)
+    return auto_repair(old_page, new_page, extracted_old_subtree,
+                       min_similarity = min_similarity)[0]
+
+
+def generate_rules_in_workers(old_page, new_page, lst_extracted_old_subtrees, workers,
+                              executor = None, min_similarity = MIN_SIMILARITY):
+    """
+        This function returns the list of rules generated by
+        auto_repair for every subtree of lst_extracted_old_subtrees
+        (passed as an argument), using executor(passed as an
+        argument), a pool of processes, or a new pool of workers
+        (passed as an argument) processes if executor is None. The
+        lxml subtrees cannot be sent to the workers, so every
+        subtree is sent as its path in the old page along with the
+        sources of the pages(see get_page_source), and the workers
+        build every page once(see get_worker_page). Passing the same
+        executor to several calls saves starting the processes and
+        building the old page again. The rules come back in the
+        order of lst_extracted_old_subtrees. None is returned, to be
+        generated serially, for the subtrees that are not found at
+        their path in old_page(passed as an argument), and for all
+        the subtrees if a page has no source. The workers locate the
+        subtrees with min_similarity(passed as an argument, see
+        auto_repair).
+        Parameters:
+            1. old_page(type = Page Object)
+            2. new_page(type = Page Object)
+            3. lst_extracted_old_subtrees(type = list of lxml.etree._Element objects)
+            4. workers(type = int)
+            5. executor(type = concurrent.futures.ProcessPoolExecutor)
+            6. min_similarity(type = float)
+        Example:
+            >>> old_page = Page('Examples/Autorepair_Old_Page.html', 'html')
+            >>> new_page = Page('Examples/Autorepair_New_Page.html', 'html')
+            >>> root = old_page.tree.getroot()
+            >>> generate_rules_in_workers(old_page, new_page, [root[0][1][0][0], root[0][0]], 2)
+            [[([0, 0], [0, 0, 0]), ([0, 1], [0, 0, 1])], [([0], [0, 1, 1, 0]), ([1], [0, 1, 1, 1]), ([2], [0, 1, 2])]]
+            >>>
+    """
+    lst_rules = [None]*len(lst_extracted_old_subtrees)
+    old_page_source = get_page_source(old_page)
+    new_page_source = get_page_source(new_page)
+    if old_page_source is None or new_page_source is None:
+        return lst_rules
+    if executor is None:
+        with ProcessPoolExecutor(max_workers = workers) as executor:
+            return generate_rules_in_workers(old_page, new_page, lst_extracted_old_subtrees,
+                                             workers, executor, min_similarity)
+    indices = []
+    prefix_paths = []
+    for idx, extracted_old_subtree in enumerate(lst_extracted_old_subtrees):
+        prefix_path = get_prefix_path(extracted_old_subtree)
+        subtree = old_page.retrieve_subtree(old_page.tree, prefix_path, cpy = False)
+        if tostring(subtree) == tostring(extracted_old_subtree):
+            indices.append(idx)
+            prefix_paths.append(prefix_path)
+    n = len(prefix_paths)
+    for idx, rules in zip(indices, executor.map(get_worker_rules, [old_page_source]*n,
+                                                [new_page_source]*n, prefix_paths,
+                                                [min_similarity]*n)):
+        lst_rules[idx] = rules
+    return lst_rules
+
+
+def auto_repair_batch(old_page, reference_new_pages, lst_extracted_old_subtrees, new_pages,
+                      rules = None, cache = None, rule_store = None, stats = None,
+                      workers = None, executor = None):
+    """
+        This function repairs a stream of new pages having the
+        layout of reference_new_pages(passed as an argument), which
+        is a list of one or a few new pages. The rules are derived
+        once for every reference new page with auto_repair_pages,
+        then for every page of new_pages(passed as an argument), the
+        rules of the reference new page whose layout signature is the
+        closest are applied to it and the list of repaired subtrees
+        is yielded. new_pages can be any iterable, such as a
+        generator, of Page objects, byte buffers, Scrapy Responses
+        or paths(see get_page). The pages of new_pages are not
+        cached and their trees are released once they are repaired,
+        so memory stays bounded however many pages are repaired.
+        If cache(passed as an argument) is not None, old_page and
+        the reference new pages are looked up in it(see get_page).
+        If workers(passed as an argument) is greater than 1, the
+        rules of every reference new page are generated in parallel
+        by the processes of executor(passed as an argument), or of a
+        single pool started for all the reference new pages if
+        executor is None(see generate_rules_in_workers).
+        None is yielded for the pages to which the rules do not
+        apply, and the next pages are still repaired. If stats
+        (passed as an argument) is a dict, it is updated after every
+        page with the number of pages handled, the number of them that
+        could not be repaired, the seconds spent on them(excluding the
+        time taken by the caller between pages) and the throughput in
+        pages per second.
+        Parameters:
+            1. old_page(type = Page Object, bytes, scrapy.http.Response or string)
+            2. reference_new_pages(type = list)
+            3. lst_extracted_old_subtree(type = list of lxml.etree._Element objects)
+            4. new_pages(type = iterable)
+            5. rules(type = list)
+            6. cache(type = PageCache Object)
+            7. rule_store(type = RuleStore Object)
+            8. stats(type = dict)
+            9. workers(type = int)
+            10. executor(type = concurrent.futures.ProcessPoolExecutor)
+        Example:
+            >>> old_page = Page('Examples/Autorepair_Old_Page.html', 'html')
+            >>> lst_extracted_old_subtrees = [old_page.tree.getroot()[0][1][0][0]]
+            >>> stats = dict()
+            >>> for lst_repaired_subtrees in auto_repair_batch(old_page, ['Examples/Autorepair_New_Page.html'],
+            ...                                                lst_extracted_old_subtrees,
+            ...                                                ['Examples/Autorepair_New_page_similar.html'],
+            ...                                                stats = stats):
+            ...     print(tostring(lst_repaired_subtrees[0]))
+            ...
+            b'<div>\n                    <div>\n                        <p>Google</p>\n            <p>Microsoft</p>\n        <p>Captcha1</p>\n                        <p>Captcha2</p>\n                    </div>\n                </div>\n            '
+            >>> stats['pages']
+            1
+            >>>
+    """
+    old_page = get_page(old_page, cache = cache)
+    references = []
+    pool = None
+    if executor is None and workers is not None and workers > 1:
+        executor = pool = ProcessPoolExecutor(max_workers = workers)
+    try:
+        for reference_new_page in reference_new_pages:
+            reference_new_page = get_page(reference_new_page, cache = cache)
+            lst_rules = auto_repair_pages(old_page, reference_new_page, lst_extracted_old_subtrees,
+                                          rules, cache = cache, rule_store = rule_store,
+                                          workers = workers, executor = executor)[0]
+            references.append((reference_new_page, lst_rules))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if stats is None:
+        stats = dict()
+    stats['pages'] = 0
+    stats['failed'] = 0
+    stats['seconds'] = 0.0
+    stats['pages_per_second'] = 0.0
+    for new_page in new_pages:
+        start = perf_counter()
+        page = get_page(new_page, cache = None)
+        lst_rules = references[0][1]
+        if len(references) > 1:
+            lst_rules = min(references, key = lambda reference:
+                            get_hamming_distance(reference[0].layout_signature,
+                                                 page.layout_signature))[1]
+        lst_repaired_subtrees = []
+        try:
+            for extracted_old_subtree, subtree_rules in zip(lst_extracted_old_subtrees, lst_rules):
+                lst_repaired_subtrees.append(auto_repair(old_page, page, extracted_old_subtree,
+                                                         rules = subtree_rules)[1])
+        except IndexError:
+            lst_repaired_subtrees = None
+            stats['failed'] += 1
+        if page is not new_page:
+            page.release_artifacts()
+        stats['pages'] += 1
+        stats['seconds'] += perf_counter() - start
+        stats['pages_per_second'] = stats['pages'] / stats['seconds']
+        yield lst_repaired_subtrees
+
+
+def cluster_pages(pages, max_distance = MAX_HAMMING_DISTANCE):
+    """
+        This function clusters pages(passed as an argument) by
+        their layout and returns a list of cluster labels, one
+        per page(see layout.cluster_layouts), so that the rules
+        derived for one page of a cluster can be applied to the
+        others. pages can contain Page objects, byte buffers,
+        Scrapy Responses or paths(see get_page). Pages that are
+        not Page objects are not cached, and only their layout
+        signature is kept, so thousands of pages can be clustered
+        at once.
+        Parameters:
+            1. pages(type = iterable)
+            2. max_distance(type = int)
+        Example:
+            >>> cluster_pages([b'<div><p>a</p></div>', b'<div><p>b</p><p>c</p></div>', b'<table/>'])
+            [0, 0, 1]
+            >>>
+    """
+    signatures = []
+    for page in pages:
+        signatures.append(get_page(page, cache = None).layout_signature)
+    return cluster_layouts(signatures, max_distance)
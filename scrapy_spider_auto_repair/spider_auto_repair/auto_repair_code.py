@@ -6,18 +6,72 @@ from lxml.etree import tostring
 from lxml.etree import parse
 from lxml.etree import fromstring
 from lxml.etree import ElementTree
+from lxml.etree import Element
 from copy import deepcopy
 from io import StringIO
+from io import BytesIO
+from codecs import lookup
 from string import whitespace
 from math import inf
 from re import sub
+from re import finditer
 from enum import Enum
-from sklearn.metrics.pairwise import cosine_similarity
-from scipy.optimize import linear_sum_assignment
 from numpy import zeros
 from numpy import array
+from numpy import ones
+from numpy import isin
+from numpy import frombuffer
+from numpy import cumsum
+from numpy import sqrt
+from numpy import float64
+from numpy import full
+from numpy import lexsort
+from numpy import concatenate
+from numpy import uint8
+from numpy import int64
+from numpy import uint32
+from numpy import argsort
+from numpy import searchsorted
+from numpy import maximum
+from numpy import flatnonzero
+from numpy import diff
+from numpy import split
+from numpy import bincount
 from pickle import load
 from pickle import dump
+from collections import Counter
+from collections import deque
+from collections import OrderedDict
+from collections import namedtuple
+from multiprocessing import Array
+from concurrent.futures import ProcessPoolExecutor
+from .edit_distance import get_bounded_edit_distance
+from .edit_distance import is_similar
+from .layout import get_layout_signature
+from .compact_tree import get_compact_tree
+
+
+BR_PATTERN = r"<\s*br\s*>|<\s*br\s*/\s*>|<\s*/\s*br\s*>"
+WHITESPACE_TABLE = dict.fromkeys(map(ord, whitespace))
+WHITESPACE_BYTES = array(list(whitespace.encode('ascii')), dtype=uint8)
+
+
+MAX_TREE_INDEXES = 8
+NUM_NEAREST_LEAVES = 2
+MAX_ASSIGNMENT_SIZE = 1000000
+MIN_SIMILARITY = 1.0
+HASH_BASE = 1000003
+HASH_MODULUS = (1 << 61) - 1
+SearchNode = namedtuple('SearchNode', ['position',
+                                       'length',
+                                       'subtree_size',
+                                       'subtree_max_length'])
+SearchCandidate = namedtuple('SearchCandidate', ['position',
+                                                 'end',
+                                                 'code_start',
+                                                 'code_end',
+                                                 'search_node'])
+SEARCH_BOUND = None
 
 
 class State(Enum):
@@ -27,18 +81,54 @@ class State(Enum):
     wait_for_close_angular_bracket = 3
 
 
+def get_artifact_property(name):
+    """
+        This function returns a property for the artifact of a page
+        called name(passed as an argument), such as its code or its
+        tree. The artifact is built on first access, by the method
+        'build_' + name of the page, and is then cached until it is
+        released by release_artifacts.
+        Parameters:
+            1. name(type = string)
+        Example:
+            >>> class Example:
+            ...     artifacts = dict()
+            ...     def build_value(self):
+            ...         return 42
+            ...     value = get_artifact_property('value')
+            ...
+            >>> Example().value
+            42
+            >>>
+    """
+    def getter(self):
+        if name not in self.artifacts:
+            self.artifacts[name] = getattr(self, 'build_' + name)()
+        return self.artifacts[name]
+    def setter(self, value):
+        self.artifacts[name] = value
+    return property(getter, setter)
+
+
 class ParsingAndProcessing:
     path_to_data = None
-    broken_code = None
-    code = None
-    tree = None
-    tree_without_attr = None
+    parser = None
+    buffer = None
+    encoding = None
+    artifacts = None
+    broken_code = get_artifact_property('broken_code')
+    code = get_artifact_property('code')
+    tree = get_artifact_property('tree')
+    tree_without_attr = get_artifact_property('tree_without_attr')
+    layout_signature = get_artifact_property('layout_signature')
     def __init__(self, path_to_data, parser):
         """
             This function takes in path_to_data
             (passed as an argument) from where
             code is read and parsed according to
             the parser = parser(passed as an argument).
+            Nothing is read or parsed until broken_code, code,
+            tree, tree_without_attr or layout_signature is accessed.
             Parameters:
                 1. path_to_data(type = string)
                 2. parser(type = string)
@@ -48,16 +138,239 @@ class ParsingAndProcessing:
                 <__main__.Page object at 0x000002093135A160>
                 >>> 
         """
+        assert(parser.lower() in ['xml', 'html']), "Invalid parser!"
         self.path_to_data = path_to_data
-        self.broken_code = self.get_data(path_to_data)
-        if parser.lower() == 'xml':
-            self.code = self.get_repaired_xml(broken_xml=self.broken_code)
-            self.tree_without_attr = self.get_tree_without_attr_xml(code=self.code)
-        elif parser.lower() == 'html':
-            self.code = self.get_repaired_html(broken_html=self.broken_code)
-            self.tree_without_attr = self.get_tree_without_attr_html(code=self.code)
+        self.parser = parser.lower()
+        self.artifacts = dict()
+
+    @classmethod
+    def from_string(cls, code, parser):
+        """
+            This function returns a page whose code is
+            code(passed as an argument), parsed according
+            to the parser = parser(passed as an argument),
+            without reading any file.
+            Parameters:
+                1. code(type = string)
+                2. parser(type = string)
+            Example:
+                >>> obj = Page.from_string('<div id = "ID"> Hello World <div>', 'xml')
+                >>> tostring(obj.tree)
+                b'<div id="ID"> Hello World <div/></div>'
+                >>>
+        """
+        page = cls(None, parser)
+        page.buffer = code
+        return page
+
+    @classmethod
+    def from_bytes(cls, data, parser, encoding = 'utf-8'):
+        """
+            This function returns a page whose code is the
+            byte buffer data(passed as an argument), in the
+            encoding = encoding(passed as an argument), parsed
+            according to the parser = parser(passed as an argument).
+            The tree is parsed straight from data, which is only
+            decoded if broken_code is accessed. If encoding is None,
+            lxml uses the encoding declared in data, if any.
+            Parameters:
+                1. data(type = bytes)
+                2. parser(type = string)
+                3. encoding(type = string)
+            Example:
+                >>> obj = Page.from_bytes(b'<div id = "ID"> H\xe9llo <div>', 'xml', 'latin-1')
+                >>> tostring(obj.tree)
+                b'<div id="ID"> H&#233;llo <div/></div>'
+                >>>
+        """
+        page = cls(None, parser)
+        page.buffer = data
+        page.encoding = encoding
+        return page
+
+    @classmethod
+    def from_response(cls, response, parser = 'html'):
+        """
+            This function returns a page whose code is the body
+            of response(passed as an argument), such as a Scrapy
+            Response, decoded with the encoding of response, or
+            with UTF-8 if it has none. See from_bytes.
+            Parameters:
+                1. response(type = scrapy.http.Response)
+                2. parser(type = string)
+            Example:
+                >>> response = HtmlResponse('http://example.com', body = b'<p>Hello World</p>')
+                >>> obj = Page.from_response(response)
+                >>> tostring(obj.tree.getroot())
+                b'<html><body><p>Hello World</p></body></html>'
+                >>>
+        """
+        return cls.from_bytes(response.body, parser,
+                              getattr(response, 'encoding', 'utf-8'))
+
+    def build_broken_code(self):
+        """
+            This function reads and returns the code(which
+            can be broken HTML) of the page. The code of a
+            page built from bytes is decoded with its encoding,
+            or with UTF-8 if it has none.
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> obj.build_broken_code()
+                '<html>\n    <body>\n        <p>Hello World</p>\n    </body>\n</html>\n'
+                >>>
+        """
+        if self.buffer is None:
+            return self.get_data(self.path_to_data)
+        if isinstance(self.buffer, bytes):
+            return self.buffer.decode(self.encoding or 'utf-8', errors='replace')
+        return self.buffer
+
+    def build_code(self):
+        """
+            This function returns the code of the page
+            serialized from its parsed tree.
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> obj.build_code()
+                '<html><body>\n        <p>Hello World</p>\n    </body></html>'
+                >>>
+        """
+        return str(tostring(self.tree.getroot(),
+                   pretty_print=False).decode('utf-8'))
+
+    def build_tree(self):
+        """
+            This function parses the code of the page and
+            returns it in the form of an lxml.etree._ElementTree
+            object. The code that is read is not kept, unless
+            broken_code has already been accessed.
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> tostring(obj.build_tree().getroot())
+                b'<html><body>\n        <p>Hello World</p>\n    </body></html>'
+                >>>
+        """
+        if self.buffer is not None:
+            return self.get_parsed_tree(self.buffer, self.parser, self.encoding)
+        if 'broken_code' in self.artifacts:
+            broken_code = self.broken_code
         else:
-            assert(False), "Invalid parser!"
+            broken_code = self.build_broken_code()
+        return self.get_parsed_tree(broken_code, self.parser)
+
+    def build_tree_without_attr(self):
+        """
+            This function returns the root of the tree of
+            the page with the attributes of all the nodes
+            removed. See get_tree_without_attr.
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> tostring(obj.build_tree_without_attr())
+                b'<html><body>\n        <p>Hello World</p>\n    </body></html>'
+                >>>
+        """
+        if self.parser == 'xml' and self.has_namespaces(self.tree.getroot()):
+            return self.get_tree_without_attr_xml(code=self.code)
+        return self.get_tree_without_attr(tree=self.tree)
+
+    def build_layout_signature(self):
+        """
+            This function returns the layout signature of the
+            page(see layout.get_layout_signature). Only the tags
+            of the nodes are used, so it is computed from tree
+            without building tree_without_attr.
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> obj.build_layout_signature()
+                2757919608386960436
+                >>>
+        """
+        return get_layout_signature(self.tree)
+
+    def release_artifacts(self, *names):
+        """
+            This function drops the cached artifacts named
+            by names(passed as arguments), or all of them if
+            no name is passed, so that their memory can be
+            reclaimed. A released artifact is built again
+            when it is next accessed.
+            Parameters:
+                1. names(type = strings among 'broken_code', 'code',
+                   'tree', 'tree_without_attr' and 'layout_signature')
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> tree = obj.tree
+                >>> obj.release_artifacts('tree')
+                >>> obj.artifacts
+                {}
+                >>>
+        """
+        if not names:
+            names = list(self.artifacts)
+        for name in names:
+            self.artifacts.pop(name, None)
+
+    def get_parsed_tree(self, broken_code, parser, encoding = None):
+        """
+            This function parses broken_code(passed as an
+            argument), which can be broken XML or HTML, using
+            the parser = parser(passed as an argument) and
+            returns it in the form of an lxml.etree._ElementTree
+            object. If broken_code is a byte buffer, it is
+            decoded by lxml with encoding(passed as an argument),
+            or with the encoding declared in it if encoding is None.
+            Buffers in encodings that libxml2 does not support are
+            decoded by Python first.
+            Parameters:
+                1. broken_code(type = string or bytes)
+                2. parser(type = string)
+                3. encoding(type = string)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> tree = obj.get_parsed_tree('<div id = "ID"> Hello World <div>', 'xml')
+                >>> tostring(tree)
+                b'<div id="ID"> Hello World <div/></div>'
+                >>>
+        """
+        if not isinstance(broken_code, bytes):
+            return parse(StringIO(broken_code), self.get_parser(parser))
+        if encoding is not None:
+            encoding = lookup(encoding).name
+        try:
+            lxml_parser = self.get_parser(parser, encoding)
+        except LookupError:
+            broken_code = broken_code.decode(encoding, errors='replace')
+            return parse(StringIO(broken_code), self.get_parser(parser))
+        return parse(BytesIO(broken_code), lxml_parser)
+
+    def get_parser(self, parser, encoding = None):
+        """
+            This function returns the lxml parser used for
+            parser = parser(passed as an argument), which
+            decodes byte buffers with encoding(passed as an
+            argument). LookupError is raised if libxml2 does
+            not support encoding.
+            Parameters:
+                1. parser(type = string)
+                2. encoding(type = string)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> obj.get_parser('xml')
+                <lxml.etree.XMLParser object at 0x7f0e5b1c1a40>
+                >>>
+        """
+        if parser == 'xml':
+            return XMLParser(recover=True, remove_blank_text=True, encoding=encoding)
+        return HTMLParser(remove_blank_text=True, encoding=encoding)
 
     def get_repaired_xml(self, broken_xml):
         """
@@ -73,8 +386,7 @@ class ParsingAndProcessing:
                 '<div id="ID"> Hello World <div/></div>'
                 >>>  
         """
-        parser = XMLParser(recover=True, remove_blank_text=True)
-        tree = parse(StringIO(broken_xml), parser)
+        tree = self.get_parsed_tree(broken_xml, 'xml')
         self.code = str(tostring(tree.getroot(),
                         pretty_print=False).decode('utf-8'))
         self.tree = tree
@@ -115,8 +427,7 @@ class ParsingAndProcessing:
                 >>> obj.get_repaired_html(broken_html)
                 '<html><body><div id="ID"> Hello World <div/></div></body></html>'
         """
-        parser = HTMLParser(remove_blank_text=True)
-        tree = parse(StringIO(broken_html), parser)
+        tree = self.get_parsed_tree(broken_html, 'html')
         self.code = str(tostring(tree.getroot(),
                         pretty_print=False).decode('utf-8'))
         self.tree = tree
@@ -144,11 +455,59 @@ class ParsingAndProcessing:
         self.tree_without_attr = HTML(code_without_attr, parser=parser)
         return self.tree_without_attr
 
+    def get_tree_without_attr(self, tree):
+        """
+            This function returns a copy of the root of tree(passed
+            as an argument) with the attributes of all the nodes
+            removed. Unlike get_tree_without_attr_xml and
+            get_tree_without_attr_html, the code is neither serialized
+            nor parsed again, so every node of the copy is at the same
+            position as the corresponding node of tree.
+            Parameters:
+                1. tree(type = lxml.etree._ElementTree)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> obj.get_repaired_html('<div id = "ID"> Hello World <div>')
+                '<html><body><div id="ID"> Hello World <div/></div></body></html>'
+                >>> tostring(obj.get_tree_without_attr(obj.tree))
+                b'<html><body><div> Hello World <div/></div></body></html>'
+                >>>
+        """
+        tree_without_attr = deepcopy(tree.getroot())
+        for node in tree_without_attr.iter(Element):
+            node.attrib.clear()
+        return tree_without_attr
+
+    def has_namespaces(self, tree):
+        """
+            This function checks if any node of tree(passed as an argument)
+            is in the scope of a namespace declaration. tostring repeats the
+            declarations on every serialized node, so such trees cannot be
+            serialized bottom-up, and unlike remove_tag_attributes, clearing
+            the attributes of such a tree would keep the declarations.
+            Parameters:
+                1. tree(type = lxml.etree._Element)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> obj.has_namespaces(fromstring('<a xmlns="uri"><b/></a>'))
+                True
+                >>>
+        """
+        for node in tree.iter():
+            if isinstance(node.tag, str) and node.nsmap:
+                return True
+        return False
+
     def get_data(self, path):
         """
             This function reads the code(which can be 
             broken HTML) from a file present at a path
             specified by path(passed as an argument).
+            If the file cannot be read, the error(such
+            as FileNotFoundError) is raised, rather than
+            the page silently being parsed as empty.
             Parameters:
                 1. path(type = string)
             Example:
@@ -160,11 +519,8 @@ class ParsingAndProcessing:
                 '<html>\n    <body>\n        <p>Browsers usually insert quotation marks around the q element.</p>\n        <q>Build a future where people live in harmony with nature.</q>\n    </body>\n</html>\n'
                 >>> 
         """
-        try:
-            with open(path, 'r') as file:
-                broken_code = file.read()
-        except:
-            broken_code = ''
+        with open(path, 'r') as file:
+            broken_code = file.read()
         return broken_code
 
     def remove_br(self, code):
@@ -181,7 +537,7 @@ class ParsingAndProcessing:
                 '.......'
                 >>> 
         """
-        code = sub(r"<\s*br\s*>|<\s*br\s*/\s*>|<\s*/\s*br\s*>", "", code)
+        code = sub(BR_PATTERN, "", code)
         return code
 
     def remove_tag_attributes(self, code):
@@ -223,14 +579,34 @@ class ParsingAndProcessing:
         code = ''.join(lst)
         return code
 
-    def get_edit_distance(self, s1, s2):
+    def normalize_code(self, code):
+        """
+            This function returns code(passed as an argument)
+            in the form in which it is compared by get_edit_distance,
+            i.e., with all occurences of the <br/> tag and all
+            whitespace characters removed.
+            Parameters:
+                1. code(type = string)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> obj.normalize_code('<div>\n  Hello <br/>World</div>')
+                '<div>HelloWorld</div>'
+                >>>
+        """
+        return self.remove_br(code).translate(WHITESPACE_TABLE)
+
+    def get_edit_distance(self, s1, s2, max_distance = inf):
         """
             This function returns the edit distance between two strings s1 and s2.
             Edit distance between strings s1 and s2 is the number of additions, 
             deletions or replacement in characters of s1 to make s1 equal to s2.
+            If the edit distance is greater than max_distance(passed as an argument),
+            the computation stops early and max_distance + 1 is returned instead.
             Parameters:
                 1. s1(type = string)
                 2. s2(type = string)
+                3. max_distance(type = int or math.inf)
             Example:
                 >>> path = 'Examples/Hello_World.html'
                 >>> obj = Page(path, 'html')
@@ -238,26 +614,13 @@ class ParsingAndProcessing:
                 >>> s2 = 'cefg'
                 >>> obj.get_edit_distance(s1, s2)
                 4
+                >>> obj.get_edit_distance(s1, s2, max_distance = 2)
+                3
                 >>>
         """
-        s1 = self.remove_br(s1)
-        s2 = self.remove_br(s2)
-        s1 = ''.join([i for i in list(s1) if i not in whitespace])
-        s2 = ''.join([i for i in list(s2) if i not in whitespace])
-        if len(s1) > len(s2):
-            s1, s2 = s2, s1
-
-        distances = range(len(s1) + 1)
-        for i2, c2 in enumerate(s2):
-            distances_ = [i2+1]
-            for i1, c1 in enumerate(s1):
-                if c1 == c2:
-                    distances_.append(distances[i1])
-                else:
-                    distances_.append(1 + min((distances[i1],
-                                      distances[i1 + 1], distances_[-1])))
-            distances = distances_
-        return distances[-1]
+        s1 = self.normalize_code(s1)
+        s2 = self.normalize_code(s2)
+        return get_bounded_edit_distance(s1, s2, max_distance)
 
 
 class HungarianHelperMethods:
@@ -285,18 +648,62 @@ class HungarianHelperMethods:
                 array([[-0.5]])
         """
         if method == 'cosine-similarity':
-            features1 = [tostring(leaf).strip() for leaf, distance in features1]
-            features2 = [tostring(leaf).strip() for leaf, distance in features2]
-            combined_set = list(set(features1 + features2))
-            features1 = set(features1)
-            features2 = set(features2)
-            features1 = array([int(leaf_str in features1) for leaf_str in combined_set]).reshape(1, -1)
-            features2 = array([int(leaf_str in features2) for leaf_str in combined_set]).reshape(1, -1)
-            return -cosine_similarity(features1, features2)
+            return self.get_cost_matrix([(None, features1)], [(None, features2)])
+
+    def get_leaf_matrix(self, data, leaf_ids, leaf_strings = None):
+        """
+            This function returns a sparse matrix having a row for
+            each tuple (subtree, features) in data(passed as an argument)
+            and a column for each leaf string, such that the row of a
+            subtree is the indicator vector of the string representations
+            of the leaves in its features, divided by its norm. Leaf strings
+            are interned to column numbers in leaf_ids(passed as an argument),
+            so that the matrices of two pages built with the same leaf_ids
+            share their columns, and leaf_strings maps each leaf to its
+            string representation so that it is serialized once.
+            Parameters:
+                1. data(type = list of tuples)
+                2. leaf_ids(type = dict)
+                3. leaf_strings(type = dict)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> tree = fromstring('<div><div>child1</div><div><div>child2</div><div>child3</div></div></div>')
+                >>> features = obj.get_k_nearest_leaves(tree[1][0], 2)
+                >>> leaf_ids = dict()
+                >>> obj.get_leaf_matrix([('some subtree', features)], leaf_ids).toarray()
+                array([[0.70710678, 0.70710678]])
+                >>> leaf_ids
+                {b'<div>child3</div>': 0, b'<div>child1</div>': 1}
+                >>>
+        """
+        from scipy.sparse import csr_matrix
+        if leaf_strings is None:
+            leaf_strings = dict()
+        indices = []
+        indptr = [0]
+        for subtree, features in data:
+            row = set()
+            for leaf, distance in features:
+                if leaf not in leaf_strings:
+                    leaf_strings[leaf] = tostring(leaf).strip()
+                row.add(leaf_ids.setdefault(leaf_strings[leaf], len(leaf_ids)))
+            indices.extend(sorted(row))
+            indptr.append(len(indices))
+        indptr = array(indptr, dtype=int64)
+        row_sizes = indptr[1:] - indptr[:-1]
+        values = (1 / sqrt(row_sizes.clip(min=1))).repeat(row_sizes)
+        return csr_matrix((values.astype(float64), array(indices, dtype=int64), indptr),
+                          shape=(len(data), len(leaf_ids)))
 
     def get_cost_matrix(self, data1, data2):
         """
-            This function returns the cost matrix. See example below.
+            This function returns the cost matrix, whose cell (i, j) is
+            the negated cosine similarity of the sets of leaves in the
+            features of the i-th tuple in data1 and of the j-th tuple in
+            data2(passed as arguments). The leaves of both are interned once
+            (see get_leaf_matrix) and the whole matrix is the product of the
+            two normalized sparse matrices. See example below.
             Parameters:
                 1. data1(type = list of tuples)
                 2. data2(type = list of tuples)
@@ -315,16 +722,197 @@ class HungarianHelperMethods:
                 array([[-1.]])
                 >>> 
         """
-        cost_matrix = zeros((len(data1), len(data2)))
-        i = 0
-        j = 0
-        for subtree1, features1 in data1:
-            for subtree2, features2 in data2:
-                cost_matrix[i][j] = self.compute_cost(features1, features2)
-                j += 1
-            i += 1
-            j = 0
-        return cost_matrix
+        leaf_matrix1, leaf_matrix2 = self.get_leaf_matrices(data1, data2)
+        return -(leaf_matrix1 @ leaf_matrix2.T).toarray()
+
+    def get_leaf_matrices(self, data1, data2):
+        """
+            This function returns the leaf matrices(see get_leaf_matrix)
+            of data1 and data2(passed as arguments), which share their
+            columns.
+            Parameters:
+                1. data1(type = list of tuples)
+                2. data2(type = list of tuples)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> tree = fromstring('<div><p>a</p><p>b</p></div>')
+                >>> leaf_matrix1, leaf_matrix2 = obj.get_leaf_matrices([(None, [(tree[0], 2)])], [(None, [(tree[1], 2)])])
+                >>> leaf_matrix1.toarray(), leaf_matrix2.toarray()
+                (array([[1., 0.]]), array([[0., 1.]]))
+                >>>
+        """
+        leaf_ids = dict()
+        leaf_strings = dict()
+        leaf_matrix1 = self.get_leaf_matrix(data1, leaf_ids, leaf_strings)
+        leaf_matrix2 = self.get_leaf_matrix(data2, leaf_ids, leaf_strings)
+        leaf_matrix1.resize((len(data1), len(leaf_ids)))
+        return leaf_matrix1, leaf_matrix2
+
+    def get_component(self, leaf_matrix1, leaf_matrix2, idx):
+        """
+            This function returns a tuple (rows, cols) of the rows of
+            leaf_matrix1 and of leaf_matrix2(passed as arguments) that are
+            in the same connected component as the row idx(passed as an
+            argument) of leaf_matrix1, in the graph in which every row is
+            linked to the leaves it has. Two rows sharing no leaf have a
+            cost of 0 in the cost matrix(see get_cost_matrix), so pairs in
+            different components can be left out of the assignment, and
+            the component of row idx is solved on its own.
+            Parameters:
+                1. leaf_matrix1(type = scipy.sparse.csr_matrix)
+                2. leaf_matrix2(type = scipy.sparse.csr_matrix)
+                3. idx(type = int)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> tree = fromstring('<div><p>a</p><p>b</p><p>c</p></div>')
+                >>> data1 = [(None, [(tree[0], 2)]), (None, [(tree[1], 2)])]
+                >>> data2 = [(None, [(tree[1], 2)]), (None, [(tree[0], 2), (tree[2], 2)])]
+                >>> obj.get_component(*obj.get_leaf_matrices(data1, data2), 0)
+                ([0], [1])
+                >>>
+        """
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+        num_rows1, num_leaves = leaf_matrix1.shape
+        num_rows2 = leaf_matrix2.shape[0]
+        num_nodes = num_rows1 + num_rows2 + num_leaves
+        edges1 = leaf_matrix1.tocoo()
+        edges2 = leaf_matrix2.tocoo()
+        rows = array(list(edges1.row) + list(edges2.row + num_rows1), dtype=int64)
+        cols = array(list(edges1.col) + list(edges2.col), dtype=int64) + num_rows1 + num_rows2
+        graph = coo_matrix((ones(len(rows)), (rows, cols)), shape=(num_nodes, num_nodes))
+        _, labels = connected_components(graph, directed=False)
+        component = (labels == labels[idx]).nonzero()[0]
+        rows = component[component < num_rows1]
+        cols = component[(component >= num_rows1) & (component < num_rows1 + num_rows2)] - num_rows1
+        return rows.tolist(), cols.tolist()
+
+    def get_greedy_mapping(self, leaf_matrix1, leaf_matrix2, idx,
+                           max_assignment_size = MAX_ASSIGNMENT_SIZE):
+        """
+            This function matches the rows of leaf_matrix1 and of
+            leaf_matrix2(passed as arguments, see get_leaf_matrices)
+            greedily, taking the pairs in decreasing order of the cosine
+            similarity of their leaves, and returns the row of leaf_matrix2
+            matched to the row idx(passed as an argument) of leaf_matrix1,
+            or None if it is not matched. It is used instead of the hungarian
+            algorithm when the cost matrix has more than max_assignment_size
+            (passed as an argument) cells, and keeps at most
+            max_assignment_size pairs, i.e., the most similar pairs of every
+            row of leaf_matrix1, computing the similarities a block of rows
+            at a time so that the cost matrix is never built.
+            Parameters:
+                1. leaf_matrix1(type = scipy.sparse.csr_matrix)
+                2. leaf_matrix2(type = scipy.sparse.csr_matrix)
+                3. idx(type = int)
+                4. max_assignment_size(type = int)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> tree = fromstring('<div><p>a</p><p>b</p><p>c</p></div>')
+                >>> data1 = [(None, [(tree[0], 2)]), (None, [(tree[0], 2), (tree[1], 2)])]
+                >>> data2 = [(None, [(tree[0], 2)]), (None, [(tree[1], 2), (tree[2], 2)])]
+                >>> leaf_matrix1, leaf_matrix2 = obj.get_leaf_matrices(data1, data2)
+                >>> obj.get_greedy_mapping(leaf_matrix1, leaf_matrix2, 0), obj.get_greedy_mapping(leaf_matrix1, leaf_matrix2, 1)
+                (0, 1)
+                >>>
+        """
+        num_rows1 = leaf_matrix1.shape[0]
+        num_rows2 = leaf_matrix2.shape[0]
+        max_pairs_per_row = max(1, max_assignment_size // max(1, num_rows1))
+        block_size = max(1, max_assignment_size // max(1, num_rows2))
+        similarities = []
+        rows = []
+        cols = []
+        for block_start in range(0, num_rows1, block_size):
+            block = (leaf_matrix1[block_start:block_start + block_size] @ leaf_matrix2.T).tocsr()
+            block.sort_indices()
+            for i in range(block.shape[0]):
+                row_similarities = block.data[block.indptr[i]:block.indptr[i + 1]]
+                row_cols = block.indices[block.indptr[i]:block.indptr[i + 1]]
+                if len(row_similarities) > max_pairs_per_row:
+                    order = lexsort((row_cols, -row_similarities))[:max_pairs_per_row]
+                    row_similarities = row_similarities[order]
+                    row_cols = row_cols[order]
+                similarities.append(row_similarities)
+                cols.append(row_cols)
+                rows.append(full(len(row_cols), block_start + i))
+        if not similarities:
+            return None
+        similarities = concatenate(similarities)
+        rows = concatenate(rows)
+        cols = concatenate(cols)
+        matched_rows = set()
+        matched_cols = set()
+        for pair in lexsort((cols, rows, -similarities)).tolist():
+            row = int(rows[pair])
+            col = int(cols[pair])
+            if row in matched_rows or col in matched_cols:
+                continue
+            if row == idx:
+                return col
+            matched_rows.add(row)
+            matched_cols.add(col)
+        return None
+
+    def get_subtree_mapping(self, data1, data2, idx, assignment = 'sparse',
+                            max_assignment_size = MAX_ASSIGNMENT_SIZE):
+        """
+            This function returns the index of the tuple in data2 that is
+            matched to the tuple at idx in data1(passed as arguments) by
+            the minimum cost alignment of their features(see get_cost_matrix).
+            If assignment is 'dense', the hungarian algorithm is run on the
+            whole cost matrix. If assignment is 'sparse', it is only run on
+            the connected component of idx(see get_component), and if the
+            component has more than max_assignment_size(passed as an argument)
+            cells, the rows and columns are matched greedily instead(see
+            get_greedy_mapping). If idx shares no leaf with any tuple of data2,
+            the whole cost matrix is solved if it has at most
+            max_assignment_size cells, and idx is matched to the tuple at the
+            same position in data2(or at the last one) otherwise.
+            Parameters:
+                1. data1(type = list of tuples)
+                2. data2(type = list of tuples)
+                3. idx(type = int)
+                4. assignment(type = string)
+                5. max_assignment_size(type = int)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> tree = fromstring('<div><p>a</p><p>b</p><p>c</p></div>')
+                >>> data1 = [(None, [(tree[0], 2)]), (None, [(tree[1], 2)])]
+                >>> data2 = [(None, [(tree[1], 2)]), (None, [(tree[0], 2), (tree[2], 2)])]
+                >>> obj.get_subtree_mapping(data1, data2, 0), obj.get_subtree_mapping(data1, data2, 1)
+                (1, 0)
+                >>>
+        """
+        from scipy.optimize import linear_sum_assignment
+        leaf_matrix1, leaf_matrix2 = self.get_leaf_matrices(data1, data2)
+        col = None
+        if assignment == 'sparse':
+            rows, cols = self.get_component(leaf_matrix1, leaf_matrix2, idx)
+            if cols:
+                if len(rows)*len(cols) <= max_assignment_size:
+                    similarity_matrix = leaf_matrix1[rows] @ leaf_matrix2[cols].T
+                    row_ind, col_ind = linear_sum_assignment(-similarity_matrix.toarray())
+                    row_ind = row_ind.tolist()
+                    if rows.index(idx) in row_ind:
+                        col = cols[col_ind[row_ind.index(rows.index(idx))]]
+                else:
+                    col = self.get_greedy_mapping(leaf_matrix1[rows], leaf_matrix2[cols], rows.index(idx),
+                                                  max_assignment_size)
+                    if col is not None:
+                        col = cols[col]
+            if col is not None:
+                return col
+        if assignment == 'dense' or len(data1)*len(data2) <= max_assignment_size:
+            row_ind, col_ind = linear_sum_assignment(-(leaf_matrix1 @ leaf_matrix2.T).toarray())
+            row_ind = row_ind.tolist()
+            if idx in row_ind:
+                return int(col_ind[row_ind.index(idx)])
+        return min(idx, len(data2) - 1)
     
     def get_min_cost_mapping(self, cost_matrix):
         """
@@ -339,18 +927,641 @@ class HungarianHelperMethods:
                 >>> obj.get_min_cost_mapping(cost_matrix)
                 array([0, 2], dtype=int64)
         """
+        from scipy.optimize import linear_sum_assignment
         row_ind, col_ind = linear_sum_assignment(cost_matrix)
         return col_ind
 
 
-class Page(ParsingAndProcessing, HungarianHelperMethods):
+class TreeIndex:
+    """
+        This class holds the data derived from one tree that is reused
+        by every traversal of that tree. raw is tostring(root) and code is
+        its normalized form(see normalize_code). spans maps each node of
+        the tree to a tuple (raw_start, raw_end, code_start, code_end) such
+        that tostring(node) == raw[raw_start:raw_end], i.e., the string
+        representation of every node is a slice of one buffer instead of
+        a separate serialization. If nested is False(see has_namespaces),
+        the spans are disjoint instead of nested. search_nodes maps each
+        node to its SearchNode, search_spans holds the (code_start, code_end)
+        of the nodes in preorder, search_parents the position of their
+        parents(-1 for the root) and, if nested is False, search_levels the
+        positions of the nodes grouped by depth. They are filled only when
+        the tree is searched. char_positions maps each character of code to
+        the sorted array of its positions in code, so that the character
+        histogram of any node can be read from it(see get_excess_bounds)
+        instead of being stored with every node.
+        hashes maps each node to the hash of its normalized string
+        representation(see get_code_hash) and hash_paths maps each such
+        hash to the paths of the nodes having it, in preorder. They are
+        filled only when the tree is used for exact-match lookups.
+        search_candidates holds a SearchCandidate for every node in preorder
+        and search_paths the paths of these nodes. They are filled only when
+        the tree is searched by several processes. If compressed is True,
+        the index is built over the compressed view of root instead of root
+        itself(see get_compressed_tree_index), and its nodes are the nodes of
+        root that are kept in the compressed tree(see get_representative).
+        compact_tree is then the CompactTree of root(see compact_tree.py),
+        on which the compressed tree is traversed.
+    """
+    root = None
+    raw = None
+    code = None
+    spans = None
+    nested = True
+    search_nodes = None
+    search_spans = None
+    search_parents = None
+    search_levels = None
+    char_positions = None
+    hashes = None
+    hash_paths = None
+    search_candidates = None
+    search_paths = None
+    compressed = False
+    compact_tree = None
+
+    def __init__(self, root, compressed = False):
+        self.root = root
+        self.spans = dict()
+        self.compressed = compressed
+
+    def get_child(self, node, i):
+        child = node[i]
+        if self.compressed:
+            compact_tree = self.compact_tree
+            child = compact_tree.nodes[compact_tree.representatives[compact_tree.positions[child]]]
+        return child
+
+    def get_children(self, node):
+        children = list(node)
+        if self.compressed:
+            compact_tree = self.compact_tree
+            children = [compact_tree.nodes[compact_tree.representatives[compact_tree.positions[child]]]
+                        for child in children]
+        return children
+
+    def get_raw(self, node):
+        raw_start, raw_end, _, _ = self.spans[node]
+        return self.raw[raw_start:raw_end]
+
+    def get_code(self, node):
+        _, _, code_start, code_end = self.spans[node]
+        return self.code[code_start:code_end]
+
+    def get_char_positions(self):
+        if self.char_positions is None:
+            self.char_positions = dict()
+            codes = frombuffer(self.code.encode('utf-32-le'), dtype=uint32)
+            if len(codes) > 0:
+                order = argsort(codes, kind='stable').astype(uint32)
+                sorted_codes = codes[order]
+                boundaries = flatnonzero(diff(sorted_codes)) + 1
+                starts = concatenate(([0], boundaries))
+                for code, positions in zip(sorted_codes[starts].tolist(), split(order, boundaries)):
+                    self.char_positions[chr(code)] = positions
+        return self.char_positions
+
+
+class TreeIndexingMethods:
+    tree_indexes = None
+    compressed_tree_indexes = None
+
+    def get_tag_pieces(self, node):
+        """
+            This function returns a tuple (start_tag, end_tag) of byte
+            strings such that tostring(node) is start_tag followed by
+            tostring(child) for every child of node(passed as an argument),
+            followed by end_tag. start_tag contains the text of node and
+            end_tag contains its tail. Only node itself is serialized.
+            Parameters:
+                1. node(type = lxml.etree._Element)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> root = fromstring('<div><div id="a">text<p>child</p></div>tail</div>')
+                >>> obj.get_tag_pieces(root[0])
+                (b'<div id="a">text', b'</div>tail')
+                >>>
+        """
+        shallow = node.makeelement(node.tag, node.attrib)
+        shallow.text = node.text if node.text is not None else ''
+        code = tostring(shallow)
+        idx = code.rindex(b'</')
+        start_tag = code[:idx]
+        end_tag = code[idx:]
+        if node.tail is not None:
+            shallow.tail = node.tail
+            end_tag = end_tag + tostring(shallow)[len(code):]
+        return start_tag, end_tag
+
+    def build_serialization_index(self, node, raw_pieces, spans, offset, compressed = False):
+        """
+            This function serializes the tree rooted at node(passed as an
+            argument) bottom-up into raw_pieces and populates spans such that
+            spans[N] = (raw_start, raw_end) for every node N of the tree. Each
+            node contributes only its own tags, text and tail, so the whole
+            tree is serialized once. offset is a list of size exactly 1 which
+            holds the total length of raw_pieces. If compressed is True, the
+            nodes having exactly one child are skipped along with their tags,
+            text and tail, so that the compressed form of the tree(see
+            get_compressed_tree) is serialized without being built.
+            Parameters:
+                1. node(type = lxml.etree._Element)
+                2. raw_pieces(type = list)
+                3. spans(type = dict)
+                4. offset(type = list of size exactly 1)
+                5. compressed(type = bool)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> root = fromstring('<div><p>child1</p> <p>child2</p></div>')
+                >>> raw_pieces, spans = [], {}
+                >>> obj.build_serialization_index(root, raw_pieces, spans, [0])
+                >>> b''.join(raw_pieces)
+                b'<div><p>child1</p> <p>child2</p></div>'
+                >>> spans[root[1]]
+                (19, 32)
+                >>>
+        """
+        if compressed:
+            node = self.get_representative(node)
+        raw_start = offset[0]
+        n = len(node)
+        if n == 0:
+            piece = tostring(node)
+            raw_pieces.append(piece)
+            offset[0] += len(piece)
+        else:
+            start_tag, end_tag = self.get_tag_pieces(node)
+            raw_pieces.append(start_tag)
+            offset[0] += len(start_tag)
+            for i in range(n):
+                self.build_serialization_index(node[i], raw_pieces, spans, offset, compressed)
+            raw_pieces.append(end_tag)
+            offset[0] += len(end_tag)
+        spans[node] = (raw_start, offset[0])
+
+    def get_code_offsets(self, raw):
+        """
+            This function returns a list L of size len(raw) + 1 such that
+            L[i] is the length of the normalized form(see normalize_code) of
+            raw[:i], where raw(passed as an argument) is the output of tostring.
+            tostring escapes every non-ASCII character, so bytes and characters
+            coincide, and normalizing removes whole <br/> tags and single
+            whitespace characters, so the normalized form of any node is the
+            slice of the normalized buffer between the mapped offsets of its span.
+            Parameters:
+                1. raw(type = bytes)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> obj.get_code_offsets(b'<p> a<br/></p>')
+                [0, 1, 2, 3, 3, 4, 4, 4, 4, 4, 4, 5, 6, 7, 8]
+                >>>
+        """
+        keep = ones(len(raw), dtype=bool)
+        keep[isin(frombuffer(raw, dtype=uint8), WHITESPACE_BYTES)] = False
+        for match in finditer(BR_PATTERN.encode('ascii'), raw):
+            keep[match.start():match.end()] = False
+        code_offsets = zeros(len(raw) + 1, dtype=int64)
+        cumsum(keep, out=code_offsets[1:])
+        return code_offsets.tolist()
+
+    def get_tree_index(self, tree, compressed = False):
+        """
+            This function returns the TreeIndex of tree(passed as an
+            argument), building its serialization index on first use.
+            The indexes of the MAX_TREE_INDEXES most recently used trees
+            are kept. Trees must not be modified once indexed. If compressed
+            is True, the index of the compressed view of tree(see
+            get_compressed_tree_index) is returned instead, which is kept
+            apart from the index of tree itself.
+            Parameters:
+                1. tree(type = lxml.etree._Element)
+                2. compressed(type = bool)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> root = fromstring('<div><p>child1</p> <p>child2</p></div>')
+                >>> index = obj.get_tree_index(root)
+                >>> index.get_raw(root[0]), index.get_code(root[0])
+                (b'<p>child1</p> ', '<p>child1</p>')
+                >>>
+        """
+        if self.tree_indexes is None:
+            self.tree_indexes = OrderedDict()
+        if self.compressed_tree_indexes is None:
+            self.compressed_tree_indexes = OrderedDict()
+        if compressed:
+            tree_indexes = self.compressed_tree_indexes
+        else:
+            tree_indexes = self.tree_indexes
+        if tree in tree_indexes:
+            tree_indexes.move_to_end(tree)
+            return tree_indexes[tree]
+        raw_pieces = []
+        raw_spans = dict()
+        if compressed:
+            compact_tree = get_compact_tree(tree)
+            index = TreeIndex(compact_tree.nodes[compact_tree.representatives[0]], compressed)
+            index.compact_tree = compact_tree
+            self.build_serialization_index(tree, raw_pieces, raw_spans, [0], compressed)
+        elif self.has_namespaces(tree):
+            index = TreeIndex(tree)
+            index.nested = False
+            offset = 0
+            for node in tree.iter():
+                piece = tostring(node)
+                raw_pieces.append(piece)
+                raw_spans[node] = (offset, offset + len(piece))
+                offset += len(piece)
+        else:
+            index = TreeIndex(tree)
+            self.build_serialization_index(tree, raw_pieces, raw_spans, [0])
+        index.raw = b''.join(raw_pieces)
+        index.code = self.normalize_code(index.raw.decode('utf-8'))
+        code_offsets = self.get_code_offsets(index.raw)
+        for node, (raw_start, raw_end) in raw_spans.items():
+            index.spans[node] = (raw_start, raw_end,
+                                 code_offsets[raw_start], code_offsets[raw_end])
+        tree_indexes[tree] = index
+        if len(tree_indexes) > MAX_TREE_INDEXES:
+            tree_indexes.popitem(last=False)
+        return index
+
+    def get_code_hash(self, code, code_hash = 0):
+        """
+            This function returns the polynomial hash of code(passed as an
+            argument) modulo HASH_MODULUS, continuing from code_hash, which
+            is the hash of a preceding string. Since the hash of a
+            concatenation can be computed from the hashes of its parts(see
+            build_merkle_index), nodes can be hashed bottom-up while equal
+            strings always get equal hashes.
+            Parameters:
+                1. code(type = string)
+                2. code_hash(type = int)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> obj.get_code_hash('<p>ab</p>') == obj.get_code_hash('ab</p>', obj.get_code_hash('<p>'))
+                True
+                >>>
+        """
+        for ch in code:
+            code_hash = (code_hash * HASH_BASE + ord(ch)) % HASH_MODULUS
+        return code_hash
+
+    def build_merkle_index(self, node, index, path):
+        """
+            This function populates index.hashes and index.hash_paths(see
+            TreeIndex) for the tree rooted at node(passed as an argument),
+            whose path in index.root is path, and returns the hash of node.
+            The hash of a node is combined, Merkle-style, from the hash of its
+            own start tag and text, the hashes of its children and the hash of
+            its own end tag and tail, so every character is hashed only once.
+            The children of a node are read through index.get_child, so the
+            paths of a compressed index are paths in the compressed tree.
+            Parameters:
+                1. node(type = lxml.etree._Element)
+                2. index(type = TreeIndex)
+                3. path(type = list)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> root = fromstring('<div><p>ab</p><p> ab </p></div>')
+                >>> index = obj.get_tree_index(root)
+                >>> index.hashes, index.hash_paths = {}, {}
+                >>> node_hash = obj.build_merkle_index(root, index, [])
+                >>> index.hash_paths[obj.get_code_hash('<p>ab</p>')]
+                [[0], [1]]
+                >>>
+        """
+        _, _, code_start, code_end = index.spans[node]
+        n = len(node)
+        if n == 0 or not index.nested:
+            node_hash = self.get_code_hash(index.code[code_start:code_end])
+        else:
+            first_child_start = index.spans[index.get_child(node, 0)][2]
+            node_hash = self.get_code_hash(index.code[code_start:first_child_start])
+        for i in range(n):
+            path.append(i)
+            child = index.get_child(node, i)
+            child_hash = self.build_merkle_index(child, index, path)
+            path.pop()
+            if index.nested:
+                child_start, child_end = index.spans[child][2:]
+                node_hash = (node_hash * pow(HASH_BASE, child_end - child_start,
+                                             HASH_MODULUS) + child_hash) % HASH_MODULUS
+        if n > 0 and index.nested:
+            last_child_end = index.spans[index.get_child(node, n - 1)][3]
+            node_hash = self.get_code_hash(index.code[last_child_end:code_end],
+                                           node_hash)
+        index.hashes[node] = node_hash
+        index.hash_paths.setdefault(node_hash, []).append(path[:])
+        return node_hash
+
+    def get_merkle_index(self, tree, compressed = False):
+        """
+            This function returns the TreeIndex of tree(passed as an
+            argument) with its hashes and hash_paths(see build_merkle_index)
+            built. If compressed is True, the index of the compressed view of
+            tree(see get_compressed_tree_index) is returned instead.
+            Parameters:
+                1. tree(type = lxml.etree._Element)
+                2. compressed(type = bool)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> root = fromstring('<div><div>child1</div><div>child2</div></div>')
+                >>> index = obj.get_merkle_index(root)
+                >>> index.hash_paths[index.hashes[root[1]]]
+                [[1]]
+                >>>
+        """
+        if compressed:
+            index = self.get_compressed_tree_index(tree)
+        else:
+            index = self.get_tree_index(tree)
+        if index.hashes is None:
+            index.hashes = dict()
+            index.hash_paths = dict()
+            self.build_merkle_index(index.root, index, [])
+            for paths in index.hash_paths.values():
+                paths.sort()
+        return index
+
+    def get_node(self, tree, path, compressed = False):
+        """
+            This function returns the node present at path = path
+            (passed as an argument) in tree(passed as an argument), or in
+            the compressed view of tree if compressed is True.
+            Parameters:
+                1. tree(type = lxml.etree._Element)
+                2. path(type = list/list like)
+                3. compressed(type = bool)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> tree = fromstring('<div><div>child1</div><div><div>child2</div></div></div>')
+                >>> tostring(obj.get_node(tree, [1, 0]))
+                b'<div>child2</div>'
+                >>>
+        """
+        if compressed:
+            tree = self.get_representative(tree)
+        for idx in path:
+            tree = tree[idx]
+            if compressed:
+                tree = self.get_representative(tree)
+        return tree
+
+    def get_exact_match_path(self, subtree, tree):
+        """
+            This function returns the path of the first node, in preorder, of
+            tree(passed as an argument) whose normalized string representation
+            is equal to that of subtree(passed as an argument), i.e., whose edit
+            distance(see get_edit_distance) to subtree is 0. If there is no such
+            node, it returns None. Nodes are looked up by hash and only nodes
+            having the same hash are compared.
+            Parameters:
+                1. subtree(type = lxml.etree._Element)
+                2. tree(type = lxml.etree._Element)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> tree = fromstring('<div><div>child1</div><div>child2</div></div>')
+                >>> obj.get_exact_match_path(fromstring('<div> child2 </div>'), tree)
+                [1]
+                >>> obj.get_exact_match_path(fromstring('<div>child3</div>'), tree) is None
+                True
+                >>>
+        """
+        code = self.normalize_code(tostring(subtree).decode('utf-8'))
+        return self.get_hash_match_path(tree, self.get_code_hash(code), code)
+
+    def get_hash_match_path(self, tree, code_hash, code):
+        """
+            This function returns the path of the first node, in preorder,
+            of tree(passed as an argument) whose normalized string
+            representation is code(passed as an argument), or None if there
+            is no such node. code_hash must be the hash of code.
+            Parameters:
+                1. tree(type = lxml.etree._Element)
+                2. code_hash(type = int)
+                3. code(type = string)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> tree = fromstring('<div><div>child1</div><div>child2</div></div>')
+                >>> code = '<div>child2</div>'
+                >>> obj.get_hash_match_path(tree, obj.get_code_hash(code), code)
+                [1]
+                >>>
+        """
+        index = self.get_merkle_index(tree)
+        for path in index.hash_paths.get(code_hash, []):
+            if index.get_code(self.get_node(tree, path)) == code:
+                return path
+        return None
+
+    def get_search_node(self, position, length, children = ()):
+        """
+            This function returns a SearchNode for the node at
+            position(passed as an argument) in preorder, whose normalized
+            string representation has length(passed as an argument)
+            characters and whose children have the SearchNodes passed as
+            children. A SearchNode holds the position and length of the
+            node, and the size and maximum length over the subtree rooted
+            at the node, which are used to bound the edit distance of every
+            node in that subtree at once. Character histograms are not kept
+            with every node, but read for a query from the TreeIndex(see
+            get_excess_bounds).
+            Parameters:
+                1. position(type = int)
+                2. length(type = int)
+                3. children(type = list of SearchNode objects)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> node = obj.get_search_node(0, 17)
+                >>> node.length, node.subtree_size, node.subtree_max_length
+                (17, 1, 17)
+                >>>
+        """
+        subtree_size = 1
+        subtree_max_length = length
+        for child in children:
+            subtree_size += child.subtree_size
+            subtree_max_length = max(subtree_max_length,
+                                     child.subtree_max_length)
+        return SearchNode(position, length, subtree_size, subtree_max_length)
+
+    def build_search_index(self, root, index, parent = -1):
+        """
+            This function populates index.search_nodes(index is passed as
+            an argument) such that its keys are the nodes of the tree whose
+            root is passed as an argument and values are the corresponding
+            SearchNode objects, and appends the span and the position of
+            the parent(passed as an argument) of every node, in preorder, to
+            index.search_spans and index.search_parents. Children are indexed
+            before their parent. The SearchNode of root is returned.
+            Parameters:
+                1. root(type = lxml.etree._Element)
+                2. index(type = TreeIndex)
+                3. parent(type = int)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> root = fromstring('<div><div>child1</div><div>child2</div></div>')
+                >>> index = obj.get_tree_index(root)
+                >>> index.search_nodes, index.search_spans, index.search_parents = {}, [], []
+                >>> obj.build_search_index(root, index).subtree_size, index.search_parents
+                (3, [-1, 0, 0])
+                >>>
+        """
+        position = len(index.search_spans)
+        _, _, code_start, code_end = index.spans[root]
+        index.search_spans.append((code_start, code_end))
+        index.search_parents.append(parent)
+        children = []
+        n = len(root)
+        for i in range(n):
+            children.append(self.build_search_index(root[i], index, position))
+        index.search_nodes[root] = self.get_search_node(position, code_end - code_start, children)
+        return index.search_nodes[root]
+
+    def get_search_index(self, tree):
+        """
+            This function returns the TreeIndex of tree(passed as an
+            argument) with its search_nodes(see build_search_index) built,
+            so that searching the same tree for many subtrees, as rule_dfs
+            does, builds the index only once.
+            Parameters:
+                1. tree(type = lxml.etree._Element)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> root = fromstring('<div><div>child1</div><div>child2</div></div>')
+                >>> index = obj.get_search_index(root)
+                >>> index is obj.get_search_index(root)
+                True
+                >>>
+        """
+        index = self.get_tree_index(tree)
+        if index.search_nodes is None:
+            index.search_nodes = dict()
+            index.search_spans = []
+            index.search_parents = []
+            self.build_search_index(tree, index)
+            index.search_spans = array(index.search_spans, dtype=int64)
+            index.search_parents = array(index.search_parents, dtype=int64)
+            if not index.nested:
+                depth = [0]*len(index.search_parents)
+                for position, parent in enumerate(index.search_parents.tolist()[1:], 1):
+                    depth[position] = depth[parent] + 1
+                depth = array(depth, dtype=int64)
+                order = argsort(depth, kind='stable')
+                index.search_levels = split(order, cumsum(bincount(depth))[:-1])
+        return index
+
+    def get_excess_bounds(self, index, histogram):
+        """
+            This function returns a tuple (node_excess, subtree_excess) of
+            lists indexed by the positions of the nodes of index(passed as
+            an argument, see get_search_index) in preorder, such that
+            node_excess[i] is the number of characters of histogram(passed
+            as an argument), the character histogram of a query, that are
+            not matched by the characters of node i(see get_excess), and
+            subtree_excess[i] is the same for the element-wise maximum of
+            the histograms over the subtree of node i. Both are lower bounds
+            on the edit distance between the query and the nodes. The count
+            of every character of the query in every node is read from
+            index.get_char_positions for all the nodes at once. If the
+            spans of index are nested, the string representation of every
+            node is contained in that of its ancestors, so subtree_excess
+            is node_excess.
+            Parameters:
+                1. index(type = TreeIndex)
+                2. histogram(type = dict/collections.Counter)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> root = fromstring('<div><p>ab</p><p>bbb</p></div>')
+                >>> obj.get_excess_bounds(obj.get_search_index(root), Counter('<p>abc</p>'))
+                ([1, 1, 2], [1, 1, 2])
+                >>>
+        """
+        char_positions = index.get_char_positions()
+        code_starts = index.search_spans[:, 0]
+        code_ends = index.search_spans[:, 1]
+        n = len(code_starts)
+        node_excess = zeros(n, dtype=int64)
+        subtree_excess = zeros(n, dtype=int64)
+        for ch, count in histogram.items():
+            positions = char_positions.get(ch)
+            if positions is None:
+                counts = zeros(n, dtype=int64)
+            else:
+                counts = (searchsorted(positions, code_ends) -
+                          searchsorted(positions, code_starts))
+            node_excess += maximum(count - counts, 0)
+            if not index.nested:
+                for level in reversed(index.search_levels[1:]):
+                    maximum.at(counts, index.search_parents[level], counts[level])
+                subtree_excess += maximum(count - counts, 0)
+        node_excess = node_excess.tolist()
+        if index.nested:
+            return node_excess, node_excess
+        return node_excess, subtree_excess.tolist()
+
+
+class Page(ParsingAndProcessing, TreeIndexingMethods, HungarianHelperMethods):
     path_to_subtree = None
     curr_path = None
     rule_gen_path = None
+    query_code = None
+    query_excess = None
+    query_subtree_excess = None
+    num_pruned_nodes = None
+    num_compared_nodes = None
+    search_executor = None
+    search_workers = None
+    search_bound = None
     
     def __init__(self, path_to_data, parser):
         ParsingAndProcessing.__init__(self, path_to_data, parser)
-        
+
+    def release_artifacts(self, *names):
+        """
+            This function drops the cached artifacts named by
+            names(passed as arguments), or all of them if no name
+            is passed, along with the indexes built over the
+            released trees. See ParsingAndProcessing.release_artifacts.
+            Parameters:
+                1. names(type = strings among 'broken_code', 'code',
+                   'tree', 'tree_without_attr' and 'layout_signature')
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> index = obj.get_tree_index(obj.tree_without_attr)
+                >>> obj.release_artifacts()
+                >>> obj.tree_indexes is None
+                True
+                >>>
+        """
+        if not names:
+            self.tree_indexes = None
+            self.compressed_tree_indexes = None
+        elif self.tree_indexes is not None:
+            for name in ['tree', 'tree_without_attr']:
+                if name in names and name in self.artifacts:
+                    tree = self.artifacts[name]
+                    if name == 'tree':
+                        tree = tree.getroot()
+                    self.tree_indexes.pop(tree, None)
+                    self.compressed_tree_indexes.pop(tree, None)
+        ParsingAndProcessing.release_artifacts(self, *names)
+
     def retrieve_subtree(self, tree, path, cpy = True):
         """
             This function returns the subtree of tree(passed as an argument)
@@ -407,17 +1618,26 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
         tree[path[n - 1]] = deepcopy(subtree)
         return ptr
 
-    def dfs(self, root, mn, str_subtree):
+    def dfs(self, root, mn, str_subtree, index = None):
         """
             This function modifies self.path_to_subtree such that after this
             function executes, it contains the path to that subtree of the
             tree(whose root is passed as an argument)which has the smallest edit
             distance to the subtree passed as a string in the argument str_subtree.
             It modifies mn such that mn[0] contains the smallest edit distance.
+            If index(see get_search_index) is passed, self.query_code must be
+            the normalized str_subtree[0] and self.query_excess and
+            self.query_subtree_excess its lower bounds(see get_excess_bounds),
+            the string representation of each node is read from
+            the index instead of being serialized again, and nodes and whole subtrees whose
+            lower bound on the edit distance is not smaller than mn[0] are
+            skipped and counted in self.num_pruned_nodes. The search stops as
+            soon as an exact match is found.
             Parameters:
                 1. root(type = lxml.etree._Element)
                 2. mn(type = list of size exactly 1)
                 3. str_subtree(type = list of size exactly 1 and str_subtree[0] is a string)
+                4. index(type = TreeIndex)
             Example:
                 >>> path = 'Examples/Hello_World.html'
                 >>> obj = Page(path, 'html')
@@ -431,27 +1651,56 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
                 [0] [1]
                 >>>
         """
-        edit_dis = self.get_edit_distance(str_subtree[0],
-                                          tostring(root,
-                                          pretty_print=False).decode('utf-8'))
+        if mn[0] == 0:
+            return
+        if index is None:
+            edit_dis = self.get_edit_distance(str_subtree[0],
+                                              tostring(root,
+                                              pretty_print=False).decode('utf-8'),
+                                              max_distance = mn[0] - 1)
+        else:
+            node = index.search_nodes[root]
+            query_length = len(self.query_code)
+            subtree_lower_bound = max(query_length - node.subtree_max_length,
+                                      self.query_subtree_excess[node.position])
+            if subtree_lower_bound >= mn[0]:
+                self.num_pruned_nodes += node.subtree_size
+                return
+            node_excess = self.query_excess[node.position]
+            if (abs(query_length - node.length) >= mn[0] or
+                max(node_excess, node_excess - query_length + node.length) >= mn[0]):
+                self.num_pruned_nodes += 1
+                edit_dis = inf
+            else:
+                self.num_compared_nodes += 1
+                edit_dis = get_bounded_edit_distance(self.query_code,
+                                                     index.get_code(root),
+                                                     max_distance = mn[0] - 1)
         if(edit_dis < mn[0]):
             mn[0] = edit_dis
             self.path_to_subtree = self.curr_path[:]
         n = len(root)
         for i in range(n):
             self.curr_path.append(i)
-            self.dfs(root[i], mn, str_subtree)
+            self.dfs(root[i], mn, str_subtree, index)
             self.curr_path.pop()
 
-    def get_subtree_path(self, subtree, tree):
+    def get_subtree_path(self, subtree, tree, workers = None):
         """
             This function returns the path to a subtree of the tree(passed as argument)
             such that edit distance between its string representation and the string
             representation of subtree(passed as an argument) is minimum. This function
-            also returns this minimum edit distance.
+            also returns this minimum edit distance. Nodes which provably cannot beat
+            the best match found so far are skipped, and their number is stored in
+            self.num_pruned_nodes. If several subtrees have the minimum edit distance,
+            the first one in preorder is returned. If workers(passed as an argument)
+            is greater than 1, the nodes of tree are searched by that many processes
+            (see get_subtree_path_in_workers), with the same result. The processes
+            are kept on the page for its later searches(see get_search_executor).
             Parameters:
                 1. subtree(type = lxml.etree._Element)
                 2. tree(type = lxml.etree._Element)
+                3. workers(type = int)
             Example:
                 >>> path = 'Examples/Hello_World.html'
                 >>> obj = Page(path, 'html')
@@ -459,19 +1708,168 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
                 >>> root_tree = fromstring('<div><div>child1</div><div>child2</div></div>')
                 >>> obj.get_subtree_path(root_subtree, root_tree)
                 ([1], 0)
+                >>> obj.num_pruned_nodes
+                0
                 >>>
         """
         self.path_to_subtree = []
         self.curr_path = []
+        self.num_pruned_nodes = 0
+        self.num_compared_nodes = 0
         mn = [inf]
         str_subtree = str(tostring(subtree,
                           pretty_print=False).decode('utf-8'))
+        self.query_code = self.normalize_code(str_subtree)
+        index = self.get_search_index(tree)
+        self.query_excess, self.query_subtree_excess = self.get_excess_bounds(index,
+                                                                              Counter(self.query_code))
+        if workers is not None and workers > 1:
+            return self.get_subtree_path_in_workers(tree, workers)
         str_subtree = [str_subtree]
-        self.dfs(tree, mn, str_subtree)
+        self.dfs(tree, mn, str_subtree, index)
         self.curr_path = []
         return (self.path_to_subtree, mn[0])
 
-    def rule_dfs(self, root, tree, rules):
+    def build_search_candidates(self, root, index, paths, candidates):
+        """
+            This function appends to candidates(passed as an argument)
+            a SearchCandidate for every node of the tree whose root is
+            passed as an argument, in preorder, and to paths(passed as an
+            argument) the path of each of these nodes, starting with
+            self.curr_path for root. The position of a candidate is its
+            position in preorder and its end is the position following the
+            last node of its subtree, so that the subtree of a candidate is
+            made of the candidates from position up to end.
+            Parameters:
+                1. root(type = lxml.etree._Element)
+                2. index(type = TreeIndex, see get_search_index)
+                3. paths(type = list)
+                4. candidates(type = list)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> root = fromstring('<div><div>child1</div><div>child2</div></div>')
+                >>> obj.curr_path = []
+                >>> paths, candidates = [], []
+                >>> obj.build_search_candidates(root, obj.get_search_index(root), paths, candidates)
+                >>> paths
+                [[], [0], [1]]
+                >>> [(candidate.position, candidate.end) for candidate in candidates]
+                [(0, 3), (1, 2), (2, 3)]
+                >>>
+        """
+        position = len(candidates)
+        paths.append(self.curr_path[:])
+        candidates.append(None)
+        n = len(root)
+        for i in range(n):
+            self.curr_path.append(i)
+            self.build_search_candidates(root[i], index, paths, candidates)
+            self.curr_path.pop()
+        _, _, code_start, code_end = index.spans[root]
+        candidates[position] = SearchCandidate(position, len(candidates), code_start,
+                                               code_end, index.search_nodes[root])
+
+    def get_search_executor(self, workers):
+        """
+            This function returns the pool of workers(passed as an
+            argument) processes used by get_subtree_path_in_workers,
+            which is started on the first call and kept on the page, so
+            that the processes are started once for all the searches of
+            the page. A new pool is started if the number of workers
+            changes. The processes share self.search_bound(see
+            init_search_worker). The pool is shut down by
+            close_search_executor.
+            Parameters:
+                1. workers(type = int)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> obj.get_search_executor(2) is obj.get_search_executor(2)
+                True
+                >>> obj.close_search_executor()
+                >>>
+        """
+        if self.search_executor is not None and self.search_workers != workers:
+            self.close_search_executor()
+        if self.search_executor is None:
+            self.search_bound = Array('d', [inf, inf])
+            self.search_executor = ProcessPoolExecutor(max_workers = workers,
+                                                       initializer = init_search_worker,
+                                                       initargs = (self.search_bound,))
+            self.search_workers = workers
+        return self.search_executor
+
+    def close_search_executor(self):
+        """
+            This function shuts down the pool of processes started by
+            get_search_executor, if any.
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> obj.close_search_executor()
+                >>> obj.search_executor is None
+                True
+                >>>
+        """
+        if self.search_executor is not None:
+            self.search_executor.shutdown()
+        self.search_executor = None
+        self.search_workers = None
+        self.search_bound = None
+
+    def get_subtree_path_in_workers(self, tree, workers):
+        """
+            This function returns the same as get_subtree_path for the
+            query in self.query_code, self.query_excess and
+            self.query_subtree_excess, but the nodes of
+            tree(passed as an argument) are split into workers(passed as an
+            argument) shards, node i going to shard i % workers, which are
+            searched by the processes of the pool of the page(see
+            get_search_executor and search_shard). Every task is sent the
+            normalized string representation of tree and only the
+            candidates(see build_search_candidates) of its shard, with
+            their lower bounds. The processes share the best (edit
+            distance, position in preorder) found so far, so that each of
+            them prunes nodes using the matches found by the others. The
+            results of the shards are merged by taking the smallest edit
+            distance and then the smallest position, which is the first
+            subtree in preorder, as in dfs.
+            Parameters:
+                1. tree(type = lxml.etree._Element)
+                2. workers(type = int)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> root_subtree = fromstring('<div>child2</div>')
+                >>> root_tree = fromstring('<div><div>child1</div><div>child2</div></div>')
+                >>> obj.get_subtree_path(root_subtree, root_tree, workers = 2)
+                ([1], 0)
+                >>> obj.close_search_executor()
+                >>>
+        """
+        index = self.get_search_index(tree)
+        if index.search_candidates is None:
+            index.search_paths = []
+            index.search_candidates = []
+            self.curr_path = []
+            self.build_search_candidates(tree, index, index.search_paths,
+                                         index.search_candidates)
+        executor = self.get_search_executor(workers)
+        with self.search_bound.get_lock():
+            self.search_bound[0], self.search_bound[1] = inf, inf
+        shards = range(workers)
+        results = list(executor.map(search_shard, [self.query_code]*workers, [index.code]*workers,
+                                    [index.search_candidates[shard::workers] for shard in shards],
+                                    [self.query_excess[shard::workers] for shard in shards],
+                                    [self.query_subtree_excess[shard::workers] for shard in shards]))
+        mn, position = min((result[0], result[1]) for result in results)
+        self.num_pruned_nodes = sum(result[2] for result in results)
+        self.num_compared_nodes = sum(result[3] for result in results)
+        self.path_to_subtree = index.search_paths[position]
+        return (self.path_to_subtree, mn)
+
+    def rule_dfs(self, root, tree, rules, query_index = None):
         """
             This function populates rules(passed as an argument)
             with tuples of the form (list_path1, list_path2) where
@@ -479,11 +1877,17 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
             and list_path2 is a path in tree(passed as an argument)
             such that the string representation of the subtree present
             on list_path1 is equal to the string representation of the
-            subtree present on list_path2.
+            subtree present on list_path2. Matching subtrees are looked
+            up by hash(see get_hash_match_path) instead of searching
+            tree for the closest subtree. The hash and the normalized
+            string representation of every node of root are read from
+            query_index, the TreeIndex(see get_merkle_index) of the query
+            tree containing root, which is built from root if it is None.
             Parameters:
                 1. root(type = lxml.etree._Element)
                 2. tree(type = lxml.etree._Element)
                 3. rules(type = list/list like)
+                4. query_index(type = TreeIndex)
             Example:
                 >>> path = 'Examples/Hello_World.html'
                 >>> obj = Page(path, 'html')
@@ -496,14 +1900,17 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
                 [([1], [0])]
                 >>> 
         """
-        path_to_subtree, mn = self.get_subtree_path(root, tree)
-        if mn == 0:
+        if query_index is None:
+            query_index = self.get_merkle_index(root)
+        path_to_subtree = self.get_hash_match_path(tree, query_index.hashes[root],
+                                                   query_index.get_code(root))
+        if path_to_subtree is not None:
             rules.append((self.rule_gen_path[:], path_to_subtree[:]))
             return
         n = len(root)
         for i in range(n):
             self.rule_gen_path.append(i)
-            self.rule_dfs(root[i], tree, rules)
+            self.rule_dfs(root[i], tree, rules, query_index)
             self.rule_gen_path.pop()
 
     def generate_rules(self, subtree, tree):
@@ -514,6 +1921,8 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
             in tree(passed as an argument) such that the string
             representation of the subtree present on list_path1 is equal
             to the string representation of the subtree present on list_path2.
+            Both trees are indexed once(see get_merkle_index), so every
+            node of either tree is serialized and hashed once.
             Parameters:
                 1. subtree(type = lxml.etree._Element)
                 2. tree(type = lxml.etree._Element)
@@ -528,7 +1937,7 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
         """
         rules = []
         self.rule_gen_path = []
-        self.rule_dfs(subtree, tree, rules)
+        self.rule_dfs(subtree, tree, rules, self.get_merkle_index(subtree))
         return rules
 
     def get_repaired_subtree(self, rules, query_tree, tree):
@@ -536,9 +1945,14 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
             This function uses rules(passed as an argument) to
             repair query_tree(passed as an argument) and returns
             the repaired query_tree. To do this, for each tuple t
-            in rules, it calls appropriate function to replace the
-            subtree present at path t[0] in query_treewith the subtree
-            present at path t[1] in tree(passed as an argument).
+            in rules, in order, it replaces the subtree present at
+            path t[0] in query_tree with a copy of the subtree present
+            at path t[1] in tree(passed as an argument). query_tree is
+            copied once and the rules are applied to the copy in place,
+            instead of copying it once per rule(see assign), so the result
+            is the same as assigning the rules one by one. The subtrees of
+            tree are looked up before any subtree is replaced, and the
+            subtrees are replaced as assign_subtrees does.
             Parameters:
                 1. rules(type = list of tuples)
                 2. query_tree(type = lxml.etree._ElementTree)
@@ -554,10 +1968,10 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
                 b'<div><div>child2</div><div>child1</div></div>'
                 >>> 
         """
-        for rule in rules:
-            retrieved_subtree = self.retrieve_subtree(tree, rule[1])
-            query_tree = self.assign(query_tree, retrieved_subtree, rule[0])
-        return query_tree
+        if len(rules) == 0:
+            return query_tree
+        retrieved_subtrees = [self.retrieve_subtree(tree, rule[1], cpy = False) for rule in rules]
+        return assign_subtrees(query_tree, [rule[0] for rule in rules], retrieved_subtrees)
 
     def compress_tree(self, tree, parent, idx_of_child, orig_tree, dic):
         """
@@ -623,16 +2037,94 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
         compressed_tree = deepcopy(tree)
         compressed_tree = self.compress_tree(compressed_tree, -1, 0, tree, dic)
         return compressed_tree, dic
-    
-    def get_k_nearest_leaves(self, subtree, k):
+
+    def get_representative(self, node):
+        """
+            This function returns the node that stands for node(passed
+            as an argument) in the compressed tree(see get_compressed_tree),
+            i.e., the first node that does not have exactly one child on the
+            way down from node. Every node not having exactly one child is
+            kept in the compressed tree.
+            Parameters:
+                1. node(type = lxml.etree._Element)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> tree = fromstring('<div><div><div><div>child1</div></div></div><div>child2</div></div>')
+                >>> tostring(obj.get_representative(tree[0]))
+                b'<div>child1</div>'
+                >>>
+        """
+        while len(node) == 1:
+            node = node[0]
+        return node
+
+    def get_parent(self, node, compressed = False):
+        """
+            This function returns the parent of node(passed as an
+            argument), or its parent in the compressed tree, i.e., its
+            first ancestor that does not have exactly one child, if
+            compressed is True. None is returned if there is no such node.
+            Parameters:
+                1. node(type = lxml.etree._Element)
+                2. compressed(type = bool)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> tree = fromstring('<div><div><div><div>child1</div></div></div><div>child2</div></div>')
+                >>> obj.get_parent(tree[0][0][0], compressed = True) is tree
+                True
+                >>>
+        """
+        parent = node.getparent()
+        if compressed:
+            while parent is not None and len(parent) == 1:
+                parent = parent.getparent()
+        return parent
+
+    def get_compressed_tree_index(self, tree):
+        """
+            This function returns the TreeIndex of the compressed view
+            of tree(passed as an argument), i.e., of the compressed tree
+            (see get_compressed_tree) read from tree itself without being
+            built. The nodes of the view are the nodes of tree that are
+            kept in the compressed tree(see get_representative), the child
+            i of a node in the view is the representative of its child i in
+            tree, and its string representation is that of the corresponding
+            node of the compressed tree. The index is built once per tree, so
+            that mapping the paths of many rules and subtrees between the same
+            trees, as auto_repair does, compresses each tree only once.
+            Parameters:
+                1. tree(type = lxml.etree._Element)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> tree = fromstring('<div><div><div><div>child1</div></div></div><div>child2</div></div>')
+                >>> index = obj.get_compressed_tree_index(tree)
+                >>> index.get_raw(index.root)
+                b'<div><div>child1</div><div>child2</div></div>'
+                >>> index.get_child(index.root, 0) is tree[0][0][0]
+                True
+                >>>
+        """
+        return self.get_tree_index(tree, compressed = True)
+
+    def get_k_nearest_leaves(self, subtree, k, compressed = False, compact_tree = None):
         """
             This function returns a list of tuples of type (leaf, distance_from_subtree).
             The leaves returned by this function are the k nearest leaves to the subtree.
             This function does a Breadth First Search from the root of the subtree until
-            the  k nearest leaves are found.
+            the  k nearest leaves are found. If compressed is True, the search is done
+            in the compressed view of the tree containing subtree(see
+            get_compressed_tree_index), and subtree must be one of its nodes.
+            If compact_tree(the CompactTree of the tree containing subtree) is
+            passed, the search runs on it(see CompactTree.get_k_nearest_leaves)
+            and only the leaves found are looked up as lxml nodes.
             Parameters:
                 1. subtree(type = lxml.etree._Element)
                 2. k(type = int)
+                3. compressed(type = bool)
+                4. compact_tree(type = CompactTree)
             Example:
                 >>> path = 'Examples/Hello_World.html'
                 >>> obj = Page(path, 'html')
@@ -656,45 +2148,62 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
                 >>> print(tostring(k_nearest_leaves[1][0]))
                 b'<div>child1</div>'
         """
-        queue = []
+        if compact_tree is not None:
+            return [(compact_tree.nodes[leaf], distance) for leaf, distance in
+                    compact_tree.get_k_nearest_leaves(compact_tree.positions[subtree], k, compressed)]
+        queue = deque()
         visited = set([subtree])
         distances = dict()
-        if subtree.getparent() is not None:
-            queue.append(subtree.getparent())
-            distances[subtree.getparent()] = 1
+        parent = self.get_parent(subtree, compressed)
+        if parent is not None:
+            queue.append(parent)
+            distances[parent] = 1
         k_nearest_leaves = []
         while len(queue) > 0 and len(k_nearest_leaves) < k:
-            front = queue[0]
-            parent = front.getparent()
+            front = queue.popleft()
+            parent = self.get_parent(front, compressed)
             n = len(front)
             for i in range(n):
-                if front[i] not in visited:
-                    queue.append(front[i])
-                    visited.add(front[i])
-                    distances[front[i]] = distances[front] + 1
+                child = front[i]
+                if compressed:
+                    child = self.get_representative(child)
+                if child not in visited:
+                    queue.append(child)
+                    visited.add(child)
+                    distances[child] = distances[front] + 1
             if parent is not None and parent not in visited:
                 queue.append(parent)
                 visited.add(parent)
                 distances[parent] = distances[front] + 1
             if len(front) == 0:
                 k_nearest_leaves.append((front, distances[front]))
-            queue.pop(0)
         return k_nearest_leaves
     
-    def get_all_occurences_helper(self, tree, subtree, lst_occurences, path):
+    def get_all_occurences_helper(self, tree, subtree, lst_occurences, path,
+                                  index = None, str_subtree = None,
+                                  min_similarity = MIN_SIMILARITY):
         """
             This function populates lst_occurences(passed as an argument)
             with tuples of the form, (subtree, path), where the
             first element of each tuple is a node N in tree(passed as an argument)
-            such that the string representation of that node is equal
-            to the string representation of subtree(passed as an argument)
-            and the second element of each tuple is the path of the node N
-            (described above) in tree.
+            such that the string representation of that node is similar
+            to the string representation of subtree(passed as an argument),
+            i.e., equal to it if min_similarity(passed as an argument) is 1
+            (see is_similar), and the second element of each tuple is the path
+            of the node N (described above) in tree. If index(the TreeIndex of
+            tree) is passed, the string representation of each node is read
+            from it, the children of each node are read through index.get_children
+            and the nodes whose length rules out a match are skipped without
+            being read. str_subtree is the stripped string representation of
+            subtree and is computed if it is not passed.
             Parameters:
                 1. tree(type = lxml.etree._Element)
                 2. subtree(type = lxml.etree._Element)
                 3. lst_occurences(type = list)
                 4. path(type = list)
+                5. index(type = TreeIndex)
+                6. str_subtree(type = bytes)
+                7. min_similarity(type = float)
             Example:
                 >>> path = 'Examples/Hello_World.html'
                 >>> obj = Page(path, 'html')
@@ -713,16 +2222,61 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
                 []
                 >>> 
         """
-        if tostring(tree).strip() == tostring(subtree).strip(): #TODO
+        if str_subtree is None:
+            str_subtree = tostring(subtree).strip()
+        if index is None:
+            str_tree = tostring(tree).strip()
+        elif self.may_be_similar(index, tree, str_subtree, min_similarity):
+            str_tree = index.get_raw(tree).strip()
+        else:
+            str_tree = None
+        if str_tree is not None and is_similar(str_tree, str_subtree, min_similarity):
             lst_occurences.append((tree, path[:]))
             return
-        n = len(tree)
-        for i in range(n):
+        if index is None:
+            children = tree
+        else:
+            children = index.get_children(tree)
+        for i, child in enumerate(children):
             path.append(i)
-            self.get_all_occurences_helper(tree[i], subtree, lst_occurences, path)
+            self.get_all_occurences_helper(child, subtree, lst_occurences, path,
+                                           index, str_subtree, min_similarity)
             path.pop()
 
-    def get_all_occurences(self, tree, subtree):
+    def may_be_similar(self, index, node, str_subtree, min_similarity = MIN_SIMILARITY):
+        """
+            This function checks, from the span of node(passed as an
+            argument) in index(passed as an argument) and the length of its
+            tail, whether the stripped string representation of node can be
+            similar to str_subtree(passed as an argument, see is_similar), so
+            that the nodes that are too long or too short are rejected without
+            being read. Only the trailing whitespace of the tail of node is
+            stripped, since tostring(node) starts with its tag.
+            Parameters:
+                1. index(type = TreeIndex)
+                2. node(type = lxml.etree._Element)
+                3. str_subtree(type = bytes)
+                4. min_similarity(type = float)
+            Example:
+                >>> path = 'Examples/Hello_World.html'
+                >>> obj = Page(path, 'html')
+                >>> tree = fromstring('<div><p>Updated 10:41</p> <p>Updated on Monday</p></div>')
+                >>> index = obj.get_tree_index(tree)
+                >>> obj.may_be_similar(index, tree[0], b'<p>Updated 10:42</p>', 0.9)
+                True
+                >>> obj.may_be_similar(index, tree[1], b'<p>Updated 10:42</p>', 0.9)
+                False
+                >>>
+        """
+        raw_start, raw_end, _, _ = index.spans[node]
+        max_length = raw_end - raw_start
+        min_length = max_length - len(node.tail or '')
+        if min_similarity >= 1:
+            return min_length <= len(str_subtree) <= max_length
+        max_distance = (1 - min_similarity) * max(max_length, len(str_subtree)) + 1e-9
+        return min_length - max_distance <= len(str_subtree) <= max_length + max_distance
+
+    def get_all_occurences(self, tree, subtree, compressed = False, min_similarity = MIN_SIMILARITY):
         """
             This function returns a list of tuples of the form,
             (lxml.etree._Element, []), where the first element
@@ -730,10 +2284,22 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
             such that the string representation of that node is equal
             to the string representation of subtree(passed as an argument)
             and the second element of each tuple is the path of the node N
-            (described above) in tree.
+            (described above) in tree. Only the nodes having the same hash
+            as subtree(see get_merkle_index) are compared, and nodes nested
+            in an occurence are skipped, as get_all_occurences_helper does.
+            If compressed is True, the compressed views of tree and of the
+            tree containing subtree(see get_compressed_tree_index) are
+            searched and compared instead, and the paths are paths in the
+            compressed view of tree. If min_similarity(passed as an argument)
+            is below 1, the nodes whose string representation is similar to
+            that of subtree(see is_similar) are returned instead, which are
+            searched for by get_all_occurences_helper, since they do not
+            have the same hash.
             Parameters:
                 1. tree(type = lxml.etree._Element)
                 2. subtree(type = lxml.etree._Element)
+                3. compressed(type = bool)
+                4. min_similarity(type = float)
             Example:
                 >>> path = 'Examples/Hello_World.html'
                 >>> obj = Page(path, 'html')
@@ -748,22 +2314,49 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
                 1
                 >>> 
         """
+        index = self.get_merkle_index(tree, compressed)
+        if compressed:
+            raw_pieces = []
+            self.build_serialization_index(subtree, raw_pieces, dict(), [0], compressed)
+            str_subtree = b''.join(raw_pieces).strip()
+        else:
+            str_subtree = tostring(subtree).strip()
         lst_occurences = []
-        path = []
-        self.get_all_occurences_helper(tree, subtree, lst_occurences, path)
+        if min_similarity < 1:
+            self.get_all_occurences_helper(index.root, subtree, lst_occurences, [], index,
+                                           str_subtree, min_similarity)
+            return lst_occurences
+        code_hash = self.get_code_hash(self.normalize_code(str_subtree.decode('utf-8')))
+        for path in index.hash_paths.get(code_hash, []):
+            if len(lst_occurences) > 0 and path[:len(lst_occurences[-1][1])] == lst_occurences[-1][1]:
+                continue
+            if compressed:
+                compact_tree = index.compact_tree
+                node = compact_tree.nodes[compact_tree.get_position(path, compressed)]
+            else:
+                node = self.get_node(tree, path)
+            if is_similar(index.get_raw(node).strip(), str_subtree, min_similarity):
+                lst_occurences.append((node, path[:]))
         return lst_occurences
     
-    def get_k_nearest_leaves_for_all_subtrees(self, lst_occurences, k):
+    def get_k_nearest_leaves_for_all_subtrees(self, lst_occurences, k, compressed = False,
+                                              compact_tree = None):
         """
             This function returns a list of tuples of the form
             ((subtree, (leaf, distance_from_subtree))). To do this,
             for each subtree in lst_occurences(passed as an argument),
             this function calls other appropriate functions to get
             the k(passed as an argument) nearest leaves and their
-            distances from the subtree.
+            distances from the subtree, in the compressed view of its
+            tree if compressed is True. If compact_tree is passed, the
+            leaves of all the subtrees are read from one index of the
+            nearest leaves of compact_tree(see CompactTree.get_nearest_leaves),
+            which gives the same features as one search per subtree.
             Parameters:
                 1. lst_occurences(type = list)
                 2. k(type = int)
+                3. compressed(type = bool)
+                4. compact_tree(type = CompactTree)
             Example:
                 >>> path = 'Examples/Hello_World.html'
                 >>> obj = Page(path, 'html')
@@ -783,26 +2376,52 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
                 >>> 
         """
         features = []
+        if compact_tree is not None:
+            nodes = compact_tree.nodes
+            for subtree in lst_occurences:
+                features.append((subtree, [(nodes[leaf], distance) for leaf, distance in
+                                           compact_tree.get_nearest_leaves(compact_tree.positions[subtree],
+                                                                           k, compressed)]))
+            return features
         for subtree in lst_occurences:
-            features.append((subtree, self.get_k_nearest_leaves(subtree, k)))
+            features.append((subtree, self.get_k_nearest_leaves(subtree, k, compressed)))
         return features
     
 
     
     def get_new_page_compressed_subtree_path(self,
                                         compressed_subtree,
-                                        compressed_old_tree,
-                                        compressed_new_tree):
+                                        old_tree,
+                                        new_tree,
+                                        k = NUM_NEAREST_LEAVES,
+                                        assignment = 'sparse',
+                                        max_assignment_size = MAX_ASSIGNMENT_SIZE,
+                                        min_similarity = MIN_SIMILARITY):
         """
             This function returns the path of the subtree
-            S in compressed_new_tree(passed as an
+            S in the compressed view of new_tree(passed as an
             argument) such that S is the most probable match
-            for compressed_subtree (passed as an argument).
-            See example below.
+            for compressed_subtree (passed as an argument), which
+            is a node of the compressed view of old_tree(passed as
+            an argument). The compressed views(see
+            get_compressed_tree_index) are read from old_tree and
+            new_tree, which are not copied, and are traversed on their
+            CompactTrees. The occurences of compressed_subtree are matched
+            by their k(passed as an argument) nearest leaves, with the
+            assignment and max_assignment_size(passed as arguments) of
+            get_subtree_mapping. The occurences are the nodes similar to
+            compressed_subtree with min_similarity(passed as an argument,
+            see get_all_occurences), and compressed_subtree is matched
+            exactly in old_tree if it is not one of them, i.e., if it is
+            nested in another occurence. See example below.
             Parameters:
                 1. compressed_subtree(type = lxml.etree._Element)
-                2. compressed_old_tree(type = lxml.etree._Element)
-                3. compressed_new_tree(type = lxml.etree._Element)
+                2. old_tree(type = lxml.etree._Element)
+                3. new_tree(type = lxml.etree._Element)
+                4. k(type = int)
+                5. assignment(type = string)
+                6. max_assignment_size(type = int)
+                7. min_similarity(type = float)
             Example:
                 >>> path = 'Examples/Hello_World.html'
                 >>> obj = Page(path, 'html')
@@ -845,34 +2464,51 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
                 >>> obj.get_new_page_compressed_subtree_path(subtree, compressed_old_tree, compressed_new_tree)
                 [2, 1, 0]
         """
-        lst_occurences_old, paths_old = zip(*self.get_all_occurences(compressed_old_tree, compressed_subtree))
-        lst_occurences_new, paths_new = zip(*self.get_all_occurences(compressed_new_tree, compressed_subtree))
+        occurences_old = self.get_all_occurences(old_tree, compressed_subtree, compressed = True,
+                                                 min_similarity = min_similarity)
+        if compressed_subtree not in [subtree for subtree, _ in occurences_old]:
+            occurences_old = self.get_all_occurences(old_tree, compressed_subtree, compressed = True)
+        lst_occurences_old, paths_old = zip(*occurences_old)
+        lst_occurences_new, paths_new = zip(*self.get_all_occurences(new_tree, compressed_subtree,
+                                                                     compressed = True,
+                                                                     min_similarity = min_similarity))
         features_old = self.get_k_nearest_leaves_for_all_subtrees(lst_occurences_old,
-                                                                  k=2)
+                                                                  k, compressed = True,
+                                                                  compact_tree = self.get_compressed_tree_index(old_tree).
+                                                                  compact_tree)
         features_new = self.get_k_nearest_leaves_for_all_subtrees(lst_occurences_new,
-                                                                  k=2)
-        cost_matrix = self.get_cost_matrix(data1=features_old, data2=features_new)
-        mapping = self.get_min_cost_mapping(cost_matrix)
+                                                                  k, compressed = True,
+                                                                  compact_tree = self.get_compressed_tree_index(new_tree).
+                                                                  compact_tree)
         idx = 0
         for subtree, _ in features_old:
             if subtree == compressed_subtree:
                 break
             idx += 1
         assert(idx < len(features_old)), (idx, len(features_old))
-        new_page_subtree_path = paths_new[mapping[idx]]
+        new_page_subtree_path = paths_new[self.get_subtree_mapping(features_old, features_new, idx,
+                                                                   assignment, max_assignment_size)]
         return new_page_subtree_path
     
-    def get_path_in_compressed_tree(self, subtree, old_tree, new_tree):
+    def get_path_in_compressed_tree(self, subtree, old_tree, new_tree, k = NUM_NEAREST_LEAVES,
+                                    min_similarity = MIN_SIMILARITY):
         """
             This function returns the path of the subtree
             (different from subtree argument) S in compressed
             form of new_tree(passed as an argument) such that 
             S is the most probable match for the compressed form
-            of subtree(passed as an argument). See example below.
+            of subtree(passed as an argument). The compressed views
+            of old_tree and new_tree are indexed once and reused(see
+            get_compressed_tree_index), and k and min_similarity(passed as
+            arguments) are the number of nearest leaves compared and the
+            similarity of the occurences(see
+            get_new_page_compressed_subtree_path). See example below.
             Parameters:
                 1. subtree(type = lxml.etree._Element)
                 2. old_tree(type = lxml.etree._Element)
                 3. new_tree(type = lxml.etree._Element)
+                4. k(type = int)
+                5. min_similarity(type = float)
             Example:
                 >>> path = 'Examples/Hello_World.html'
                 >>> obj = Page(path, 'html')
@@ -919,14 +2555,11 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
                 >>> obj.get_path_in_compressed_tree(subtree, old_page, new_page)
                 [2, 1, 0]
         """
-        compressed_old_tree, dic = self.get_compressed_tree(old_tree)
-        compressed_new_tree, _ = self.get_compressed_tree(new_tree)
-        while(len(subtree) == 1):
-            subtree = subtree[0]
-        compressed_old_subtree = dic[subtree]
+        compressed_old_subtree = self.get_representative(subtree)
         path_of_compressed_new_subtree = self.get_new_page_compressed_subtree_path(compressed_old_subtree,
-                                                                      compressed_old_tree,
-                                                                      compressed_new_tree)
+                                                                      old_tree,
+                                                                      new_tree, k,
+                                                                      min_similarity = min_similarity)
         return path_of_compressed_new_subtree
     
     def is_subsequence(self, list1, list2):
@@ -961,7 +2594,9 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
                                              str_old_page_subtree,
                                              path_compressed,
                                              path_in_new_tree,
-                                             temp_path):
+                                             temp_path,
+                                             index = None,
+                                             min_similarity = MIN_SIMILARITY):
         """
             path_compressed(passed as an argument) is
             the path of a compressed subtree S in a 
@@ -969,6 +2604,11 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
             is the argument tree. This function populates path_in_new_tree
             (passed as an argument) with the path of the uncompressed
             form of subtree S in the uncompressed tree(passed as an argument).
+            If index(the TreeIndex of tree) is passed, the string representation
+            of each node is read from it. The uncompressed form of S is a node
+            whose string representation is similar to str_old_page_subtree
+            with min_similarity(passed as an argument, see is_similar), so
+            that it is found even if a timestamp or a counter in it changed.
             See example below.
             Parameters:
                 1. tree(type = lxml.etree._Element)
@@ -976,6 +2616,8 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
                 3. path_compressed(type = list)
                 4. path_in_new_tree(type = list)
                 5. temp_path(type = list)
+                6. index(type = TreeIndex)
+                7. min_similarity(type = float)
             Example:
                 >>> path = 'Examples/Hello_World.html'
                 >>> obj = Page(path, 'html')
@@ -994,26 +2636,41 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
                 [[0, 0, 0]]
                 >>> 
         """
-        if(self.is_subsequence(path_compressed, temp_path) and tostring(tree).strip() == str_old_page_subtree): #TODO
-            path_in_new_tree.append(temp_path[:])
-            return
+        if self.is_subsequence(path_compressed, temp_path):
+            if index is None:
+                str_tree = tostring(tree).strip()
+            elif self.may_be_similar(index, tree, str_old_page_subtree, min_similarity):
+                str_tree = index.get_raw(tree).strip()
+            else:
+                str_tree = None
+            if str_tree is not None and is_similar(str_tree, str_old_page_subtree, min_similarity):
+                path_in_new_tree.append(temp_path[:])
+                return
         n = len(tree)
         for i in range(n):
             temp_path.append(i)
-            self.get_path_in_uncompressed_tree_helper(tree[i], str_old_page_subtree, path_compressed, path_in_new_tree, temp_path)
+            self.get_path_in_uncompressed_tree_helper(tree[i], str_old_page_subtree, path_compressed, path_in_new_tree, temp_path, index,
+                                                      min_similarity)
             temp_path.pop()
 
-    def get_path_in_uncompressed_tree(self, subtree, old_tree, new_tree):
+    def get_path_in_uncompressed_tree(self, subtree, old_tree, new_tree, k = NUM_NEAREST_LEAVES,
+                                      min_similarity = MIN_SIMILARITY):
         """
             This function returns the path of the subtree
             (different from subtree argument) S in new_tree
             (passed as an argument) such that S is the most
             probable match for the subtree(passed as an
-            argument). See example below.
+            argument), comparing the k(passed as an argument)
+            nearest leaves of its occurences. The occurences of subtree
+            and S itself are matched with min_similarity(passed as an
+            argument, see is_similar), so that they are found even if a
+            few characters in them changed. See example below.
             Parameters:
                 1. subtree(type = lxml.etree._Element)
                 2. old_tree(type = lxml.etree._Element)
                 3. new_tree(type = lxml.etree._Element)
+                4. k(type = int)
+                5. min_similarity(type = float)
             Example:
                 >>> path = 'Examples/Hello_World.html'
                 >>> obj = Page(path, 'html')
@@ -1062,14 +2719,17 @@ class Page(ParsingAndProcessing, HungarianHelperMethods):
         """
         path_of_compressed_new_subtree = self.get_path_in_compressed_tree(subtree,
                                                                           old_tree,
-                                                                          new_tree)
+                                                                          new_tree, k,
+                                                                          min_similarity)
         str_old_page_subtree = tostring(subtree).strip()
         path_in_new_tree = []
         self.get_path_in_uncompressed_tree_helper(new_tree,
                                                   str_old_page_subtree,
                                                   path_of_compressed_new_subtree,
                                                   path_in_new_tree,
-                                                  [])
+                                                  [],
+                                                  self.get_tree_index(new_tree),
+                                                  min_similarity)
         return path_in_new_tree[0]
 
     def print_tree(self, tree):
@@ -1193,6 +2853,50 @@ def get_prefix_path(extracted_old_subtree):
     return prefix_path
 
 
+def assign_subtrees(query_tree, paths, subtrees):
+    """
+        This function returns a copy of query_tree(passed as an argument)
+        in which, for each path in paths(passed as an argument), in order,
+        the subtree present at path is replaced with a copy of the subtree
+        at the same position in subtrees(passed as an argument). query_tree
+        is copied once and the subtrees are replaced in the copy, with the
+        same result as calling Page.assign once per path. The parents of the
+        subtrees to be replaced are looked up before any of them is replaced,
+        except for the parents lying in a subtree replaced for an earlier
+        path, which are looked up once that subtree is replaced.
+        Parameters:
+            1. query_tree(type = lxml.etree._ElementTree)
+            2. paths(type = list of lists)
+            3. subtrees(type = list of lxml.etree._Element)
+        Example:
+            >>> query_tree = fromstring('<div><div>child1</div><div>child2</div></div>').getroottree()
+            >>> tostring(assign_subtrees(query_tree, [[1], [1, 0]], [fromstring('<p><b>a</b></p>'), fromstring('<i>b</i>')]))
+            b'<div><div>child1</div><p><i>b</i></p></div>'
+            >>>
+    """
+    repaired_tree = deepcopy(query_tree)
+    root = repaired_tree.getroot()
+    parents = []
+    replaced_paths = set()
+    for path in paths:
+        parent_path = tuple(path[:-1])
+        if any(parent_path[:i] in replaced_paths for i in range(len(parent_path) + 1)):
+            parents.append(None)
+        else:
+            parent = root
+            for idx in parent_path:
+                parent = parent[idx]
+            parents.append(parent)
+        replaced_paths.add(tuple(path))
+    for path, subtree, parent in zip(paths, subtrees, parents):
+        if parent is None:
+            parent = root
+            for idx in path[:-1]:
+                parent = parent[idx]
+        parent[path[-1]] = deepcopy(subtree)
+    return repaired_tree
+
+
 def get_paths(rules, prefix_path):
     """
         This function appends prefix_path(passed as an argument)
@@ -1253,7 +2957,95 @@ def get_subtrees_to_be_extracted(rules, extracted_old_subtree, old_page):
     return subtrees_to_be_extracted
 
 
-def auto_repair(old_page, new_page, extracted_old_subtree, rules = None):
+def init_search_worker(bound):
+    """
+        This function is run once by every process of the pool of
+        Page.get_search_executor to keep bound(passed as an argument),
+        which holds the best (edit distance, position) found so far by
+        all the processes in the current search.
+        Parameters:
+            1. bound(type = multiprocessing.Array of size exactly 2)
+    """
+    global SEARCH_BOUND
+    SEARCH_BOUND = bound
+
+
+def search_shard(query_code, code, candidates, query_excess, query_subtree_excess):
+    """
+        This function returns a tuple (edit_distance, position,
+        num_pruned_nodes, num_compared_nodes) where position is the
+        position of the candidate of candidates(passed as an argument),
+        one shard of the candidates of the searched tree, whose edit
+        distance to query_code(passed as an argument) is the smallest,
+        the first one in preorder if there are several, or (inf, inf) if
+        a smaller (edit distance, position) was found by another process
+        (see init_search_worker). code(passed as an argument) is the
+        normalized string representation of the searched tree, and
+        query_excess and query_subtree_excess(passed as arguments) hold
+        the lower bounds of every candidate(see Page.get_excess_bounds).
+        Candidates are visited in preorder and are skipped, along with
+        their subtrees, when their lower bound on the edit distance(see
+        Page.dfs) cannot give a smaller (edit distance, position) than
+        the best found by any process.
+        Parameters:
+            1. query_code(type = string)
+            2. code(type = string)
+            3. candidates(type = list of SearchCandidate objects)
+            4. query_excess(type = list of int)
+            5. query_subtree_excess(type = list of int)
+        Example:
+            >>> query_code = '<div>child2</div>'
+            >>> search_node = Page('Examples/Hello_World.html', 'html').get_search_node(0, len(query_code))
+            >>> candidates = [SearchCandidate(0, 1, 0, len(query_code), search_node)]
+            >>> init_search_worker(Array('d', [inf, inf]))
+            >>> search_shard(query_code, query_code, candidates, [0], [0])
+            (0, 0, 0, 1)
+            >>>
+    """
+    bound = SEARCH_BOUND
+    query_length = len(query_code)
+    mn = inf
+    best_position = inf
+    best = (inf, inf)
+    num_pruned_nodes = 0
+    num_compared_nodes = 0
+    skip_until = 0
+    for candidate, node_excess, subtree_excess in zip(candidates, query_excess,
+                                                      query_subtree_excess):
+        position, end, code_start, code_end, node = candidate
+        if position < skip_until:
+            num_pruned_nodes += 1
+            continue
+        with bound.get_lock():
+            if (bound[0], bound[1]) < (mn, best_position):
+                mn, best_position = bound[0], bound[1]
+        if position < best_position:
+            mn_allowed = mn
+        else:
+            mn_allowed = mn - 1
+        subtree_lower_bound = max(query_length - node.subtree_max_length, subtree_excess)
+        if subtree_lower_bound > mn_allowed:
+            num_pruned_nodes += 1
+            skip_until = end
+            continue
+        if (abs(query_length - node.length) > mn_allowed or
+            max(node_excess, node_excess - query_length + node.length) > mn_allowed):
+            num_pruned_nodes += 1
+            continue
+        num_compared_nodes += 1
+        edit_dis = get_bounded_edit_distance(query_code, code[code_start:code_end],
+                                             max_distance = mn_allowed)
+        if edit_dis <= mn_allowed:
+            mn, best_position = edit_dis, position
+            best = (mn, best_position)
+            with bound.get_lock():
+                if (mn, best_position) < (bound[0], bound[1]):
+                    bound[0], bound[1] = mn, best_position
+    return best + (num_pruned_nodes, num_compared_nodes)
+
+
+def auto_repair(old_page, new_page, extracted_old_subtree, rules = None,
+                min_similarity = MIN_SIMILARITY):
     """
         This function is used to repair the incorrect
         data extracted by the broken spider from the new
@@ -1270,11 +3062,17 @@ def auto_repair(old_page, new_page, extracted_old_subtree, rules = None):
         generates the rules and then, corrects the spider
         and outputs rules(called rules, so that they can be
         used directly on pages having similar layout) as well
-        as the repaired_subtree. See example below.
+        as the repaired_subtree. The subtrees of the old page are
+        located in the new page with min_similarity(passed as an
+        argument, see get_path_in_uncompressed_tree), so that below
+        1 they are still found if a few characters in them or around
+        them changed, such as a timestamp. See example below.
         Parameters:
             1. old_page(type = Page Object)
             2. new_page(type = Page Object)
             3. extracted_old_subtree(type = lxml.etree._Element)
+            4. rules(type = list)
+            5. min_similarity(type = float)
         Example:
             >>> old_page_path = 'Examples/Autorepair_Old_Page.html'
             >>> new_page_path = 'Examples/Autorepair_New_Page.html'
@@ -1296,7 +3094,7 @@ def auto_repair(old_page, new_page, extracted_old_subtree, rules = None):
                                                          new_page.tree)
         return rules, repaired_subtree
     rules = new_page.generate_rules(extracted_old_subtree,
-                                       new_page.tree_without_attr)
+                                    new_page.tree_without_attr)
     subtrees_to_be_extracted = get_subtrees_to_be_extracted(rules,
                                                             extracted_old_subtree,
                                                             old_page)
@@ -1304,9 +3102,10 @@ def auto_repair(old_page, new_page, extracted_old_subtree, rules = None):
     root_new_page = new_page.tree.getroot()
     final_rules = []
     for subtree, rule in zip(subtrees_to_be_extracted, rules):
-        final_rules.append((rule[0], old_page.get_path_in_uncompressed_tree(subtree, 
+        final_rules.append((rule[0], old_page.get_path_in_uncompressed_tree(subtree,
                                                                    root_old_page,
-                                                                   root_new_page)))
+                                                                   root_new_page,
+                                                                   min_similarity = min_similarity)))
     return auto_repair(old_page, new_page, extracted_old_subtree, rules = final_rules)
 
 
@@ -0,0 +1,298 @@
+from collections import deque
+from heapq import nsmallest
+from itertools import chain
+from numpy import array
+from numpy import arange
+from numpy import full
+from numpy import ones
+from numpy import add
+from numpy import zeros
+from numpy import argsort
+from numpy import split
+from numpy import cumsum
+from numpy import bincount
+from numpy import where
+from numpy import int64
+
+
+class CompactTree:
+    """
+        This class holds a snapshot of a tree in preorder, in which
+        node i is nodes[i] and every relation between nodes is an
+        array indexed by position. parent is -1 for the root, and
+        num_children, depth and subtree_size hold the number of
+        children, the depth and the number of nodes of the subtree of
+        every node. The children of node i are
+        children[child_offsets[i]:child_offsets[i + 1]], so that they
+        are read as one slice instead of one by one. The
+        compressed tree(see Page.get_compressed_tree) is described by
+        representatives, which maps every node to the node standing for
+        it in the compressed tree, compressed_parent, which maps every
+        node to the first of its ancestors that is kept in the compressed
+        tree, and compressed_depth, which holds the depth of every kept
+        node in the compressed tree. nearest_leaf_indexes caches the
+        indexes built by get_nearest_leaf_index. positions maps every
+        lxml node back to its position, so the traversals run on integers
+        and lxml nodes are only looked up for their results.
+    """
+    nodes = None
+    positions = None
+    parent = None
+    child_offsets = None
+    children = None
+    num_children = None
+    depth = None
+    subtree_size = None
+    representatives = None
+    compressed_parent = None
+    compressed_depth = None
+    nearest_leaf_indexes = None
+
+    def get_children(self, i, compressed = False):
+        """
+            This function returns the positions of the children of node
+            i(passed as an argument), or of its children in the compressed
+            tree if compressed is True.
+            Parameters:
+                1. i(type = int)
+                2. compressed(type = bool)
+            Example:
+                >>> compact_tree = get_compact_tree(fromstring('<div><div><p>a</p></div><p>b</p></div>'))
+                >>> compact_tree.get_children(0), compact_tree.get_children(0, compressed = True)
+                ([1, 3], [2, 3])
+                >>>
+        """
+        children = self.children[self.child_offsets[i]:self.child_offsets[i + 1]]
+        if compressed:
+            children = self.representatives[children]
+        return children.tolist()
+
+    def get_position(self, path, compressed = False):
+        """
+            This function returns the position of the node present
+            at path = path(passed as an argument) in the tree, or in
+            the compressed tree if compressed is True.
+            Parameters:
+                1. path(type = list/list like)
+                2. compressed(type = bool)
+            Example:
+                >>> compact_tree = get_compact_tree(fromstring('<div><div><p>a</p></div><p>b</p></div>'))
+                >>> compact_tree.get_position([0, 0]), compact_tree.get_position([0], compressed = True)
+                (2, 2)
+                >>>
+        """
+        i = 0
+        if compressed:
+            i = int(self.representatives[i])
+        for idx in path:
+            i = self.children[self.child_offsets[i] + idx]
+            if compressed:
+                i = self.representatives[i]
+        return int(i)
+
+    def get_nearest_leaf_index(self, k, compressed = False):
+        """
+            This function returns a tuple (down, best) of dicts built bottom-up
+            in one pass over the tree, or over the compressed tree if compressed
+            is True. down[v] holds the k(passed as an argument) leaves of the
+            subtree of node v that come first by (depth, position), as tuples
+            (depth, position), and best[v] holds, for every node v having
+            children, the first 2k of the leaves in down[c] over all children c
+            of v, as tuples (depth, position, c). Since a child contributes at
+            most k of them, the first k leaves of the subtrees of all the
+            children of v but one are in best[v]. The index is built once per k.
+            Parameters:
+                1. k(type = int)
+                2. compressed(type = bool)
+            Example:
+                >>> compact_tree = get_compact_tree(fromstring('<div><p>a</p><div><p>b</p><p>c</p></div></div>'))
+                >>> down, best = compact_tree.get_nearest_leaf_index(1)
+                >>> down[0], best[0]
+                ([(1, 1)], [(1, 1, 1), (2, 3, 2)])
+                >>>
+        """
+        if self.nearest_leaf_indexes is None:
+            self.nearest_leaf_indexes = dict()
+        key = (k, compressed)
+        if key in self.nearest_leaf_indexes:
+            return self.nearest_leaf_indexes[key]
+        if compressed:
+            depth = self.compressed_depth.tolist()
+            kept = (self.representatives == arange(len(self.nodes))).nonzero()[0].tolist()
+        else:
+            depth = self.depth.tolist()
+            kept = range(len(self.nodes))
+        down = dict()
+        best = dict()
+        for v in reversed(kept):
+            children = self.get_children(v, compressed)
+            if not children:
+                down[v] = [(depth[v], v)]
+                continue
+            best[v] = nsmallest(2*k, chain.from_iterable([(leaf_depth, leaf, c) for leaf_depth, leaf in down[c]]
+                                                         for c in children))
+            down[v] = [(leaf_depth, leaf) for leaf_depth, leaf, _ in best[v][:k]]
+        self.nearest_leaf_indexes[key] = (down, best)
+        return down, best
+
+    def get_nearest_leaves(self, i, k, compressed = False):
+        """
+            This function returns the same as get_k_nearest_leaves, but
+            reads the leaves from the index built by get_nearest_leaf_index
+            instead of searching the tree. The Breadth First Search of
+            get_k_nearest_leaves reaches the leaves by distance, then by the
+            number of steps up from node i(passed as an argument) before
+            going down, then in preorder, so the k(passed as an argument)
+            nearest leaves are found among the first k leaves below each
+            ancestor a of node i, not counting the child of a on the way to
+            node i, and the walk up stops as soon as no ancestor can give a
+            nearer leaf. Its cost depends on k and on the depth of node i only.
+            Parameters:
+                1. i(type = int)
+                2. k(type = int)
+                3. compressed(type = bool)
+            Example:
+                >>> compact_tree = get_compact_tree(fromstring('<div><div>child1</div><div><div>child2</div><div>child3</div></div></div>'))
+                >>> compact_tree.get_nearest_leaves(3, 2)
+                [(4, 2), (1, 3)]
+                >>>
+        """
+        _, best = self.get_nearest_leaf_index(k, compressed)
+        if compressed:
+            parents = self.compressed_parent
+            depth = self.compressed_depth
+        else:
+            parents = self.parent
+            depth = self.depth
+        nearest_leaves = []
+        previous = i
+        ancestor = int(parents[i])
+        steps_up = 1
+        while ancestor != -1:
+            if len(nearest_leaves) >= k and nearest_leaves[k - 1][0] <= steps_up + 1:
+                break
+            ancestor_depth = int(depth[ancestor])
+            leaves = [(steps_up + leaf_depth - ancestor_depth, steps_up, leaf)
+                      for leaf_depth, leaf, child in best[ancestor] if child != previous]
+            nearest_leaves = sorted(nearest_leaves + leaves[:k])[:k]
+            previous = ancestor
+            ancestor = int(parents[ancestor])
+            steps_up += 1
+        return [(leaf, distance) for distance, _, leaf in nearest_leaves]
+
+    def get_k_nearest_leaves(self, i, k, compressed = False):
+        """
+            This function returns a list of tuples (position, distance)
+            of the k(passed as an argument) leaves nearest to node
+            i(passed as an argument), found by a Breadth First Search
+            from node i that visits the children of a node in order
+            before its parent, as Page.get_k_nearest_leaves does. If
+            compressed is True, the search is done in the compressed tree,
+            and i must be kept in it.
+            Parameters:
+                1. i(type = int)
+                2. k(type = int)
+                3. compressed(type = bool)
+            Example:
+                >>> compact_tree = get_compact_tree(fromstring('<div><div>child1</div><div><div>child2</div><div>child3</div></div></div>'))
+                >>> compact_tree.get_k_nearest_leaves(3, 2)
+                [(4, 2), (1, 3)]
+                >>>
+        """
+        if compressed:
+            parents = self.compressed_parent
+        else:
+            parents = self.parent
+        queue = deque()
+        visited = {i}
+        distances = dict()
+        if parents[i] != -1:
+            queue.append(int(parents[i]))
+            distances[int(parents[i])] = 1
+        k_nearest_leaves = []
+        while len(queue) > 0 and len(k_nearest_leaves) < k:
+            front = queue.popleft()
+            for child in self.get_children(front, compressed):
+                if child not in visited:
+                    queue.append(child)
+                    visited.add(child)
+                    distances[child] = distances[front] + 1
+            parent = int(parents[front])
+            if parent != -1 and parent not in visited:
+                queue.append(parent)
+                visited.add(parent)
+                distances[parent] = distances[front] + 1
+            if self.num_children[front] == 0:
+                k_nearest_leaves.append((front, distances[front]))
+        return k_nearest_leaves
+
+
+def get_compact_tree(root):
+    """
+        This function returns the CompactTree of the tree whose root
+        is passed as an argument. The tree is walked once to number its
+        nodes in preorder, and the subtree sizes, representatives and
+        compressed parents are then computed level by level on the arrays.
+        Parameters:
+            1. root(type = lxml.etree._Element)
+        Example:
+            >>> compact_tree = get_compact_tree(fromstring('<div><div><p>a</p></div><p>b</p></div>'))
+            >>> compact_tree.parent.tolist(), compact_tree.subtree_size.tolist()
+            ([-1, 0, 1, 0], [4, 2, 1, 1])
+            >>> compact_tree.representatives.tolist(), compact_tree.compressed_parent.tolist()
+            ([0, 2, 2, 3], [-1, 0, 0, 0])
+            >>>
+    """
+    compact_tree = CompactTree()
+    nodes = list(root.iter())
+    n = len(nodes)
+    positions = {node: i for i, node in enumerate(nodes)}
+    parent = [-1]*n
+    first_child = [-1]*n
+    depth = [0]*n
+    for i, node in enumerate(nodes[1:], 1):
+        p = positions[node.getparent()]
+        parent[i] = p
+        depth[i] = depth[p] + 1
+        if first_child[p] == -1:
+            first_child[p] = i
+    parent = array(parent, dtype=int64)
+    first_child = array(first_child, dtype=int64)
+    depth = array(depth, dtype=int64)
+    num_children = zeros(n, dtype=int64)
+    add.at(num_children, parent[1:], 1)
+    child_offsets = zeros(n + 1, dtype=int64)
+    cumsum(num_children, out=child_offsets[1:])
+    children = argsort(parent[1:], kind='stable') + 1
+    order = argsort(depth, kind='stable')
+    levels = split(order, cumsum(bincount(depth))[:-1])
+    subtree_size = ones(n, dtype=int64)
+    representatives = arange(n, dtype=int64)
+    for level in reversed(levels[1:]):
+        add.at(subtree_size, parent[level], subtree_size[level])
+    for level in reversed(levels):
+        single = level[num_children[level] == 1]
+        representatives[single] = representatives[first_child[single]]
+    compressed_parent = full(n, -1, dtype=int64)
+    for level in levels[1:]:
+        parents = parent[level]
+        compressed_parent[level] = parents
+        single = num_children[parents] == 1
+        compressed_parent[level[single]] = compressed_parent[parents[single]]
+    compressed_depth = zeros(n, dtype=int64)
+    for level in levels[1:]:
+        compressed_parents = compressed_parent[level]
+        compressed_depth[level] = where(compressed_parents == -1, 0,
+                                        compressed_depth[compressed_parents] + 1)
+    compact_tree.nodes = nodes
+    compact_tree.positions = positions
+    compact_tree.parent = parent
+    compact_tree.child_offsets = child_offsets
+    compact_tree.children = children
+    compact_tree.num_children = num_children
+    compact_tree.depth = depth
+    compact_tree.subtree_size = subtree_size
+    compact_tree.representatives = representatives
+    compact_tree.compressed_parent = compressed_parent
+    compact_tree.compressed_depth = compressed_depth
+    return compact_tree
@@ -0,0 +1,237 @@
+from math import inf
+from numpy import frombuffer
+from numpy import packbits
+from numpy import uint32
+from numpy import unique
+
+
+SHORT_PATTERN_LENGTH = 256
+
+
+def get_common_prefix_length(s1, s2):
+    """
+        This function returns the length of the longest
+        common prefix of s1 and s2(passed as arguments).
+        The prefix is found by binary search over slice
+        comparisons, so the characters are compared in C.
+        Parameters:
+            1. s1(type = string)
+            2. s2(type = string)
+        Example:
+            >>> get_common_prefix_length('<div>child1</div>', '<div>child2</div>')
+            10
+            >>>
+    """
+    low = 0
+    high = min(len(s1), len(s2))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if s1[low:mid] == s2[low:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def get_common_suffix_length(s1, s2):
+    """
+        This function returns the length of the longest
+        common suffix of s1 and s2(passed as arguments).
+        Parameters:
+            1. s1(type = string)
+            2. s2(type = string)
+        Example:
+            >>> get_common_suffix_length('<p>ab</p>', '<p>cb</p>')
+            5
+            >>>
+    """
+    n1 = len(s1)
+    n2 = len(s2)
+    low = 0
+    high = min(n1, n2)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if s1[n1 - mid:n1 - low] == s2[n2 - mid:n2 - low]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def get_match_masks(pattern):
+    """
+        This function returns a dict whose keys are the
+        characters of pattern(passed as an argument) and
+        values are integers used as bit-vectors, such that
+        bit i of the value is set iff pattern[i] is the key.
+        Long patterns are packed with numpy, one pass per
+        distinct character, instead of growing a Python
+        integer once per character.
+        Parameters:
+            1. pattern(type = string)
+        Example:
+            >>> get_match_masks('abca')
+            {'a': 9, 'b': 2, 'c': 4}
+            >>>
+    """
+    masks = dict()
+    if len(pattern) <= SHORT_PATTERN_LENGTH:
+        bit = 1
+        for ch in pattern:
+            masks[ch] = masks.get(ch, 0) | bit
+            bit <<= 1
+        return masks
+    codes = frombuffer(pattern.encode('utf-32-le'), dtype=uint32)
+    for code in unique(codes):
+        bits = packbits(codes == code, bitorder='little')
+        masks[chr(code)] = int.from_bytes(bits.tobytes(), 'little')
+    return masks
+
+
+def get_bounded_edit_distance(s1, s2, max_distance = inf):
+    """
+        This function returns the edit distance between two strings s1 and s2
+        using the bit-parallel algorithm of Myers(as formulated by Hyyro), in
+        which one column of the dynamic programming matrix is kept as a pair of
+        bit-vectors and is advanced with a constant number of integer operations
+        per character of the other string. If the edit distance is greater than
+        max_distance(passed as an argument), the computation stops as soon as
+        this is certain and max_distance + 1 is returned instead.
+        Parameters:
+            1. s1(type = string)
+            2. s2(type = string)
+            3. max_distance(type = int or math.inf)
+        Example:
+            >>> get_bounded_edit_distance('abcdef', 'cefg')
+            4
+            >>> get_bounded_edit_distance('abcdef', 'cefg', max_distance = 2)
+            3
+            >>>
+    """
+    prefix_length = get_common_prefix_length(s1, s2)
+    if prefix_length:
+        s1 = s1[prefix_length:]
+        s2 = s2[prefix_length:]
+    suffix_length = get_common_suffix_length(s1, s2)
+    if suffix_length:
+        s1 = s1[:len(s1) - suffix_length]
+        s2 = s2[:len(s2) - suffix_length]
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+    m = len(s1)
+    n = len(s2)
+    if m - n > max_distance:
+        return max_distance + 1
+    if n == 0:
+        return m
+    peq = get_match_masks(s1)
+    mask = (1 << m) - 1
+    last_bit = 1 << (m - 1)
+    pv = mask
+    mv = 0
+    score = m
+    remaining = n
+    for ch in s2:
+        remaining -= 1
+        eq = peq.get(ch, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & last_bit:
+            score += 1
+        elif mh & last_bit:
+            score -= 1
+        if score - remaining > max_distance:
+            return max_distance + 1
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+    return score
+
+
+def get_excess(histogram1, histogram2):
+    """
+        This function returns the number of characters of
+        histogram1 that are not matched by histogram2(both passed
+        as arguments), i.e., the sum over all characters ch of
+        max(0, histogram1[ch] - histogram2[ch]).
+        Parameters:
+            1. histogram1(type = dict/collections.Counter)
+            2. histogram2(type = dict/collections.Counter)
+        Example:
+            >>> get_excess(Counter('aabc'), Counter('abd'))
+            2
+            >>>
+    """
+    excess = 0
+    for ch, count in histogram1.items():
+        diff = count - histogram2.get(ch, 0)
+        if diff > 0:
+            excess += diff
+    return excess
+
+
+def get_histogram_lower_bound(histogram1, length1, histogram2, length2):
+    """
+        This function returns a lower bound on the edit distance
+        between two strings given only their character histograms
+        and lengths(passed as arguments). Every addition, deletion
+        or replacement removes at most one unmatched character on
+        each side, so the edit distance is at least the number of
+        unmatched characters on either side, which in turn is at
+        least the difference in lengths.
+        Parameters:
+            1. histogram1(type = dict/collections.Counter)
+            2. length1(type = int)
+            3. histogram2(type = dict/collections.Counter)
+            4. length2(type = int)
+        Example:
+            >>> get_histogram_lower_bound(Counter('abcdef'), 6, Counter('cefg'), 4)
+            3
+            >>>
+    """
+    excess1 = get_excess(histogram1, histogram2)
+    excess2 = excess1 - length1 + length2
+    return max(excess1, excess2)
+
+
+def is_similar(s1, s2, min_similarity = 1.0):
+    """
+        This function checks if the similarity of s1 and s2(passed as
+        arguments), i.e., 1 - edit_distance(s1, s2) / max(len(s1), len(s2)),
+        is at least min_similarity(passed as an argument). Equal strings
+        are accepted at once and, unless min_similarity is below 1, every
+        other pair is rejected, so exact matching costs one comparison.
+        Otherwise the pairs whose lengths differ by more than the edit
+        distance allowed are rejected without being compared, and the edit
+        distance of the others is bounded by the distance allowed(see
+        get_bounded_edit_distance), so that it is only computed in full for
+        near-misses. Byte strings are decoded as UTF-8.
+        Parameters:
+            1. s1(type = string or bytes)
+            2. s2(type = string or bytes)
+            3. min_similarity(type = float)
+        Example:
+            >>> is_similar('<p>Updated 10:41</p>', '<p>Updated 10:42</p>')
+            False
+            >>> is_similar('<p>Updated 10:41</p>', '<p>Updated 10:42</p>', min_similarity = 0.9)
+            True
+            >>> is_similar('<p>a</p>', '<p>Updated 10:42</p>', min_similarity = 0.9)
+            False
+            >>>
+    """
+    if s1 == s2:
+        return True
+    if min_similarity >= 1:
+        return False
+    length = max(len(s1), len(s2))
+    max_distance = int((1 - min_similarity) * length + 1e-9)
+    if abs(len(s1) - len(s2)) > max_distance:
+        return False
+    if isinstance(s1, bytes):
+        s1 = s1.decode('utf-8')
+    if isinstance(s2, bytes):
+        s2 = s2.decode('utf-8')
+    return get_bounded_edit_distance(s1, s2, max_distance) <= max_distance
@@ -0,0 +1,205 @@
+from hashlib import blake2b
+from lxml.etree import iterwalk
+from numpy import array
+from numpy import arange
+from numpy import uint64
+
+
+SIGNATURE_BITS = 64
+MAX_HAMMING_DISTANCE = 3
+
+
+def get_tag_path_shingles(tree):
+    """
+        This function returns the set of tag paths, i.e., the
+        tags on the path from the root, of the nodes of tree
+        (passed as an argument). The tree is walked once, keeping
+        only the tags of the current path. Text, attributes and
+        comments are ignored, and so is the number of nodes having
+        the same tag path, so a list has the same shingles whatever
+        the number of its items.
+        Parameters:
+            1. tree(type = lxml.etree._ElementTree or lxml.etree._Element)
+        Example:
+            >>> sorted(get_tag_path_shingles(fromstring('<div><p>a</p><p>b</p></div>')))
+            ['div', 'div/p']
+            >>>
+    """
+    shingles = set()
+    tag_path = []
+    for event, node in iterwalk(tree, events=('start', 'end')):
+        if not isinstance(node.tag, str):
+            continue
+        if event == 'start':
+            tag_path.append(node.tag)
+            shingles.add('/'.join(tag_path))
+        else:
+            tag_path.pop()
+    return shingles
+
+
+def get_shingle_hash(shingle):
+    """
+        This function returns a 64-bit hash of shingle(passed
+        as an argument), which is the same in every process.
+        Parameters:
+            1. shingle(type = string)
+        Example:
+            >>> get_shingle_hash('div/p')
+            7524050632858181621
+            >>>
+    """
+    return int.from_bytes(blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def get_simhash(shingles):
+    """
+        This function returns the simhash of shingles(passed
+        as an argument), i.e., a 64-bit integer whose bit i is
+        set iff more than half of the shingles have a hash with
+        bit i set. Similar sets of shingles have simhashes that
+        differ in a few bits.
+        Parameters:
+            1. shingles(type = set of strings)
+        Example:
+            >>> get_simhash({'div', 'div/p', 'div/p/b'})
+            7802693198867373813
+            >>>
+    """
+    if not shingles:
+        return 0
+    hashes = array([get_shingle_hash(shingle) for shingle in shingles], dtype=uint64)
+    bits = (hashes[:, None] >> arange(SIGNATURE_BITS, dtype=uint64)) & uint64(1)
+    votes = bits.sum(axis=0)
+    simhash = 0
+    for i in range(SIGNATURE_BITS):
+        if 2 * votes[i] > len(hashes):
+            simhash |= 1 << i
+    return simhash
+
+
+def get_layout_signature(tree):
+    """
+        This function returns the layout signature of tree
+        (passed as an argument), i.e., the simhash of the tag
+        path shingles of its nodes. Pages having the same layout
+        have signatures within a small Hamming distance of each
+        other, even if some parts of the layout are repeated a
+        different number of times.
+        Parameters:
+            1. tree(type = lxml.etree._ElementTree or lxml.etree._Element)
+        Example:
+            >>> get_layout_signature(fromstring('<div><p>a</p><p>b</p></div>'))
+            4613942263800667877
+            >>>
+    """
+    return get_simhash(get_tag_path_shingles(tree))
+
+
+def get_hamming_distance(signature1, signature2):
+    """
+        This function returns the number of bits in which
+        signature1 and signature2(passed as arguments) differ.
+        Parameters:
+            1. signature1(type = int)
+            2. signature2(type = int)
+        Example:
+            >>> get_hamming_distance(0b1011, 0b0110)
+            3
+            >>>
+    """
+    return bin(signature1 ^ signature2).count('1')
+
+
+def get_root(parents, i):
+    """
+        This function returns the representative of the set
+        containing i(passed as an argument) in the disjoint-set
+        forest parents(passed as an argument), halving the path
+        from i to it.
+        Parameters:
+            1. parents(type = list)
+            2. i(type = int)
+        Example:
+            >>> get_root([0, 0, 1], 2)
+            0
+            >>>
+    """
+    while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+    return i
+
+
+def cluster_layouts(signatures, max_distance = MAX_HAMMING_DISTANCE):
+    """
+        This function clusters pages by their layout signatures
+        (passed as an argument) and returns a list of cluster
+        labels, one per signature, numbered from 0 in the order
+        in which the clusters first appear. Two pages are in the
+        same cluster if their signatures are within a Hamming
+        distance of max_distance(passed as an argument), directly
+        or through other pages. Identical signatures are merged
+        first, and the remaining ones are only compared if one of
+        their max_distance + 1 bands of bits is equal, which is the
+        case for every pair within max_distance. Within a band, a
+        signature is compared with the clusters already found among
+        the signatures sharing its bits, starting from their first
+        signature, and only with the other signatures of a cluster if
+        the first one is too far, so that many similar signatures of a
+        single layout are not compared pairwise and the running time
+        is near-linear in the number of pages.
+        Parameters:
+            1. signatures(type = list of int)
+            2. max_distance(type = int)
+        Example:
+            >>> cluster_layouts([0b1111, 0b0111, 1 << 40, 0b1111])
+            [0, 0, 1, 0]
+            >>>
+    """
+    unique_signatures = list(dict.fromkeys(signatures))
+    n = len(unique_signatures)
+    parents = list(range(n))
+    num_bands = max_distance + 1
+    band_bits = -(-SIGNATURE_BITS // num_bands)
+    band_mask = (1 << band_bits) - 1
+    for band in range(num_bands):
+        buckets = dict()
+        for i, signature in enumerate(unique_signatures):
+            buckets.setdefault((signature >> (band * band_bits)) & band_mask, []).append(i)
+        for bucket in buckets.values():
+            clusters = []
+            for i in bucket:
+                matched = []
+                unmatched = []
+                for members in clusters:
+                    if get_root(parents, members[0]) == get_root(parents, i) or \
+                       any(get_hamming_distance(unique_signatures[i], unique_signatures[j]) <= max_distance
+                           for j in members):
+                        matched.append(members)
+                    else:
+                        unmatched.append(members)
+                for members in matched:
+                    root_i = get_root(parents, i)
+                    root_j = get_root(parents, members[0])
+                    if root_i != root_j:
+                        parents[max(root_i, root_j)] = min(root_i, root_j)
+                if matched:
+                    members = max(matched, key = len)
+                    for other_members in matched:
+                        if other_members is not members:
+                            members.extend(other_members)
+                    members.append(i)
+                else:
+                    members = [i]
+                unmatched.append(members)
+                clusters = unmatched
+    indices = {signature: i for i, signature in enumerate(unique_signatures)}
+    labels = dict()
+    lst_labels = []
+    for signature in signatures:
+        root = get_root(parents, indices[signature])
+        if root not in labels:
+            labels[root] = len(labels)
+        lst_labels.append(labels[root])
+    return lst_labels
@@ -0,0 +1,366 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from json import loads
+from .auto_repair_code import Page
+from .auto_repair_code import auto_repair
+from .auto_repair_code import get_prefix_path
+from .auto_repair_api import get_page_source
+from .auto_repair_api import get_page_from_source
+from .rule_store import RuleStore
+from .rule_store import get_layout_fingerprint
+from .rule_store import get_subtree_signature
+
+
+META_KEY = 'auto_repair'
+DONT_REPAIR_META_KEY = 'dont_auto_repair'
+
+
+def get_layout_rules(old_page_source, new_page_source, prefix_paths):
+    """
+        This function is run in the pool of AutoRepairMiddleware
+        and returns the rules generated by auto_repair for the
+        subtrees present at prefix_paths(passed as an argument) in
+        the old page. The pages are built from old_page_source and
+        new_page_source(passed as arguments), as returned by
+        get_page_source, so no lxml tree is shared with the caller.
+        Parameters:
+            1. old_page_source(type = tuple)
+            2. new_page_source(type = tuple)
+            3. prefix_paths(type = list of lists)
+        Example:
+            >>> get_layout_rules(('Examples/Autorepair_Old_Page.html', None, 'html', None),
+            ...                  ('Examples/Autorepair_New_page.html', None, 'html', None), [[0, 1, 0, 0]])
+            [[([0, 0], [0, 0, 0]), ([0, 1], [0, 0, 1])]]
+            >>>
+    """
+    old_page = get_page_from_source(old_page_source)
+    new_page = get_page_from_source(new_page_source)
+    lst_rules = []
+    for prefix_path in prefix_paths:
+        extracted_old_subtree = old_page.retrieve_subtree(old_page.tree, prefix_path, cpy = False)
+        lst_rules.append(auto_repair(old_page, new_page, extracted_old_subtree)[0])
+    return lst_rules
+
+
+def get_page_fingerprint(page):
+    """
+        This function returns the layout fingerprint of page(passed
+        as an argument, see rule_store), parsing the page if it is not
+        parsed yet. AutoRepairMiddleware runs it in the thread pool of
+        the reactor, so responses are not parsed in the reactor thread.
+        Parameters:
+            1. page(type = Page Object)
+        Example:
+            >>> page = Page.from_bytes(b'<p>a</p>', 'html')
+            >>> get_page_fingerprint(page) == get_layout_fingerprint(page.tree)
+            True
+            >>>
+    """
+    return get_layout_fingerprint(page.tree)
+
+
+def get_deferred(future):
+    """
+        This function returns a Twisted Deferred fired in the
+        reactor thread with the result, or the exception, of
+        future(passed as an argument), which is a
+        concurrent.futures.Future completed in another thread or
+        process. Every call returns a new Deferred, so many
+        responses can wait on the same future.
+        Parameters:
+            1. future(type = concurrent.futures.Future)
+    """
+    from twisted.internet import reactor
+    from twisted.internet.defer import Deferred
+    deferred = Deferred()
+
+    def fire(future):
+        if future.exception() is not None:
+            deferred.errback(future.exception())
+        else:
+            deferred.callback(future.result())
+
+    future.add_done_callback(lambda future: reactor.callFromThread(fire, future))
+    return deferred
+
+
+class AutoRepairMiddleware:
+    """
+        This class is a Scrapy downloader middleware repairing the
+        subtrees extracted by a spider from an old page on every
+        response. The rules of a response are looked up by the
+        layout fingerprint of its page(see rule_store), first among
+        the rules known to the middleware, then in its rule store,
+        and are applied to it. If there are none, or they do not
+        apply, auto_repair is run in a pool of processes or threads,
+        so the reactor is not blocked by the search, and the
+        response is returned once the rules are generated. Repairs
+        of pages having the same layout fingerprint share one job of
+        the pool. Parsing a response, computing its fingerprint and
+        applying rules to it are run in the thread pool of the
+        reactor(see get_page_fingerprint and apply_rules), so the
+        reactor thread only looks rules up and keeps the state of
+        the middleware. The repaired subtrees, along with the rules and the
+        fingerprint, are stored in the meta of the request under
+        META_KEY. A downloader middleware is used because its
+        process_response can wait for the pool. It is enabled with
+        the settings:
+            DOWNLOADER_MIDDLEWARES = {'spider_auto_repair.middleware.AutoRepairMiddleware': 950}
+            AUTO_REPAIR_OLD_PAGE = path to the old page
+            AUTO_REPAIR_SUBTREE_PATHS = paths of the extracted subtrees in the old page
+            AUTO_REPAIR_RULE_STORE = path to a RuleStore database(optional)
+            AUTO_REPAIR_EXECUTOR = 'process'(default) or 'thread'
+            AUTO_REPAIR_WORKERS = number of workers of the pool(optional)
+        auto_repair is pure Python and holds the GIL, so a pool of
+        threads runs one repair at a time however many workers it
+        has, and its repairs compete with the reactor for the GIL. It
+        gives no parallelism and only suits tests or platforms where
+        processes cannot be started; a pool of processes should be
+        used otherwise.
+    """
+    old_page = None
+    old_page_source = None
+    old_fingerprint = None
+    lst_extracted_old_subtrees = None
+    prefix_paths = None
+    subtree_signatures = None
+    rule_store = None
+    executor = None
+    rules = None
+    pending = None
+    stats = None
+
+    def __init__(self, old_page, lst_extracted_old_subtrees, rule_store = None, executor = None):
+        """
+            This function creates the middleware repairing the
+            subtrees of lst_extracted_old_subtrees(passed as an
+            argument) extracted from old_page(passed as an argument),
+            which must be built from a file, a string or a byte
+            buffer(see get_page_source). Rules are saved in, and
+            looked up in, rule_store(passed as an argument) if it is
+            not None. Repairs are run by executor(passed as an
+            argument), a concurrent.futures executor, or by a new
+            pool of processes if it is None.
+            Parameters:
+                1. old_page(type = Page Object)
+                2. lst_extracted_old_subtrees(type = list of lxml.etree._Element objects)
+                3. rule_store(type = RuleStore Object)
+                4. executor(type = concurrent.futures.Executor)
+            Example:
+                >>> old_page = Page('Examples/Autorepair_Old_Page.html', 'html')
+                >>> middleware = AutoRepairMiddleware(old_page, [old_page.tree.getroot()[0][1][0][0]],
+                ...                                   executor = ThreadPoolExecutor(1))
+                >>> middleware.prefix_paths
+                [[0, 1, 0, 0]]
+                >>>
+        """
+        self.old_page = old_page
+        self.old_page_source = get_page_source(old_page)
+        if self.old_page_source is None:
+            raise ValueError('old_page must be built from a file, a string or a byte buffer')
+        self.old_fingerprint = get_layout_fingerprint(old_page.tree)
+        self.lst_extracted_old_subtrees = list(lst_extracted_old_subtrees)
+        self.prefix_paths = [get_prefix_path(subtree) for subtree in self.lst_extracted_old_subtrees]
+        self.subtree_signatures = [get_subtree_signature(subtree)
+                                   for subtree in self.lst_extracted_old_subtrees]
+        self.rule_store = rule_store
+        if executor is None:
+            executor = ProcessPoolExecutor()
+        self.executor = executor
+        self.rules = dict()
+        self.pending = dict()
+        self.stats = {'inline': 0, 'scheduled': 0, 'deduplicated': 0, 'failed': 0}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """
+            This function creates the middleware from the settings
+            of crawler(passed as an argument), see AutoRepairMiddleware.
+            AUTO_REPAIR_SUBTREE_PATHS can be a list of paths or a JSON
+            string. The middleware is closed with the spider.
+            Parameters:
+                1. crawler(type = scrapy.crawler.Crawler)
+        """
+        from scrapy import signals
+        from scrapy.exceptions import NotConfigured
+        settings = crawler.settings
+        old_page_path = settings.get('AUTO_REPAIR_OLD_PAGE')
+        prefix_paths = settings.get('AUTO_REPAIR_SUBTREE_PATHS')
+        if not old_page_path or not prefix_paths:
+            raise NotConfigured('AUTO_REPAIR_OLD_PAGE and AUTO_REPAIR_SUBTREE_PATHS must be set')
+        if isinstance(prefix_paths, str):
+            prefix_paths = loads(prefix_paths)
+        old_page = Page(old_page_path, 'html')
+        lst_extracted_old_subtrees = [old_page.retrieve_subtree(old_page.tree, prefix_path, cpy = False)
+                                      for prefix_path in prefix_paths]
+        rule_store = None
+        if settings.get('AUTO_REPAIR_RULE_STORE'):
+            rule_store = RuleStore(settings.get('AUTO_REPAIR_RULE_STORE'))
+        workers = settings.get('AUTO_REPAIR_WORKERS')
+        if workers is not None:
+            workers = int(workers)
+        if settings.get('AUTO_REPAIR_EXECUTOR', 'process') == 'thread':
+            executor = ThreadPoolExecutor(max_workers = workers)
+        else:
+            executor = ProcessPoolExecutor(max_workers = workers)
+        middleware = cls(old_page, lst_extracted_old_subtrees, rule_store = rule_store, executor = executor)
+        crawler.signals.connect(middleware.close, signal = signals.spider_closed)
+        return middleware
+
+    def get_known_rules(self, fingerprint):
+        """
+            This function returns the list of rules, one per
+            extracted subtree, known for the pages whose layout
+            fingerprint is fingerprint(passed as an argument), or None
+            if the rules of some subtree are not known. Rules found in
+            the rule store are kept by the middleware.
+            Parameters:
+                1. fingerprint(type = string)
+            Example:
+                >>> old_page = Page('Examples/Autorepair_Old_Page.html', 'html')
+                >>> middleware = AutoRepairMiddleware(old_page, [old_page.tree.getroot()[0][1][0][0]],
+                ...                                   rule_store = RuleStore(), executor = ThreadPoolExecutor(1))
+                >>> middleware.get_known_rules('new') is None
+                True
+                >>>
+        """
+        if fingerprint in self.rules:
+            return self.rules[fingerprint]
+        if self.rule_store is None:
+            return None
+        lst_rules = []
+        for subtree_signature in self.subtree_signatures:
+            rules = self.rule_store.get_rules(self.old_fingerprint, fingerprint, subtree_signature)
+            if rules is None:
+                return None
+            lst_rules.append(rules)
+        self.rules[fingerprint] = lst_rules
+        return lst_rules
+
+    def set_rules(self, fingerprint, future):
+        """
+            This function returns the list of rules generated by
+            future(passed as an argument), a job of the pool that is
+            done, for the pages whose layout fingerprint is
+            fingerprint(passed as an argument), and raises its exception
+            if it failed. The first call for a job ends it: the rules
+            are kept by the middleware and saved in its rule store,
+            and the next pages having that fingerprint start a new job
+            only if the rules do not apply to them.
+            Parameters:
+                1. fingerprint(type = string)
+                2. future(type = concurrent.futures.Future)
+        """
+        if self.pending.get(fingerprint) is future:
+            del self.pending[fingerprint]
+            if future.exception() is not None:
+                self.stats['failed'] += 1
+            else:
+                self.rules[fingerprint] = future.result()
+                if self.rule_store is not None:
+                    for subtree_signature, rules in zip(self.subtree_signatures, future.result()):
+                        self.rule_store.put_rules(self.old_fingerprint, fingerprint,
+                                                  subtree_signature, rules)
+        return future.result()
+
+    def apply_rules(self, page, lst_rules):
+        """
+            This function returns the list of subtrees repaired
+            with lst_rules(passed as an argument), one list of rules
+            per extracted subtree, from page(passed as an argument),
+            or None if some rule does not apply to page. It only reads
+            the old page and the state of the middleware, so it can be
+            run in another thread.
+            Parameters:
+                1. page(type = Page Object)
+                2. lst_rules(type = list)
+            Example:
+                >>> old_page = Page('Examples/Autorepair_Old_Page.html', 'html')
+                >>> middleware = AutoRepairMiddleware(old_page, [old_page.tree.getroot()[0][1][0][0]],
+                ...                                   executor = ThreadPoolExecutor(1))
+                >>> middleware.apply_rules(Page.from_bytes(b'<p>a</p>', 'html'), [[([0, 0], [0, 5])]]) is None
+                True
+                >>>
+        """
+        lst_repaired_subtrees = []
+        try:
+            for extracted_old_subtree, rules in zip(self.lst_extracted_old_subtrees, lst_rules):
+                lst_repaired_subtrees.append(auto_repair(self.old_page, page, extracted_old_subtree,
+                                                         rules = rules)[1])
+        except IndexError:
+            return None
+        return lst_repaired_subtrees
+
+    def schedule_repair(self, fingerprint, page):
+        """
+            This function returns the job of the pool generating
+            the rules for the pages whose layout fingerprint is
+            fingerprint(passed as an argument, see get_page_fingerprint),
+            submitting it with the source of page(passed as an argument)
+            unless a job for that fingerprint is already pending, in
+            which case that job is returned. The job builds the pages
+            from their source itself(see get_layout_rules).
+            Parameters:
+                1. fingerprint(type = string)
+                2. page(type = Page Object)
+        """
+        if fingerprint in self.pending:
+            self.stats['deduplicated'] += 1
+            return self.pending[fingerprint]
+        future = self.executor.submit(get_layout_rules, self.old_page_source,
+                                      get_page_source(page), self.prefix_paths)
+        self.pending[fingerprint] = future
+        self.stats['scheduled'] += 1
+        return future
+
+    async def process_response(self, request, response, spider = None):
+        """
+            This function repairs the extracted subtrees from
+            response(passed as an argument), see AutoRepairMiddleware,
+            and returns response. Responses that are not successful
+            or whose request has DONT_REPAIR_META_KEY set in its meta
+            are returned as they are, and so are the responses whose
+            repair failed.
+            Parameters:
+                1. request(type = scrapy.http.Request)
+                2. response(type = scrapy.http.Response)
+                3. spider(type = scrapy.Spider)
+        """
+        if request.meta.get(DONT_REPAIR_META_KEY) or not 200 <= response.status < 300:
+            return response
+        from twisted.internet.threads import deferToThread
+        from scrapy.utils.defer import maybe_deferred_to_future
+        page = Page.from_response(response)
+        fingerprint = await maybe_deferred_to_future(deferToThread(get_page_fingerprint, page))
+        lst_rules = self.get_known_rules(fingerprint)
+        lst_repaired_subtrees = None
+        if lst_rules is not None:
+            lst_repaired_subtrees = await maybe_deferred_to_future(deferToThread(self.apply_rules,
+                                                                                 page, lst_rules))
+        if lst_repaired_subtrees is not None:
+            self.stats['inline'] += 1
+        else:
+            future = self.schedule_repair(fingerprint, page)
+            try:
+                await maybe_deferred_to_future(get_deferred(future))
+                lst_rules = self.set_rules(fingerprint, future)
+            except Exception:
+                return response
+            lst_repaired_subtrees = await maybe_deferred_to_future(deferToThread(self.apply_rules,
+                                                                                 page, lst_rules))
+            if lst_repaired_subtrees is None:
+                return response
+        request.meta[META_KEY] = {'fingerprint': fingerprint,
+                                  'rules': lst_rules,
+                                  'subtrees': lst_repaired_subtrees}
+        return response
+
+    def close(self):
+        """
+            This function shuts the pool of the middleware down,
+            without waiting for the pending jobs, and closes its rule
+            store, if any.
+        """
+        self.executor.shutdown(wait = False)
+        if self.rule_store is not None:
+            self.rule_store.close()
@@ -0,0 +1,170 @@
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock
+from .auto_repair_code import Page
+
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class PageCache:
+    max_bytes = None
+    num_bytes = None
+    pages = None
+    hits = None
+    misses = None
+    evictions = None
+    lock = None
+    def __init__(self, max_bytes = DEFAULT_MAX_BYTES):
+        """
+            This function creates an empty cache of parsed
+            pages keyed by the hash of their content. The
+            cache holds pages whose content adds up to at most
+            max_bytes(passed as an argument) bytes and evicts
+            the least recently used pages beyond that. A parsed
+            tree takes several times the size of its content,
+            so max_bytes should be set accordingly. The cache
+            can be shared by threads, as its bookkeeping is
+            guarded by a lock, but the pages it returns are
+            shared too(see get_page).
+            Parameters:
+                1. max_bytes(type = int)
+            Example:
+                >>> cache = PageCache(max_bytes = 1024 * 1024)
+                >>> cache.get_stats()
+                {'hits': 0, 'misses': 0, 'evictions': 0, 'pages': 0, 'bytes': 0}
+                >>>
+        """
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.pages = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = Lock()
+
+    def get_key(self, data, parser, encoding):
+        """
+            This function returns the key under which the page
+            with content data(passed as an argument), parsed with
+            parser = parser and decoded with encoding(passed as
+            arguments), is cached.
+            Parameters:
+                1. data(type = bytes)
+                2. parser(type = string)
+                3. encoding(type = string)
+            Example:
+                >>> cache = PageCache()
+                >>> cache.get_key(b'<p>Hello World</p>', 'html', 'utf-8')
+                ('bbd70c34dab0701cc764584515cac775109dbbe3819ac73b45ebb99a2858e3aa', 'html', 'utf-8')
+                >>>
+        """
+        return (sha256(data).hexdigest(), parser.lower(), encoding)
+
+    def get_page(self, data, parser = 'html', encoding = 'utf-8', path = None):
+        """
+            This function returns the page with content
+            data(passed as an argument), parsed with parser =
+            parser and decoded with encoding(passed as arguments).
+            If a page with the same content is cached, it is
+            returned along with its tree and indexes, which are
+            already built, otherwise a new page is built with
+            Page.from_bytes and cached. If path(passed as an
+            argument) is not None, data is the content of the file
+            at path and a new page is built as Page(path, parser),
+            so the file is read in text mode as usual, and encoding
+            is ignored. Pages returned by the cache are shared by
+            every caller, so they must not be mutated: their trees
+            must not be modified, and a cached page must not be
+            repaired by two threads at once, since auto_repair keeps
+            its search state(such as tree_indexes and curr_path)
+            on the page.
+            Parameters:
+                1. data(type = bytes)
+                2. parser(type = string)
+                3. encoding(type = string)
+                4. path(type = string)
+            Example:
+                >>> cache = PageCache()
+                >>> page = cache.get_page(b'<p>Hello World</p>')
+                >>> cache.get_page(b'<p>Hello World</p>') is page
+                True
+                >>> cache.hits, cache.misses
+                (1, 1)
+                >>>
+        """
+        if path is None:
+            key = self.get_key(data, parser, encoding)
+        else:
+            key = self.get_key(data, parser, None) + (path,)
+        with self.lock:
+            if key in self.pages:
+                self.hits += 1
+                self.pages.move_to_end(key)
+                return self.pages[key][0]
+            self.misses += 1
+            if path is None:
+                page = Page.from_bytes(data, parser, encoding)
+            else:
+                page = Page(path, parser)
+            if len(data) <= self.max_bytes:
+                self.pages[key] = (page, len(data))
+                self.num_bytes += len(data)
+                self.evict()
+            return page
+
+    def evict(self):
+        """
+            This function evicts the least recently used pages
+            until the content of the cached pages adds up to at
+            most max_bytes bytes. It is called by get_page with
+            the lock held.
+            Example:
+                >>> cache = PageCache(max_bytes = 40)
+                >>> page = cache.get_page(b'<p>Hello World</p>')
+                >>> page = cache.get_page(b'<p>Hello World!</p>')
+                >>> page = cache.get_page(b'<p>Hello World!!</p>')
+                >>> cache.evictions
+                1
+                >>>
+        """
+        while self.num_bytes > self.max_bytes:
+            self.num_bytes -= self.pages.popitem(last=False)[1][1]
+            self.evictions += 1
+
+    def clear(self):
+        """
+            This function removes all the pages from the cache.
+            The counters are not reset.
+            Example:
+                >>> cache = PageCache()
+                >>> page = cache.get_page(b'<p>Hello World</p>')
+                >>> cache.clear()
+                >>> cache.get_stats()
+                {'hits': 0, 'misses': 1, 'evictions': 0, 'pages': 0, 'bytes': 0}
+                >>>
+        """
+        with self.lock:
+            self.pages.clear()
+            self.num_bytes = 0
+
+    def get_stats(self):
+        """
+            This function returns the number of hits, misses
+            and evictions of the cache, along with the number
+            of cached pages and the size of their content.
+            Example:
+                >>> cache = PageCache()
+                >>> page = cache.get_page(b'<p>Hello World</p>')
+                >>> cache.get_stats()
+                {'hits': 0, 'misses': 1, 'evictions': 0, 'pages': 1, 'bytes': 18}
+                >>>
+        """
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'pages': len(self.pages),
+                'bytes': self.num_bytes}
+
+
+PAGE_CACHE = PageCache()
@@ -0,0 +1,332 @@
+from re import compile as compile_regex
+from lxml.etree import XPath
+from lxml.etree import Comment
+from lxml.etree import ProcessingInstruction
+from .auto_repair_code import assign_subtrees
+
+
+STABLE_ATTRIBUTES = ('id',)
+NAME = compile_regex(r'^[A-Za-z_][A-Za-z0-9_.\-]*$')
+
+
+def get_xpath_literal(value):
+    """
+        This function returns value(passed as an argument) as an
+        XPath string literal. XPath 1.0 has no escape sequences, so
+        a value holding both kinds of quotes is built with concat.
+        Parameters:
+            1. value(type = string)
+        Example:
+            >>> get_xpath_literal('main'), get_xpath_literal("it's")
+            ("'main'", '"it\\'s"')
+            >>> get_xpath_literal('it\\'s "x"')
+            'concat(\\'it\\', "\\'", \\'s "x"\\')'
+            >>>
+    """
+    if "'" not in value:
+        return "'" + value + "'"
+    if '"' not in value:
+        return '"' + value + '"'
+    return "concat('" + value.replace("'", "', \"'\", '") + "')"
+
+
+def get_node_test(node):
+    """
+        This function returns the XPath node test selecting the
+        nodes of the same kind as node(passed as an argument), i.e.,
+        its tag for an element, matched by local name and namespace
+        if the tag is namespaced or is not a plain XPath name, and
+        comment() or processing-instruction() for the other nodes
+        that are children in lxml. A ValueError is raised for the
+        nodes XPath cannot select, such as entities.
+        Parameters:
+            1. node(type = lxml.etree._Element)
+        Example:
+            >>> tree = fromstring('<div><p>a</p><!--b--><svg xmlns="http://www.w3.org/2000/svg"/></div>')
+            >>> [get_node_test(node) for node in tree]
+            ['p', 'comment()', "*[local-name()='svg' and namespace-uri()='http://www.w3.org/2000/svg']"]
+            >>>
+    """
+    tag = node.tag
+    if isinstance(tag, str):
+        if tag.startswith('{'):
+            namespace, local_name = tag[1:].split('}', 1)
+            return '*[local-name()=%s and namespace-uri()=%s]' % (get_xpath_literal(local_name),
+                                                                  get_xpath_literal(namespace))
+        if NAME.match(tag) is None:
+            return '*[name()=%s]' % get_xpath_literal(tag)
+        return tag
+    if tag is Comment:
+        return 'comment()'
+    if tag is ProcessingInstruction:
+        return 'processing-instruction()'
+    raise ValueError('%r cannot be selected by an XPath expression' % node)
+
+
+class XPathCompiler:
+    """
+        This class compiles paths of child indexes in tree, as
+        found in the rules returned by auto_repair, into XPath
+        expressions selecting the same nodes. Every step is
+        hardened with the tag of the node, and its index is only
+        counted among the siblings having the same tag. If one of
+        attributes holds a value no sibling with the same tag has,
+        the step selects the node by that value instead of by
+        index, and the expression starts from the nearest node on
+        the path whose value for one of attributes is unique in the
+        whole tree, so it still holds if the page changes around
+        that node. The children and the node tests of every parent
+        and the attribute values of the tree are computed once and
+        shared by all the paths compiled. The expressions are an
+        export format for spiders that select nodes by XPath, not a
+        faster way to apply rules: lxml evaluates them more slowly
+        than Page.retrieve_subtree walks the paths, with or without
+        the attribute anchors(see benchmarks/bench_rule_compiler.py).
+    """
+    tree = None
+    attributes = None
+    children = None
+    attribute_counts = None
+
+    def __init__(self, tree, attributes = STABLE_ATTRIBUTES):
+        """
+            This function creates the compiler of the paths in
+            tree(passed as an argument), hardened with attributes
+            (passed as an argument). Passing no attributes gives
+            expressions made of tags and indexes only.
+            Parameters:
+                1. tree(type = lxml.etree._ElementTree)
+                2. attributes(type = tuple of strings)
+            Example:
+                >>> compiler = XPathCompiler(fromstring('<div><p>a</p><p>b</p></div>').getroottree())
+                >>> compiler.get_xpath([1])
+                '/div/p[2]'
+                >>>
+        """
+        self.tree = tree
+        self.attributes = tuple(attributes)
+        self.children = dict()
+
+    def get_children(self, node):
+        """
+            This function returns a tuple (children, node_tests) of
+            the children of node(passed as an argument) and of their
+            node tests(see get_node_test), computed once per node.
+            Parameters:
+                1. node(type = lxml.etree._Element)
+            Example:
+                >>> tree = fromstring('<div><p>a</p><!--b--></div>')
+                >>> XPathCompiler(tree.getroottree()).get_children(tree)[1]
+                ['p', 'comment()']
+                >>>
+        """
+        if node not in self.children:
+            children = list(node)
+            self.children[node] = (children, [get_node_test(child) for child in children])
+        return self.children[node]
+
+    def get_attribute_counts(self):
+        """
+            This function returns a dict mapping every tuple
+            (node_test, attribute, value) to the number of elements
+            of the tree having that node test and that value for one
+            of the attributes of the compiler. It is built once.
+            Example:
+                >>> compiler = XPathCompiler(fromstring('<div><p id="a"/><p id="a"/></div>').getroottree())
+                >>> compiler.get_attribute_counts()
+                {('p', 'id', 'a'): 2}
+                >>>
+        """
+        if self.attribute_counts is None:
+            self.attribute_counts = dict()
+            if self.attributes:
+                for node in self.tree.iter():
+                    if not isinstance(node.tag, str):
+                        continue
+                    for attribute in self.attributes:
+                        value = node.get(attribute)
+                        if value is not None:
+                            key = (get_node_test(node), attribute, value)
+                            self.attribute_counts[key] = self.attribute_counts.get(key, 0) + 1
+        return self.attribute_counts
+
+    def get_anchor(self, node, node_test):
+        """
+            This function returns the XPath step selecting
+            node(passed as an argument) by the first of the
+            attributes whose value is unique among the elements of
+            the tree having node_test(passed as an argument), or None
+            if there is no such attribute.
+            Parameters:
+                1. node(type = lxml.etree._Element)
+                2. node_test(type = string)
+            Example:
+                >>> tree = fromstring('<div><p id="a"/><p id="b"/><p id="b"/></div>')
+                >>> compiler = XPathCompiler(tree.getroottree())
+                >>> compiler.get_anchor(tree[0], 'p'), compiler.get_anchor(tree[1], 'p')
+                ("p[@id='a']", None)
+                >>>
+        """
+        if not isinstance(node.tag, str):
+            return None
+        attribute_counts = self.get_attribute_counts()
+        for attribute in self.attributes:
+            value = node.get(attribute)
+            if value is not None and attribute_counts[(node_test, attribute, value)] == 1:
+                return '%s[@%s=%s]' % (node_test, attribute, get_xpath_literal(value))
+        return None
+
+    def get_step(self, parent, idx):
+        """
+            This function returns the XPath step selecting the
+            child at index idx of parent(passed as arguments) among
+            the children of parent. The step is the node test of the
+            child, followed by the first of the attributes whose value
+            no sibling with the same node test has, or else by the
+            position of the child among those siblings, if it has any.
+            Parameters:
+                1. parent(type = lxml.etree._Element)
+                2. idx(type = int)
+            Example:
+                >>> tree = fromstring('<div><p>a</p><b/><p id="c">c</p><p id="c">d</p></div>')
+                >>> compiler = XPathCompiler(tree.getroottree())
+                >>> [compiler.get_step(tree, idx) for idx in range(4)]
+                ['p[1]', 'b', 'p[2]', 'p[3]']
+                >>>
+        """
+        children, node_tests = self.get_children(parent)
+        node = children[idx]
+        node_test = node_tests[idx]
+        siblings = [i for i, sibling_test in enumerate(node_tests) if sibling_test == node_test]
+        if len(siblings) == 1:
+            return node_test
+        if isinstance(node.tag, str):
+            for attribute in self.attributes:
+                value = node.get(attribute)
+                if value is not None and sum(children[i].get(attribute) == value for i in siblings) == 1:
+                    return '%s[@%s=%s]' % (node_test, attribute, get_xpath_literal(value))
+        return '%s[%d]' % (node_test, siblings.index(idx) + 1)
+
+    def get_xpath(self, path):
+        """
+            This function returns an XPath expression selecting
+            the node present at path = path(passed as an argument)
+            in the tree, and only it. The expression is absolute
+            unless a node on the path can be selected anywhere in the
+            tree by one of the attributes(see get_anchor), in which
+            case it starts from the last such node.
+            Parameters:
+                1. path(type = list/list like)
+            Example:
+                >>> tree = fromstring('<html><body><div id="main"><p>a</p><p>b</p></div><p>c</p></body></html>')
+                >>> compiler = XPathCompiler(tree.getroottree())
+                >>> compiler.get_xpath([0, 0, 1]), compiler.get_xpath([0, 1])
+                ("//div[@id='main']/p[2]", '/html/body/p')
+                >>>
+        """
+        nodes = [self.tree.getroot()]
+        for idx in path:
+            nodes.append(self.get_children(nodes[-1])[0][idx])
+        steps = []
+        for i in range(len(path), 0, -1):
+            node_test = self.get_children(nodes[i - 1])[1][path[i - 1]]
+            anchor = self.get_anchor(nodes[i], node_test)
+            if anchor is not None:
+                steps.append(anchor)
+                return '//' + '/'.join(reversed(steps))
+            steps.append(self.get_step(nodes[i - 1], path[i - 1]))
+        node_test = get_node_test(nodes[0])
+        anchor = self.get_anchor(nodes[0], node_test)
+        if anchor is not None:
+            steps.append(anchor)
+            return '//' + '/'.join(reversed(steps))
+        steps.append(node_test)
+        return '/' + '/'.join(reversed(steps))
+
+    def compile_rules(self, rules):
+        """
+            This function returns rules(passed as an argument) with
+            the path of every rule in the tree replaced by its XPath
+            expression(see get_xpath).
+            Parameters:
+                1. rules(type = list of tuples)
+            Example:
+                >>> compiler = XPathCompiler(fromstring('<div><p>a</p><p>b</p></div>').getroottree())
+                >>> compiler.compile_rules([([0], [1]), ([1], [0])])
+                [([0], '/div/p[2]'), ([1], '/div/p[1]')]
+                >>>
+        """
+        return [(rule[0], self.get_xpath(rule[1])) for rule in rules]
+
+
+def compile_rules(rules, tree, attributes = STABLE_ATTRIBUTES):
+    """
+        This function returns rules(passed as an argument), as
+        returned by auto_repair for the new page whose tree is
+        tree(passed as an argument), with the path of every rule in
+        the new page replaced by an XPath expression selecting the
+        same node(see XPathCompiler). The expressions are strings,
+        so a repaired spider can pass them to Scrapy, e.g.
+        response.xpath(xpath), or to lxml, without this package.
+        Parameters:
+            1. rules(type = list of tuples)
+            2. tree(type = lxml.etree._ElementTree)
+            3. attributes(type = tuple of strings)
+        Example:
+            >>> new_page = Page('Examples/Autorepair_New_page.html', 'html')
+            >>> compile_rules([([0, 0], [0, 0, 0]), ([0, 1], [0, 0, 1])], new_page.tree)
+            [([0, 0], '/html/body/div[1]/p[1]'), ([0, 1], '/html/body/div[1]/p[2]')]
+            >>>
+    """
+    return XPathCompiler(tree, attributes).compile_rules(rules)
+
+
+def get_xpath_rules(compiled_rules):
+    """
+        This function returns compiled_rules(passed as an argument),
+        as returned by compile_rules, with every XPath expression
+        compiled once into an lxml.etree.XPath object, to be applied
+        to many pages by apply_xpath_rules.
+        Parameters:
+            1. compiled_rules(type = list of tuples)
+        Example:
+            >>> xpath_rules = get_xpath_rules([([0], '/div/p[2]')])
+            >>> xpath_rules[0][1].path
+            '/div/p[2]'
+            >>>
+    """
+    return [(rule[0], XPath(rule[1])) for rule in compiled_rules]
+
+
+def apply_xpath_rules(xpath_rules, query_tree, tree):
+    """
+        This function is the same as Page.get_repaired_subtree,
+        except that the subtrees of tree(passed as an argument) are
+        selected by the XPath objects of xpath_rules(passed as an
+        argument), as returned by get_xpath_rules, instead of by
+        their paths. The first node selected by an expression is
+        used, and an IndexError is raised if it selects none. It is
+        meant for rules that only exist in their compiled form, or
+        to check them, and is slower than Page.get_repaired_subtree,
+        which should be used when the paths are at hand.
+        Parameters:
+            1. xpath_rules(type = list of tuples)
+            2. query_tree(type = lxml.etree._ElementTree)
+            3. tree(type = lxml.etree._ElementTree)
+        Example:
+            >>> tree = fromstring('<div><div>child1</div><div>child2</div></div>').getroottree()
+            >>> query_tree = fromstring('<div><div>child3</div><div>child4</div></div>').getroottree()
+            >>> xpath_rules = get_xpath_rules(compile_rules([([0], [1]), ([1], [0])], tree))
+            >>> tostring(apply_xpath_rules(xpath_rules, query_tree, tree))
+            b'<div><div>child2</div><div>child1</div></div>'
+            >>>
+    """
+    if len(xpath_rules) == 0:
+        return query_tree
+    subtrees = []
+    for rule in xpath_rules:
+        nodes = rule[1](tree)
+        if len(nodes) == 0:
+            raise IndexError('no node is selected by ' + rule[1].path)
+        subtrees.append(nodes[0])
+    return assign_subtrees(query_tree, [rule[0] for rule in xpath_rules], subtrees)
@@ -0,0 +1,152 @@
+from sqlite3 import connect
+from hashlib import sha256
+from json import dumps
+from json import loads
+from lxml.etree import iterwalk
+from lxml.etree import tostring
+from .auto_repair_code import get_prefix_path
+
+
+def get_layout_fingerprint(tree):
+    """
+        This function returns a fingerprint of the layout of
+        tree(passed as an argument), i.e., a hash of the tags
+        of its nodes in document order along with the points
+        where each node ends. Text and attributes are ignored,
+        so pages that differ only in their content have the same
+        fingerprint, and rules that map paths into one of them
+        are valid for all of them.
+        Parameters:
+            1. tree(type = lxml.etree._ElementTree or lxml.etree._Element)
+        Example:
+            >>> tree1 = fromstring('<div id="a"><p>Hello</p><p>World</p></div>')
+            >>> tree2 = fromstring('<div><p>Foo</p><p>Bar</p></div>')
+            >>> get_layout_fingerprint(tree1) == get_layout_fingerprint(tree2)
+            True
+            >>> get_layout_fingerprint(tree1)
+            '5be7d27316f96f9e03d9c12f5ec66780509a2b3c38cb6bc2269d06b76fe42a7c'
+            >>>
+    """
+    fingerprint = sha256()
+    for event, node in iterwalk(tree, events=('start', 'end')):
+        if not isinstance(node.tag, str):
+            continue
+        if event == 'start':
+            fingerprint.update(('<' + node.tag + '>').encode('utf-8'))
+        else:
+            fingerprint.update(b'/')
+    return fingerprint.hexdigest()
+
+
+def get_subtree_signature(extracted_old_subtree):
+    """
+        This function returns a signature of extracted_old_subtree
+        (passed as an argument), i.e., a hash of its code and of its
+        path in the tree containing it. Rules map paths relative to
+        this subtree, so they can only be reused for the same subtree.
+        Parameters:
+            1. extracted_old_subtree(type = lxml.etree._Element)
+        Example:
+            >>> tree = fromstring('<div><div>child1</div><div>child2</div></div>')
+            >>> get_subtree_signature(tree[0]) == get_subtree_signature(tree[1])
+            False
+            >>>
+    """
+    signature = sha256(str(get_prefix_path(extracted_old_subtree)).encode('utf-8'))
+    signature.update(tostring(extracted_old_subtree, with_tail=False))
+    return signature.hexdigest()
+
+
+class RuleStore:
+    path = None
+    connection = None
+    hits = None
+    misses = None
+    def __init__(self, path = ':memory:'):
+        """
+            This function opens the rule store kept in the SQLite
+            database at path(passed as an argument), creating it if
+            it does not exist. Rules are stored under the layout
+            fingerprints of the old page and the new page and the
+            signature of the extracted subtree they repair.
+            Parameters:
+                1. path(type = string)
+            Example:
+                >>> store = RuleStore('rules.sqlite3')
+                >>> store.get_rules('old', 'new', 'subtree') is None
+                True
+                >>>
+        """
+        self.path = path
+        self.connection = connect(path)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS rules ('
+                                'old_fingerprint TEXT NOT NULL, '
+                                'new_fingerprint TEXT NOT NULL, '
+                                'subtree_signature TEXT NOT NULL, '
+                                'rules TEXT NOT NULL, '
+                                'PRIMARY KEY (old_fingerprint, new_fingerprint, subtree_signature))')
+        self.connection.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get_rules(self, old_fingerprint, new_fingerprint, subtree_signature):
+        """
+            This function returns the rules stored under
+            old_fingerprint, new_fingerprint and subtree_signature
+            (passed as arguments), or None if there are none.
+            Parameters:
+                1. old_fingerprint(type = string)
+                2. new_fingerprint(type = string)
+                3. subtree_signature(type = string)
+            Example:
+                >>> store = RuleStore()
+                >>> store.put_rules('old', 'new', 'subtree', [([0, 0], [0, 0, 0])])
+                >>> store.get_rules('old', 'new', 'subtree')
+                [([0, 0], [0, 0, 0])]
+                >>>
+        """
+        row = self.connection.execute('SELECT rules FROM rules WHERE old_fingerprint = ? AND '
+                                      'new_fingerprint = ? AND subtree_signature = ?',
+                                      (old_fingerprint, new_fingerprint,
+                                       subtree_signature)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [tuple(rule) for rule in loads(row[0])]
+
+    def put_rules(self, old_fingerprint, new_fingerprint, subtree_signature, rules):
+        """
+            This function stores rules(passed as an argument) under
+            old_fingerprint, new_fingerprint and subtree_signature
+            (passed as arguments), replacing the rules stored under
+            them before, if any.
+            Parameters:
+                1. old_fingerprint(type = string)
+                2. new_fingerprint(type = string)
+                3. subtree_signature(type = string)
+                4. rules(type = list of tuples)
+            Example:
+                >>> store = RuleStore()
+                >>> store.put_rules('old', 'new', 'subtree', [([0, 0], [0, 0, 0])])
+                >>> len(store)
+                1
+                >>>
+        """
+        self.connection.execute('INSERT OR REPLACE INTO rules VALUES (?, ?, ?, ?)',
+                                (old_fingerprint, new_fingerprint, subtree_signature,
+                                 dumps(rules)))
+        self.connection.commit()
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM rules').fetchone()[0]
+
+    def close(self):
+        """
+            This function closes the database of the rule store.
+            Example:
+                >>> store = RuleStore()
+                >>> store.close()
+                >>>
+        """
+        self.connection.close()
@@ -1,14 +1,37 @@
 from ..spider_auto_repair.auto_repair_code import Page
 from ..spider_auto_repair.auto_repair_code import equal
+from ..spider_auto_repair.auto_repair_code import get_artifact_property
 from ..spider_auto_repair.auto_repair_code import get_prefix_path
 from ..spider_auto_repair.auto_repair_code import get_paths
 from ..spider_auto_repair.auto_repair_code import get_subtrees_to_be_extracted
 from ..spider_auto_repair.auto_repair_code import auto_repair
 from ..spider_auto_repair.auto_repair_api import auto_repair_lst
+from ..spider_auto_repair.auto_repair_api import auto_repair_pages
+from ..spider_auto_repair.auto_repair_api import get_page
+from ..spider_auto_repair.auto_repair_api import cluster_pages
+from ..spider_auto_repair.auto_repair_api import auto_repair_batch
+from ..spider_auto_repair.auto_repair_api import get_worker_page
+from ..spider_auto_repair.page_cache import PageCache
+from ..spider_auto_repair.compact_tree import get_compact_tree
+from ..spider_auto_repair.rule_store import RuleStore
+from ..spider_auto_repair.edit_distance import get_excess
 from lxml.etree import tostring
 from lxml.etree import fromstring
+from lxml.etree import XMLParser
+from lxml.etree import HTMLParser
 from math import inf
+from os.path import abspath
+from os.path import dirname
+from subprocess import run
+from sys import executable
 from numpy import array
+from collections import namedtuple
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pytest import raises
+
+
+Response = namedtuple('Response', ['body', 'encoding'])
 
 
 def test_get_repaired_xml():
@@ -38,6 +61,119 @@ def test_get_tree_without_attr_html():
     tree = obj.get_tree_without_attr_html(code)
     assert(tostring(tree) == b'<html><body><div> Hello World <div/></div></body></html>')
 
+def test_get_tree_without_attr():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    obj.get_repaired_html('<div id = "ID"> Hello World <div>')
+    tree = obj.get_tree_without_attr(obj.tree)
+    assert(tostring(tree) == b'<html><body><div> Hello World <div/></div></body></html>')
+    assert(tostring(obj.tree.getroot()) == b'<html><body><div id="ID"> Hello World <div/></div></body></html>')
+    obj.get_repaired_html('<div a="1"><script>if (a < b) {}</script><!-- a b --></div>')
+    tree = obj.get_tree_without_attr(obj.tree)
+    assert(tostring(tree) == b'<html><body><div><script>if (a &lt; b) {}</script><!-- a b --></div></body></html>')
+    for path in ['../spider_auto_repair/Examples/Autorepair_Old_Page.html',
+                 '../spider_auto_repair/Examples/Old_Page_Hungarian.html']:
+        obj = Page(path, 'html')
+        assert(tostring(obj.tree_without_attr) == tostring(obj.get_tree_without_attr_html(obj.code)))
+
+def test_get_artifact_property():
+    class Example:
+        artifacts = dict()
+        def build_value(self):
+            return 42
+        value = get_artifact_property('value')
+    obj = Example()
+    assert(obj.value == 42)
+    obj.value = 7
+    assert(obj.value == 7)
+
+def test_build_broken_code():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    assert(obj.artifacts == {})
+    assert(obj.build_broken_code() == '<html>\n    <body>\n        <p>Hello World</p>\n    </body>\n</html>\n')
+
+def test_build_code():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    assert(obj.build_code() == '<html><body>\n        <p>Hello World</p>\n    </body></html>')
+
+def test_build_tree():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    assert(tostring(obj.build_tree().getroot()) == b'<html><body>\n        <p>Hello World</p>\n    </body></html>')
+    assert(list(obj.artifacts) == [])
+    tree = obj.tree
+    assert(list(obj.artifacts) == ['tree'])
+    assert(obj.tree is tree)
+
+def test_build_tree_without_attr():
+    path = '../spider_auto_repair/Examples/Autorepair_Old_Page.html'
+    obj = Page(path, 'html')
+    tree = obj.build_tree_without_attr()
+    assert(tostring(tree) == tostring(obj.get_tree_without_attr_html(obj.code)))
+    assert(sorted(obj.artifacts) == ['code', 'tree', 'tree_without_attr'])
+
+def test_build_layout_signature():
+    path = '../spider_auto_repair/Examples/Autorepair_New_page.html'
+    obj = Page(path, 'html')
+    similar = Page('../spider_auto_repair/Examples/Autorepair_New_page_similar.html', 'html')
+    assert(obj.build_layout_signature() == similar.layout_signature)
+    assert(obj.layout_signature != Page('../spider_auto_repair/Examples/Old_Page_Hungarian.html', 'html').layout_signature)
+    assert(sorted(obj.artifacts) == ['layout_signature', 'tree'])
+
+def test_release_artifacts():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    tree = obj.tree
+    code = obj.code
+    index = obj.get_tree_index(obj.tree_without_attr)
+    obj.release_artifacts('tree_without_attr')
+    assert(sorted(obj.artifacts) == ['code', 'tree'])
+    assert(len(obj.tree_indexes) == 0)
+    obj.release_artifacts()
+    assert(obj.artifacts == {})
+    assert(obj.tree_indexes is None)
+    assert(obj.tree is not tree)
+    assert(obj.code == code)
+
+def test_get_parsed_tree():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    tree = obj.get_parsed_tree('<div id = "ID"> Hello World <div>', 'xml')
+    assert(tostring(tree) == b'<div id="ID"> Hello World <div/></div>')
+    tree = obj.get_parsed_tree('<div id = "ID"> Hello World <div>', 'html')
+    assert(tostring(tree.getroot()) == b'<html><body><div id="ID"> Hello World <div/></div></body></html>')
+
+def test_from_string():
+    obj = Page.from_string('<div id = "ID"> Hello World <div>', 'xml')
+    assert(tostring(obj.tree) == b'<div id="ID"> Hello World <div/></div>')
+    assert(obj.broken_code == '<div id = "ID"> Hello World <div>')
+
+def test_from_bytes():
+    obj = Page.from_bytes(b'<div id = "ID"> H\xe9llo <div>', 'xml', 'latin-1')
+    assert(tostring(obj.tree) == b'<div id="ID"> H&#233;llo <div/></div>')
+    assert(obj.broken_code == '<div id = "ID"> H\xe9llo <div>')
+    obj = Page.from_bytes('<p>H\xe9llo</p>'.encode('mac-roman'), 'html', 'mac-roman')
+    assert(tostring(obj.tree.getroot()) == b'<html><body><p>H&#233;llo</p></body></html>')
+    path = '../spider_auto_repair/Examples/Autorepair_Old_Page.html'
+    with open(path, 'rb') as file:
+        obj = Page.from_bytes(file.read(), 'html')
+    assert(tostring(obj.tree) == tostring(Page(path, 'html').tree))
+    assert(list(obj.artifacts) == ['tree'])
+
+def test_from_response():
+    obj = Page.from_response(Response('<p>H\xe9llo</p>'.encode('cp1252'), 'cp1252'))
+    assert(tostring(obj.tree.getroot()) == b'<html><body><p>H&#233;llo</p></body></html>')
+
+def test_get_parser():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    assert(isinstance(obj.get_parser('xml'), XMLParser))
+    assert(isinstance(obj.get_parser('html', 'utf-8'), HTMLParser))
+    with raises(LookupError):
+        obj.get_parser('html', 'mac-roman')
+
 def test_get_data():
     path = '../spider_auto_repair/Examples/Hello_World.html'
     obj = Page(path, 'html')
@@ -46,6 +182,8 @@ def test_get_data():
     assert(broken_code == 
     '<html>\n    <body>\n        <p>Browsers usually insert quotation marks around the q element.</p>\n        <q>Build a future where people live in harmony with nature.</q>\n    </body>\n</html>\n'
     )
+    with raises(FileNotFoundError):
+        obj.get_data('../spider_auto_repair/Examples/Missing.html')
 
 def test_remove_br():
     path = '../spider_auto_repair/Examples/Hello_World.html'
@@ -65,6 +203,8 @@ def test_get_edit_distance():
     s1 = 'abcdef'
     s2 = 'cefg'
     assert(obj.get_edit_distance(s1, s2) == 4)
+    assert(obj.get_edit_distance(s1, s2, max_distance = 2) == 3)
+    assert(obj.get_edit_distance('<div>\n  child<br/></div>', '<div>child</div>') == 0)
 
 def test_retrieve_subtree():
     path = '../spider_auto_repair/Examples/Hello_World.html'
@@ -103,6 +243,190 @@ def test_get_subtree_path():
     root_tree = fromstring('<div><div>child1</div><div>child2</div></div>')
     assert(obj.get_subtree_path(root_subtree, root_tree) == ([1], 0))
 
+def test_normalize_code():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    assert(obj.normalize_code('<div>\n  Hello <br/>World</div>') == '<div>HelloWorld</div>')
+
+def test_get_tag_pieces():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    root = fromstring('<div><div id="a">text<p>child</p></div>tail</div>')
+    assert(obj.get_tag_pieces(root[0]) == (b'<div id="a">text', b'</div>tail'))
+    root = fromstring('<div><div><p>child</p></div></div>')
+    assert(obj.get_tag_pieces(root[0]) == (b'<div>', b'</div>'))
+
+def test_build_serialization_index():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    root = fromstring('<div><p>child1</p> <p>child2</p></div>')
+    raw_pieces = []
+    spans = {}
+    obj.build_serialization_index(root, raw_pieces, spans, [0])
+    assert(b''.join(raw_pieces) == b'<div><p>child1</p> <p>child2</p></div>')
+    assert(spans[root[1]] == (19, 32))
+    assert(spans[root] == (0, 38))
+
+def test_get_code_offsets():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    assert(obj.get_code_offsets(b'<p> a<br/></p>') == [0, 1, 2, 3, 3, 4, 4, 4, 4, 4, 4, 5, 6, 7, 8])
+
+def test_has_namespaces():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    assert(obj.has_namespaces(fromstring('<a xmlns="uri"><b/></a>')) == True)
+    assert(obj.has_namespaces(obj.tree_without_attr) == False)
+
+def test_get_tree_index():
+    path = '../spider_auto_repair/Examples/Autorepair_Old_Page.html'
+    obj = Page(path, 'html')
+    for tree in [obj.tree.getroot(), obj.tree_without_attr,
+                 fromstring('<a xmlns="uri"><b>1<br/></b><!--c--><c>&#233;</c></a>')]:
+        index = obj.get_tree_index(tree)
+        for node in tree.iter():
+            assert(index.get_raw(node) == tostring(node))
+            assert(index.get_code(node) == obj.normalize_code(tostring(node).decode('utf-8')))
+    assert(obj.get_tree_index(tree) is index)
+
+def test_get_code_hash():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    assert(obj.get_code_hash('<p>ab</p>') == obj.get_code_hash('ab</p>', obj.get_code_hash('<p>')))
+    assert(obj.get_code_hash('<p>ab</p>') != obj.get_code_hash('<p>ba</p>'))
+
+def test_build_merkle_index():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    root = fromstring('<div><p>ab</p><p> ab </p></div>')
+    index = obj.get_tree_index(root)
+    index.hashes = {}
+    index.hash_paths = {}
+    root_hash = obj.build_merkle_index(root, index, [])
+    assert(root_hash == obj.get_code_hash('<div><p>ab</p><p>ab</p></div>'))
+    assert(index.hash_paths[obj.get_code_hash('<p>ab</p>')] == [[0], [1]])
+
+def test_get_merkle_index():
+    path = '../spider_auto_repair/Examples/Autorepair_Old_Page.html'
+    obj = Page(path, 'html')
+    for tree in [obj.tree_without_attr, fromstring('<a xmlns="uri"><b>1<br/></b><c>2</c></a>')]:
+        index = obj.get_merkle_index(tree)
+        for node in tree.iter():
+            code = obj.normalize_code(tostring(node).decode('utf-8'))
+            assert(index.hashes[node] == obj.get_code_hash(code))
+    assert(obj.get_merkle_index(tree) is index)
+
+def test_get_node():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    tree = fromstring('<div><div>child1</div><div><div>child2</div></div></div>')
+    assert(tostring(obj.get_node(tree, [1, 0])) == b'<div>child2</div>')
+    assert(obj.get_node(tree, []) is tree)
+
+def test_get_exact_match_path():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    tree = fromstring('<div><div>child1</div><div><div>child2</div></div><div>child2</div></div>')
+    assert(obj.get_exact_match_path(fromstring('<div> child2 </div>'), tree) == [1, 0])
+    assert(obj.get_exact_match_path(fromstring('<div>child3</div>'), tree) is None)
+
+def test_get_search_node():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    child1 = obj.get_search_node(1, 9)
+    child2 = obj.get_search_node(2, 31)
+    node = obj.get_search_node(0, 30, [child1, child2])
+    assert((node.position, node.length) == (0, 30))
+    assert(node.subtree_size == 3)
+    assert(node.subtree_max_length == 31)
+
+def test_get_excess_bounds():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    nested = fromstring('<div><p>ab</p><div><p>bbb</p>x<p>cc</p></div></div>')
+    not_nested = fromstring('<div xmlns:a="urn:a"><a:p>ab</a:p><div><p>bbb</p>x<a:p>cc</a:p></div></div>')
+    for root in [nested, not_nested]:
+        index = obj.get_search_index(root)
+        nodes = sorted(index.search_nodes, key = lambda node: index.search_nodes[node].position)
+        for query in ['<p>abc</p>', '<div>bbbbz</div>', '']:
+            histogram = Counter(query)
+            node_excess, subtree_excess = obj.get_excess_bounds(index, histogram)
+            for node in nodes:
+                position = index.search_nodes[node].position
+                assert(node_excess[position] == get_excess(histogram, Counter(index.get_code(node))))
+                max_histogram = Counter()
+                for descendant in node.iter():
+                    max_histogram |= Counter(index.get_code(descendant))
+                assert(subtree_excess[position] == get_excess(histogram, max_histogram))
+    assert(not obj.get_search_index(not_nested).nested)
+
+def test_get_search_index():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    root = fromstring('<div><div>child1</div><div><div>child2</div><div>child3</div></div></div>')
+    index = obj.get_search_index(root)
+    assert(len(index.search_nodes) == 5)
+    assert(index.get_code(root[1][0]) == '<div>child2</div>')
+    assert(index.search_nodes[root[1][0]].length == 17)
+    assert(index.search_nodes[root].subtree_size == 5)
+    assert(obj.get_search_index(root) is index)
+
+def test_get_subtree_path_pruning():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    root_subtree = fromstring('<p>Username</p>')
+    root_tree = fromstring('<div><p>Usernames</p><div><p>Password</p><p>Captcha</p></div>\
+                            <p>Username</p><div><p>Username</p></div></div>')
+    assert(obj.get_subtree_path(root_subtree, root_tree) == ([2], 0))
+    assert(obj.num_pruned_nodes == 3)
+    obj.curr_path = []
+    obj.path_to_subtree = []
+    mn = [inf]
+    obj.dfs(root_tree, mn, [tostring(root_subtree).decode('utf-8')])
+    assert((obj.path_to_subtree, mn[0]) == ([2], 0))
+
+def test_get_subtree_path_workers():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    root_tree = fromstring('<div><p>Usernames</p><div><p>Password</p><p>Captcha</p></div>\
+                            <p>Username</p><div><p>Username</p></div><p>Usernam</p></div>')
+    for query in ['<p>Username</p>', '<p>Usernamez</p>', '<p>Captcha</p>', '<div>x</div>']:
+        root_subtree = fromstring(query)
+        serial = obj.get_subtree_path(root_subtree, root_tree)
+        for workers in [2, 3]:
+            assert(obj.get_subtree_path(root_subtree, root_tree, workers = workers) == serial)
+    page = Page('../spider_auto_repair/Examples/Autorepair_Old_Page.html', 'html')
+    root_tree = page.tree_without_attr
+    for root_subtree in [root_tree[0][1], root_tree[0][1][0][0][0][2], fromstring('<p>Usrname</p>')]:
+        serial = page.get_subtree_path(root_subtree, root_tree)
+        executor = page.search_executor
+        assert(page.get_subtree_path(root_subtree, root_tree, workers = 2) == serial)
+        assert(executor is None or page.search_executor is executor)
+    page.close_search_executor()
+    obj.close_search_executor()
+
+def test_get_search_executor():
+    obj = Page('../spider_auto_repair/Examples/Hello_World.html', 'html')
+    executor = obj.get_search_executor(2)
+    assert(obj.get_search_executor(2) is executor)
+    assert(obj.get_search_executor(3) is not executor)
+    assert(obj.search_workers == 3)
+    obj.close_search_executor()
+    assert((obj.search_executor, obj.search_workers, obj.search_bound) == (None, None, None))
+
+def test_build_search_candidates():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    root = fromstring('<div><div><p>child1</p></div><div>child2</div></div>')
+    index = obj.get_search_index(root)
+    obj.curr_path = []
+    paths, candidates = [], []
+    obj.build_search_candidates(root, index, paths, candidates)
+    assert(paths == [[], [0], [0, 0], [1]])
+    assert([(candidate.position, candidate.end) for candidate in candidates] ==
+           [(0, 4), (1, 3), (2, 3), (3, 4)])
+    assert(index.code[candidates[3].code_start:candidates[3].code_end] == '<div>child2</div>')
+
 def test_rule_dfs():
     path = '../spider_auto_repair/Examples/Hello_World.html'
     obj = Page(path, 'html')
@@ -112,6 +436,9 @@ def test_rule_dfs():
     obj.rule_gen_path = []
     obj.rule_dfs(root, tree, rules)
     assert(rules == [([1], [0])])
+    rules = []
+    obj.rule_dfs(root, tree, rules, obj.get_merkle_index(root))
+    assert(rules == [([1], [0])])
 
 def test_generate_rules():
     path = '../spider_auto_repair/Examples/Hello_World.html'
@@ -119,6 +446,26 @@ def test_generate_rules():
     tree = fromstring('<div><div>child1</div><div>child2</div></div>')
     subtree = fromstring('<div><div>child3</div><div>child1</div></div>')
     assert(obj.generate_rules(subtree, tree) == [([1], [0])])
+    for i in range(1, 4):
+        old_page = Page('../spider_auto_repair/Examples/' + str(i) + '.html', 'html')
+        query_page = Page('../spider_auto_repair/Examples/query' + str(i) + '.html', 'xml')
+        query_tree = query_page.tree_without_attr
+        tree = old_page.tree_without_attr
+        rules = old_page.generate_rules(query_tree, tree)
+        query_index = old_page.get_merkle_index(query_tree)
+        index = old_page.get_merkle_index(tree)
+        assert(rules)
+        for query_path, path in rules:
+            assert(query_index.get_code(old_page.get_node(query_tree, query_path)) ==
+                   index.get_code(old_page.get_node(tree, path)))
+
+def test_get_hash_match_path():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    tree = fromstring('<div><div>child1</div><div>child2</div></div>')
+    code = '<div>child2</div>'
+    assert(obj.get_hash_match_path(tree, obj.get_code_hash(code), code) == [1])
+    assert(obj.get_hash_match_path(tree, obj.get_code_hash(code), '<div>child3</div>') is None)
 
 def test_get_repaired_subtree():
     path = '../spider_auto_repair/Examples/Hello_World.html'
@@ -129,6 +476,21 @@ def test_get_repaired_subtree():
     repaired_subtree = obj.get_repaired_subtree(rules, query_tree, tree)
     assert(tostring(repaired_subtree) == b'<div><div>child2</div><div>child1</div></div>')
 
+def test_get_repaired_subtree_in_place():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    tree = fromstring('<div><div><p>a</p><p>b</p></div> <div>c<i>d</i></div></div>').getroottree()
+    query_tree = fromstring('<div><div>x</div> <p>y</p><p>z</p></div>').getroottree()
+    assert(obj.get_repaired_subtree([], query_tree, tree) is query_tree)
+    rules = [([0], [0]), ([0, 1], [1, 0]), ([2], [1]), ([2], [0, 0]), ([0, 0], [0, 1])]
+    expected_tree = query_tree
+    for rule in rules:
+        expected_tree = obj.assign(expected_tree, obj.retrieve_subtree(tree, rule[1]), rule[0])
+    repaired_tree = obj.get_repaired_subtree(rules, query_tree, tree)
+    assert(tostring(repaired_tree) == tostring(expected_tree) ==
+           b'<div><div><p>b</p><i>d</i></div> <p>y</p><p>a</p></div>')
+    assert(tostring(query_tree) == b'<div><div>x</div> <p>y</p><p>z</p></div>')
+
 def test_compress_tree():
     path = '../spider_auto_repair/Examples/Hello_World.html'
     obj = Page(path, 'html')
@@ -149,6 +511,47 @@ def test_get_compressed_tree():
     compressed_tree, dic = obj.get_compressed_tree(tree)
     assert(tostring(compressed_tree) == b'<div><div>child1</div><div>child2</div></div>')
 
+def test_get_compressed_tree_index():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    tree = fromstring('<div>a<div>b<div><p>c</p><p>d</p></div>e</div>f<div><div>child1</div>g</div>h</div>')
+    compressed_tree, dic = obj.get_compressed_tree(tree)
+    index = obj.get_compressed_tree_index(tree)
+    assert(index.get_raw(index.root) == tostring(compressed_tree))
+    for node in tree.iter():
+        if len(node) != 1:
+            assert(index.get_raw(node) == tostring(dic[node]))
+    assert(index.get_child(index.root, 0) is tree[0][0])
+    assert(obj.get_node(tree, [1], compressed = True) is tree[1][0])
+    assert(obj.get_compressed_tree_index(tree) is index)
+    assert(obj.get_tree_index(tree) is not index)
+    tree = fromstring('<div><div><p>c</p><p>d</p></div></div>')
+    index = obj.get_compressed_tree_index(tree)
+    assert(index.root is tree[0])
+    assert(index.get_raw(index.root) == tostring(obj.get_compressed_tree(tree)[0]))
+
+def test_get_k_nearest_leaves_compressed():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    tree = fromstring('<div><div><div>child1</div></div><div><div><div>child2</div><div>child3</div></div></div></div>')
+    subtree = tree[1][0][0]
+    k_nearest_leaves = obj.get_k_nearest_leaves(subtree, 2, compressed = True)
+    assert([(tostring(leaf), distance) for leaf, distance in k_nearest_leaves] ==
+           [(b'<div>child3</div>', 2), (b'<div>child1</div>', 3)])
+
+def test_auto_repair_compresses_once():
+    old_page_path = '../spider_auto_repair/Examples/Autorepair_Old_Page.html'
+    new_page_path = '../spider_auto_repair/Examples/Autorepair_New_page.html'
+    old_page = Page(old_page_path, 'html')
+    new_page = Page(new_page_path, 'html')
+    root = old_page.tree.getroot()
+    auto_repair(old_page, new_page, root[0][1][0][0])
+    indexes = dict(old_page.compressed_tree_indexes)
+    assert(list(indexes) == [root, new_page.tree.getroot()])
+    for extracted_old_subtree in [root[0][0], root[0][1]]:
+        auto_repair(old_page, new_page, extracted_old_subtree)
+    assert(all(old_page.compressed_tree_indexes[tree] is index for tree, index in indexes.items()))
+
 def test_get_k_nearest_leaves():
     path = '../spider_auto_repair/Examples/Hello_World.html'
     obj = Page(path, 'html')
@@ -189,6 +592,17 @@ def test_get_all_occurences():
     assert(lst_occurences[0][1] == [1, 0])
     assert(len(lst_occurences) == 1)
 
+def test_get_k_nearest_leaves_for_all_subtrees_compact_tree():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    tree = fromstring('<div><div><div>child1</div></div><div><div><div>child2</div><div>child3</div></div></div></div>')
+    lst_occurences = [tree[0][0], tree[1][0][0], tree[1][0][1]]
+    compact_tree = get_compact_tree(tree)
+    for compressed in [False, True]:
+        for k in [1, 2, 3]:
+            assert(obj.get_k_nearest_leaves_for_all_subtrees(lst_occurences, k, compressed, compact_tree) ==
+                   obj.get_k_nearest_leaves_for_all_subtrees(lst_occurences, k, compressed))
+
 def test_get_k_nearest_leaves_for_all_subtrees():
     path = '../spider_auto_repair/Examples/Hello_World.html'
     obj = Page(path, 'html')
@@ -226,6 +640,81 @@ def test_get_cost_matrix():
     cost_matrix = obj.get_cost_matrix(data1, data1)
     assert(abs(cost_matrix[0][0] - -1) <= 10**(-9))
 
+def test_get_leaf_matrix():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    tree = fromstring('<div><div>child1</div><div><div>child2</div><div>child3</div></div><div>child1</div></div>')
+    data = [('some subtree1', [(tree[0], 2), (tree[2], 2), (tree[0], 2)]),
+            ('some subtree2', [(tree[1][1], 2)]),
+            ('some subtree3', [])]
+    leaf_ids = dict()
+    leaf_matrix = obj.get_leaf_matrix(data, leaf_ids)
+    assert(leaf_ids == {b'<div>child1</div>': 0, b'<div>child3</div>': 1})
+    assert(leaf_matrix.toarray().tolist() == [[1, 0], [0, 1], [0, 0]])
+
+def test_get_cost_matrix_shared_leaves():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    tree = fromstring('<div><p>a</p><p>b</p><p>c</p><p>a</p></div>')
+    data1 = [('some subtree1', [(tree[0], 2), (tree[1], 2)]), ('some subtree2', [(tree[2], 2)])]
+    data2 = [('some subtree3', [(tree[3], 2)]), ('some subtree4', [(tree[1], 2), (tree[2], 2)]), ('some subtree5', [])]
+    cost_matrix = obj.get_cost_matrix(data1, data2)
+    assert(cost_matrix.shape == (2, 3))
+    assert(abs(cost_matrix - array([[-2**-0.5, -0.5, 0], [0, -2**-0.5, 0]])).max() <= 10**(-9))
+
+def test_get_component():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    tree = fromstring('<div><p>a</p><p>b</p><p>c</p><p>d</p></div>')
+    data1 = [('some subtree1', [(tree[0], 2)]), ('some subtree2', [(tree[1], 2), (tree[2], 2)]),
+             ('some subtree3', [(tree[3], 2)])]
+    data2 = [('some subtree4', [(tree[2], 2)]), ('some subtree5', [(tree[0], 2)]),
+             ('some subtree6', [(tree[1], 2)])]
+    leaf_matrix1, leaf_matrix2 = obj.get_leaf_matrices(data1, data2)
+    assert(obj.get_component(leaf_matrix1, leaf_matrix2, 0) == ([0], [1]))
+    assert(obj.get_component(leaf_matrix1, leaf_matrix2, 1) == ([1], [0, 2]))
+    assert(obj.get_component(leaf_matrix1, leaf_matrix2, 2) == ([2], []))
+
+def test_get_greedy_mapping():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    tree = fromstring('<div><p>a</p><p>b</p><p>c</p></div>')
+    data1 = [('some subtree1', [(tree[0], 2), (tree[1], 2)]), ('some subtree2', [(tree[0], 2)])]
+    data2 = [('some subtree3', [(tree[0], 2)]), ('some subtree4', [(tree[0], 2), (tree[1], 2)])]
+    leaf_matrix1, leaf_matrix2 = obj.get_leaf_matrices(data1, data2)
+    assert(obj.get_greedy_mapping(leaf_matrix1, leaf_matrix2, 0) == 1)
+    assert(obj.get_greedy_mapping(leaf_matrix1, leaf_matrix2, 1) == 0)
+    leaf_matrix1, leaf_matrix2 = obj.get_leaf_matrices(data1[1:] + data1[1:], data2)
+    assert(obj.get_greedy_mapping(leaf_matrix1, leaf_matrix2, 1) == 1)
+    assert(obj.get_greedy_mapping(leaf_matrix1, leaf_matrix2, 1, max_assignment_size = 1) is None)
+
+def test_get_subtree_mapping():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    tree = fromstring('<div>' + ''.join('<p>%d</p>' % i for i in range(20)) + '</div>')
+    data1 = [('some subtree', [(tree[i], 2), (tree[i + 1], 3)]) for i in range(0, 20, 2)]
+    data2 = [('some subtree', [(tree[i], 2), (tree[i + 1], 3)]) for i in reversed(range(0, 20, 2))]
+    data2.append(('some subtree', [(tree[2], 2)]))
+    for idx in range(len(data1)):
+        assert(obj.get_subtree_mapping(data1, data2, idx) == 9 - idx)
+        assert(obj.get_subtree_mapping(data1, data2, idx, assignment = 'dense') == 9 - idx)
+        assert(obj.get_subtree_mapping(data1, data2, idx, max_assignment_size = 1) == 9 - idx)
+    data1.append(('some subtree', []))
+    assert(obj.get_subtree_mapping(data1, data2, 10) == 10)
+    assert(obj.get_subtree_mapping(data1, data2, 10, max_assignment_size = 1) == 10)
+
+def test_get_new_page_compressed_subtree_path_assignment():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    row = '<tr><td><b>Item %d</b></td><td><button>Buy</button></td></tr>'
+    old_tree = fromstring('<table>' + ''.join(row % i for i in range(30)) + '</table>')
+    row = '<div><h3><b>Item %d</b></h3><div><i>Stock</i><button>Buy</button></div></div>'
+    new_tree = fromstring('<div>' + ''.join(row % i for i in reversed(range(30))) + '</div>')
+    subtree = old_tree[12][1][0]
+    for assignment, max_assignment_size in [('dense', 1), ('sparse', 1000), ('sparse', 1)]:
+        assert(obj.get_new_page_compressed_subtree_path(subtree, old_tree, new_tree, 2, assignment,
+                                                        max_assignment_size) == [17, 1, 1])
+
 def test_get_min_cost_mapping():
     path = '../spider_auto_repair/Examples/Hello_World.html'
     obj = Page(path, 'html')
@@ -317,6 +806,68 @@ def test_get_path_in_compressed_tree():
     assert(tostring(subtree).strip() == b'<p>Username</p>')
     assert(obj.get_path_in_compressed_tree(subtree, old_page, new_page) == [2, 1, 0])
 
+def test_may_be_similar():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    tree = fromstring('<div><p>Updated 10:41</p>  <p>Updated on Monday</p></div>')
+    index = obj.get_tree_index(tree)
+    assert(obj.may_be_similar(index, tree[0], b'<p>Updated 10:41</p>'))
+    assert(not obj.may_be_similar(index, tree[0], b'<p>Updated 10:1</p>'))
+    assert(obj.may_be_similar(index, tree[0], b'<p>Updated 10:1</p>', 0.9))
+    assert(not obj.may_be_similar(index, tree[1], b'<p>Updated 10:42</p>', 0.9))
+
+def test_get_all_occurences_min_similarity():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    tree = fromstring('<ul><li><div><i>Posted 10:01</i></div></li><li><i>Posted 10:02</i></li>'
+                      '<li><i>Posted at noon</i></li><li><i>Posted 10:01</i></li></ul>')
+    subtree = fromstring('<i>Posted 10:01</i>')
+    assert([path for node, path in obj.get_all_occurences(tree, subtree)] == [[0, 0, 0], [3, 0]])
+    assert([path for node, path in obj.get_all_occurences(tree, subtree, min_similarity = 0.9)] ==
+           [[0, 0, 0], [1, 0], [3, 0]])
+    subtree = tree[0][0][0]
+    for compressed in [False, True]:
+        assert(obj.get_all_occurences(tree, subtree, compressed, min_similarity = 0.99) ==
+               obj.get_all_occurences(tree, subtree, compressed))
+    assert([path for node, path in obj.get_all_occurences(tree, subtree, True, min_similarity = 0.9)] ==
+           [[0], [1], [3]])
+
+def test_get_path_in_uncompressed_tree_min_similarity():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    obj = Page(path, 'html')
+    row = '<li><b>Item %d</b><i>Posted 10:%02d</i><p>Reply</p></li>'
+    old_page = fromstring('<html><body><ul>' + ''.join(row % (i, i) for i in range(6)) + '</ul></body></html>')
+    row = '<div><h3><b>Item %d</b></h3><span><i>Posted 10:%02d</i><p>Reply</p></span></div>'
+    new_page = fromstring('<html><body><p>Header</p>' +
+                          ''.join(row % (i, i + 1) for i in reversed(range(6))) + '</body></html>')
+    subtree = old_page[0][0][2][1]
+    assert(tostring(subtree) == b'<i>Posted 10:02</i>')
+    assert(obj.get_path_in_uncompressed_tree(subtree, old_page, new_page) == [0, 5, 1, 0])
+    assert(obj.get_path_in_uncompressed_tree(subtree, old_page, new_page, min_similarity = 0.9) == [0, 4, 1, 0])
+
+def test_auto_repair_min_similarity():
+    names = ['Apples', 'Bananas', 'Cherries', 'Dates', 'Figs', 'Grapes']
+    row = '<li><b>%s</b><i>Posted 10:%02d</i><p>Reply</p></li>'
+    old_page = Page.from_string('<html><body><ul>' + ''.join(row % (name, i) for i, name in enumerate(names)) +
+                                '</ul></body></html>', 'html')
+    row = '<div><h3><b>%s</b></h3><span><i>Posted 10:%02d</i><p>Reply</p></span></div>'
+    new_page = Page.from_string('<html><body><p>Header</p>' +
+                                ''.join(row % (name, i + 1) for i, name in reversed(list(enumerate(names)))) +
+                                '</body></html>', 'html')
+    subtree = old_page.tree.getroot()[0][0][2]
+    rules, repaired_subtree = auto_repair(old_page, new_page, subtree)
+    assert(rules == [([0], [0, 4, 0, 0]), ([1], [0, 5, 1, 0]), ([2], [0, 4, 1, 1])])
+    assert(tostring(repaired_subtree) == b'<li><b>Cherries</b><i>Posted 10:02</i><p>Reply</p></li>')
+    rules, repaired_subtree = auto_repair(old_page, new_page, subtree, min_similarity = 0.9)
+    assert(rules == [([0], [0, 4, 0, 0]), ([1], [0, 4, 1, 0]), ([2], [0, 4, 1, 1])])
+    assert(tostring(repaired_subtree) == b'<li><b>Cherries</b><i>Posted 10:03</i><p>Reply</p></li>')
+    for workers in [None, 2]:
+        lst_rules, lst_repaired_subtrees = auto_repair_pages(old_page, new_page, [subtree, subtree],
+                                                             workers = workers, min_similarity = 0.9)
+        assert(lst_rules == [rules, rules])
+        assert([tostring(repaired_subtree) for repaired_subtree in lst_repaired_subtrees] ==
+               [b'<li><b>Cherries</b><i>Posted 10:03</i><p>Reply</p></li>']*2)
+
 def test_get_path_in_uncompressed_tree_helper():
     path = '../spider_auto_repair/Examples/Hello_World.html'
     obj = Page(path, 'html')
@@ -418,6 +969,16 @@ def test_auto_repair():
             b'<div>\n                    <div>\n                        <p>Username</p>\n            <p>email</p>\n        <p>Captcha1</p>\n                        <p>Captcha2</p>\n                    </div>\n                </div>\n            '
         .strip())
 
+def test_auto_repair_with_rules():
+    old_page_path = '../spider_auto_repair/Examples/Autorepair_Old_Page.html'
+    new_page_path = '../spider_auto_repair/Examples/Autorepair_New_page_similar.html'
+    old_page = Page(old_page_path, 'html')
+    new_page = Page(new_page_path, 'html')
+    extracted_old_subtree = old_page.tree.getroot()[0][1][0][0]
+    rules = [([0, 0], [0, 0, 0]), ([0, 1], [0, 0, 1])]
+    assert(auto_repair(old_page, new_page, extracted_old_subtree, rules = rules)[0] == rules)
+    assert(list(new_page.artifacts) == ['tree'])
+
 def test_auto_repair_lst():
     old_page_path = '../spider_auto_repair/Examples/Autorepair_Old_Page.html'
     new_page_path = '../spider_auto_repair/Examples/Autorepair_New_Page.html'
@@ -430,3 +991,173 @@ def test_auto_repair_lst():
     assert(tostring(lst_repaired_subtrees[0]).strip() == 
             b'<div>\n                    <div>\n                        <p>Username</p>\n            <p>email</p>\n        <p>Captcha1</p>\n                        <p>Captcha2</p>\n                    </div>\n                </div>\n            '.strip()
     )
+
+def test_get_page():
+    path = '../spider_auto_repair/Examples/Autorepair_New_page.html'
+    page = Page(path, 'html')
+    assert(get_page(page) is page)
+    assert(tostring(get_page(b'<p>Hello World</p>').tree.getroot()) ==
+           b'<html><body><p>Hello World</p></body></html>')
+    assert(tostring(get_page(Response(b'<p>Hello World</p>', 'utf-8')).tree.getroot()) ==
+           b'<html><body><p>Hello World</p></body></html>')
+    assert(tostring(get_page(path).tree) == tostring(page.tree))
+    cache = PageCache()
+    assert(get_page(path) is not get_page(path))
+    assert(get_page(path, cache = cache) is get_page(path, cache = cache))
+    assert(get_page(path, cache = cache).path_to_data == path)
+    assert(get_page(b'<p>Hello World</p>', cache = cache) is
+           get_page(Response(b'<p>Hello World</p>', 'utf-8'), cache = cache))
+    assert(get_page(b'<p>Hello World</p>', cache = None) is not get_page(b'<p>Hello World</p>', cache = None))
+    assert((cache.hits, cache.misses) == (3, 2))
+
+def test_auto_repair_pages():
+    old_page_path = '../spider_auto_repair/Examples/Autorepair_Old_Page.html'
+    new_page_path = '../spider_auto_repair/Examples/Autorepair_New_page.html'
+    old_page = Page(old_page_path, 'html')
+    with open(new_page_path, 'rb') as file:
+        new_page = file.read()
+    lst_extracted_old_subtrees = [old_page.tree.getroot()[0][1][0][0]]
+    lst_rules, lst_repaired_subtrees = auto_repair_pages(old_page, new_page, lst_extracted_old_subtrees)
+    assert(lst_rules == [[([0, 0], [0, 0, 0]), ([0, 1], [0, 0, 1])]])
+    assert(tostring(lst_repaired_subtrees[0]).strip() ==
+            b'<div>\n                    <div>\n                        <p>Username</p>\n            <p>email</p>\n        <p>Captcha1</p>\n                        <p>Captcha2</p>\n                    </div>\n                </div>\n            '.strip()
+    )
+
+def test_auto_repair_pages_cache():
+    old_page_path = '../spider_auto_repair/Examples/Autorepair_Old_Page.html'
+    new_page_path = '../spider_auto_repair/Examples/Autorepair_New_page.html'
+    cache = PageCache()
+    lst_extracted_old_subtrees = [Page(old_page_path, 'html').tree.getroot()[0][1][0][0]]
+    results = []
+    for _ in range(3):
+        lst_rules, lst_repaired_subtrees = auto_repair_pages(old_page_path, new_page_path,
+                                                             lst_extracted_old_subtrees, cache = cache)
+        results.append((lst_rules, [tostring(subtree) for subtree in lst_repaired_subtrees]))
+    assert(results[0] == results[1] == results[2])
+    assert(results[0][0] == [[([0, 0], [0, 0, 0]), ([0, 1], [0, 0, 1])]])
+    assert(cache.get_stats()['hits'] == 4)
+    assert(cache.get_stats()['misses'] == 2)
+
+def test_auto_repair_pages_rule_store():
+    old_page_path = '../spider_auto_repair/Examples/Autorepair_Old_Page.html'
+    new_page_path = '../spider_auto_repair/Examples/Autorepair_New_page.html'
+    new_page_similar_path = '../spider_auto_repair/Examples/Autorepair_New_page_similar.html'
+    store = RuleStore()
+    lst_extracted_old_subtrees = [Page(old_page_path, 'html').tree.getroot()[0][1][0][0]]
+    lst_rules, lst_repaired_subtrees = auto_repair_pages(old_page_path, new_page_path,
+                                                         lst_extracted_old_subtrees, rule_store = store)
+    assert(lst_rules == [[([0, 0], [0, 0, 0]), ([0, 1], [0, 0, 1])]])
+    assert((store.hits, store.misses, len(store)) == (0, 1, 1))
+    new_page = Page(new_page_similar_path, 'html')
+    lst_rules, lst_repaired_subtrees = auto_repair_pages(old_page_path, new_page,
+                                                         lst_extracted_old_subtrees, rule_store = store)
+    assert(lst_rules == [[([0, 0], [0, 0, 0]), ([0, 1], [0, 0, 1])]])
+    assert((store.hits, store.misses, len(store)) == (1, 1, 1))
+    assert(b'<p>Google</p>' in tostring(lst_repaired_subtrees[0]))
+    assert(list(new_page.artifacts) == ['tree'])
+
+def test_auto_repair_lst_cache():
+    old_page_path = '../spider_auto_repair/Examples/Autorepair_Old_Page.html'
+    new_page_path = '../spider_auto_repair/Examples/Autorepair_New_page.html'
+    lst_extracted_old_subtrees = [Page(old_page_path, 'html').tree.getroot()[0][1][0][0]]
+    cache = PageCache()
+    lst_rules = auto_repair_lst(old_page_path, new_page_path, lst_extracted_old_subtrees, cache = cache)[0]
+    old_page = get_page(old_page_path, cache = cache)
+    assert(cache.get_stats()['misses'] == 2)
+    assert(auto_repair_lst(old_page_path, new_page_path, lst_extracted_old_subtrees,
+                           cache = cache)[0] == lst_rules)
+    assert(get_page(old_page_path, cache = cache) is old_page)
+    assert((cache.hits, cache.misses) == (4, 2))
+
+def test_auto_repair_pages_workers():
+    old_page_path = '../spider_auto_repair/Examples/Autorepair_Old_Page.html'
+    new_page_path = '../spider_auto_repair/Examples/Autorepair_New_page.html'
+    root = Page(old_page_path, 'html').tree.getroot()
+    lst_extracted_old_subtrees = [root[0][1][0][0], root[0][0], root[0][1],
+                                  fromstring('<div><p>Not in the old page</p></div>')]
+    serial = auto_repair_pages(old_page_path, new_page_path, lst_extracted_old_subtrees)
+    parallel = auto_repair_pages(old_page_path, new_page_path, lst_extracted_old_subtrees,
+                                 workers = 2)
+    assert(parallel[0] == serial[0])
+    assert([tostring(subtree) for subtree in parallel[1]] ==
+           [tostring(subtree) for subtree in serial[1]])
+    old_page = Page.from_bytes(open(old_page_path, 'rb').read(), 'html')
+    new_page = Page.from_string(open(new_page_path).read(), 'html')
+    store = RuleStore()
+    lst_extracted_old_subtrees = [old_page.tree.getroot()[0][1][0][0], old_page.tree.getroot()[0][0]]
+    lst_rules, lst_repaired_subtrees = auto_repair_pages(old_page, new_page, lst_extracted_old_subtrees,
+                                                         rule_store = store, workers = 2)
+    assert(lst_rules == serial[0][:2])
+    assert(len(store) == 2)
+    with ProcessPoolExecutor(2) as executor:
+        for _ in range(2):
+            parallel = auto_repair_pages(old_page_path, new_page_path, lst_extracted_old_subtrees,
+                                         workers = 2, executor = executor)
+            assert(parallel[0] == serial[0][:2])
+
+def test_get_worker_page():
+    source = ('../spider_auto_repair/Examples/Hello_World.html', None, 'html', None)
+    page = get_worker_page(source)
+    assert(get_worker_page(source) is page)
+    for i in range(4):
+        get_worker_page((None, b'<p>%d</p>' % i, 'html', 'utf-8'))
+    assert(get_worker_page(source) is not page)
+
+def test_cluster_pages():
+    paths = ['../spider_auto_repair/Examples/Autorepair_New_page.html',
+             '../spider_auto_repair/Examples/Old_Page_Hungarian.html',
+             '../spider_auto_repair/Examples/Autorepair_New_page_similar.html']
+    assert(cluster_pages(paths) == [0, 1, 0])
+    assert(cluster_pages([b'<div><p>a</p></div>', b'<div><p>b</p><p>c</p></div>', b'<table/>']) == [0, 0, 1])
+    page = Page(paths[1], 'html')
+    assert(cluster_pages([page, paths[1]], max_distance = 0) == [0, 0])
+
+def test_auto_repair_batch():
+    old_page_path = '../spider_auto_repair/Examples/Autorepair_Old_Page.html'
+    new_page_path = '../spider_auto_repair/Examples/Autorepair_New_page.html'
+    new_page_similar_path = '../spider_auto_repair/Examples/Autorepair_New_page_similar.html'
+    old_page = Page(old_page_path, 'html')
+    lst_extracted_old_subtrees = [old_page.tree.getroot()[0][1][0][0]]
+    with open(new_page_similar_path, 'rb') as file:
+        data = file.read()
+    new_pages = (data for _ in range(3))
+    stats = dict()
+    results = auto_repair_batch(old_page, [new_page_path], lst_extracted_old_subtrees, new_pages,
+                                stats = stats)
+    assert(stats == {})
+    results = list(results)
+    assert(len(results) == 3)
+    for lst_repaired_subtrees in results:
+        assert(tostring(lst_repaired_subtrees[0]).strip() ==
+               b'<div>\n                    <div>\n                        <p>Google</p>\n            <p>Microsoft</p>\n        <p>Captcha1</p>\n                        <p>Captcha2</p>\n                    </div>\n                </div>'
+        )
+    assert(stats['pages'] == 3 and stats['failed'] == 0)
+    assert(stats['pages_per_second'] == 3 / stats['seconds'])
+    mismatched_page = Page.from_bytes(b'<html><body><p>x</p></body></html>', 'html')
+    results = list(auto_repair_batch(old_page, [new_page_path], lst_extracted_old_subtrees,
+                                     [data, mismatched_page, b'<html><body><p>x</p></body></html>', data],
+                                     stats = stats))
+    assert(results[1] is None and results[2] is None)
+    assert(tostring(results[0][0]) == tostring(results[3][0]))
+    assert(b'<p>Google</p>' in tostring(results[3][0]))
+    assert(stats['pages'] == 4 and stats['failed'] == 2)
+    assert('tree' in mismatched_page.artifacts)
+    new_page = Page(new_page_similar_path, 'html')
+    reference_new_pages = ['../spider_auto_repair/Examples/Old_Page_Hungarian.html', new_page_path]
+    results = list(auto_repair_batch(old_page, reference_new_pages, lst_extracted_old_subtrees,
+                                     [new_page]))
+    assert(b'<p>Google</p>' in tostring(results[0][0]))
+    lst_extracted_old_subtrees = [old_page.tree.getroot()[0][1][0][0], old_page.tree.getroot()[0][1]]
+    serial = list(auto_repair_batch(old_page, reference_new_pages, lst_extracted_old_subtrees,
+                                    [new_page]))
+    parallel = list(auto_repair_batch(old_page, reference_new_pages, lst_extracted_old_subtrees,
+                                      [new_page], workers = 2))
+    assert([tostring(subtree) for subtree in parallel[0]] == [tostring(subtree) for subtree in serial[0]])
+    assert('tree' in new_page.artifacts)
+
+def test_import_does_not_load_scipy():
+    code = ('import sys\n'
+            'from spider_auto_repair.auto_repair_code import Page\n'
+            'from spider_auto_repair.auto_repair_api import auto_repair_batch\n'
+            'assert "scipy" not in sys.modules and "sklearn" not in sys.modules\n')
+    run([executable, '-c', code], cwd=dirname(dirname(abspath(__file__))), check=True)
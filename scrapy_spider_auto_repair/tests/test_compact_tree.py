@@ -0,0 +1,70 @@
+from ..spider_auto_repair.compact_tree import get_compact_tree
+from ..spider_auto_repair.auto_repair_code import Page
+from lxml.etree import fromstring
+
+
+def test_get_compact_tree():
+    tree = fromstring('<div>x<div><p>a</p></div><!--c--><p>b<b/></p></div>')
+    compact_tree = get_compact_tree(tree)
+    assert(compact_tree.nodes == list(tree.iter()))
+    assert(compact_tree.positions[tree[2][0]] == 5)
+    assert(compact_tree.parent.tolist() == [-1, 0, 1, 0, 0, 4])
+    assert(compact_tree.child_offsets.tolist() == [0, 3, 4, 4, 4, 5, 5])
+    assert(compact_tree.children.tolist() == [1, 3, 4, 2, 5])
+    assert(compact_tree.num_children.tolist() == [3, 1, 0, 0, 1, 0])
+    assert(compact_tree.depth.tolist() == [0, 1, 2, 1, 1, 2])
+    assert(compact_tree.subtree_size.tolist() == [6, 2, 1, 1, 2, 1])
+    assert(compact_tree.representatives.tolist() == [0, 2, 2, 3, 5, 5])
+    assert(compact_tree.compressed_parent.tolist() == [-1, 0, 0, 0, 0, 0])
+
+def test_get_compact_tree_single_child_root():
+    tree = fromstring('<div><div><p>a</p><p>b</p></div></div>')
+    compact_tree = get_compact_tree(tree)
+    assert(compact_tree.representatives.tolist() == [1, 1, 2, 3])
+    assert(compact_tree.compressed_parent.tolist() == [-1, -1, 1, 1])
+
+def test_get_children():
+    compact_tree = get_compact_tree(fromstring('<div><div><p>a</p></div><p>b</p></div>'))
+    assert(compact_tree.get_children(0) == [1, 3])
+    assert(compact_tree.get_children(0, compressed = True) == [2, 3])
+    assert(compact_tree.get_children(2) == [])
+
+def test_get_position():
+    compact_tree = get_compact_tree(fromstring('<div><div><p>a</p></div><p>b</p></div>'))
+    assert(compact_tree.get_position([]) == 0)
+    assert(compact_tree.get_position([0, 0]) == 2)
+    assert(compact_tree.get_position([0], compressed = True) == 2)
+    assert(compact_tree.get_position([1], compressed = True) == 3)
+
+def test_get_k_nearest_leaves():
+    obj = Page('../spider_auto_repair/Examples/Hello_World.html', 'html')
+    tree = fromstring('<div><div><div>child1</div></div><div><div><div>child2</div><div>child3</div></div></div></div>')
+    compact_tree = get_compact_tree(tree)
+    for subtree in [tree[1][0][0], tree[0][0], tree[1]]:
+        for k in [1, 2, 3]:
+            assert(compact_tree.get_k_nearest_leaves(compact_tree.positions[subtree], k) ==
+                   [(compact_tree.positions[leaf], distance)
+                    for leaf, distance in obj.get_k_nearest_leaves(subtree, k)])
+    subtree = tree[1][0][0]
+    assert(compact_tree.get_k_nearest_leaves(compact_tree.positions[subtree], 2, compressed = True) ==
+           [(compact_tree.positions[leaf], distance)
+            for leaf, distance in obj.get_k_nearest_leaves(subtree, 2, compressed = True)])
+
+def test_get_nearest_leaves():
+    tree = fromstring('<div><div><div>child1</div></div><div><div><div>child2</div><div>child3</div></div>'
+                      '<p>child4</p></div><div><p>child5</p><p>child6</p><p>child7</p></div></div>')
+    compact_tree = get_compact_tree(tree)
+    for compressed in [False, True]:
+        for k in [1, 2, 5]:
+            for i in range(len(compact_tree.nodes)):
+                if compressed and compact_tree.representatives[i] != i:
+                    continue
+                assert(compact_tree.get_nearest_leaves(i, k, compressed) ==
+                       compact_tree.get_k_nearest_leaves(i, k, compressed))
+
+def test_get_nearest_leaf_index():
+    compact_tree = get_compact_tree(fromstring('<div><p>a</p><div><p>b</p><p>c</p></div></div>'))
+    down, best = compact_tree.get_nearest_leaf_index(1)
+    assert(down[0] == [(1, 1)])
+    assert(best[0] == [(1, 1, 1), (2, 3, 2)])
+    assert(compact_tree.get_nearest_leaf_index(1) is compact_tree.get_nearest_leaf_index(1))
@@ -0,0 +1,91 @@
+from ..spider_auto_repair.edit_distance import get_common_prefix_length
+from ..spider_auto_repair.edit_distance import get_common_suffix_length
+from ..spider_auto_repair.edit_distance import get_match_masks
+from ..spider_auto_repair.edit_distance import get_bounded_edit_distance
+from ..spider_auto_repair.edit_distance import get_excess
+from ..spider_auto_repair.edit_distance import get_histogram_lower_bound
+from ..spider_auto_repair.edit_distance import is_similar
+from collections import Counter
+from random import Random
+
+
+def get_edit_distance_dp(s1, s2):
+    distances = range(len(s1) + 1)
+    for i2, c2 in enumerate(s2):
+        distances_ = [i2+1]
+        for i1, c1 in enumerate(s1):
+            if c1 == c2:
+                distances_.append(distances[i1])
+            else:
+                distances_.append(1 + min((distances[i1],
+                                  distances[i1 + 1], distances_[-1])))
+        distances = distances_
+    return distances[-1]
+
+def test_get_common_prefix_length():
+    assert(get_common_prefix_length('<div>child1</div>', '<div>child2</div>') == 10)
+    assert(get_common_prefix_length('abc', 'abc') == 3)
+    assert(get_common_prefix_length('', 'abc') == 0)
+
+def test_get_common_suffix_length():
+    assert(get_common_suffix_length('<p>ab</p>', '<p>cb</p>') == 5)
+    assert(get_common_suffix_length('abc', 'xyz') == 0)
+
+def test_get_match_masks():
+    assert(get_match_masks('abca') == {'a': 9, 'b': 2, 'c': 4})
+    pattern = 'ab' * 300
+    masks = get_match_masks(pattern)
+    assert(masks['a'] == int('01' * 300, 2))
+    assert(masks['b'] == int('10' * 300, 2))
+
+def test_get_bounded_edit_distance():
+    assert(get_bounded_edit_distance('abcdef', 'cefg') == 4)
+    assert(get_bounded_edit_distance('', 'cefg') == 4)
+    assert(get_bounded_edit_distance('<p>Username</p>', '<p>Username</p>') == 0)
+    rng = Random(0)
+    for _ in range(300):
+        s1 = ''.join(rng.choice('<p>ab\xe9') for _ in range(rng.randint(0, 300)))
+        s2 = ''.join(rng.choice('<p>ab\xe9') for _ in range(rng.randint(0, 300)))
+        assert(get_bounded_edit_distance(s1, s2) == get_edit_distance_dp(s1, s2))
+
+def test_get_bounded_edit_distance_max_distance():
+    assert(get_bounded_edit_distance('abcdef', 'cefg', max_distance = 4) == 4)
+    assert(get_bounded_edit_distance('abcdef', 'cefg', max_distance = 2) == 3)
+    assert(get_bounded_edit_distance('a' * 10, 'a', max_distance = 5) == 6)
+    rng = Random(1)
+    for _ in range(300):
+        s1 = ''.join(rng.choice('<p>ab') for _ in range(rng.randint(0, 200)))
+        s2 = ''.join(rng.choice('<p>ab') for _ in range(rng.randint(0, 200)))
+        distance = get_edit_distance_dp(s1, s2)
+        max_distance = rng.randint(0, distance + 2)
+        if distance <= max_distance:
+            assert(get_bounded_edit_distance(s1, s2, max_distance) == distance)
+        else:
+            assert(get_bounded_edit_distance(s1, s2, max_distance) == max_distance + 1)
+
+def test_get_excess():
+    assert(get_excess(Counter('aabc'), Counter('abd')) == 2)
+    assert(get_excess(Counter('abd'), Counter('aabc')) == 1)
+
+def test_get_histogram_lower_bound():
+    assert(get_histogram_lower_bound(Counter('abcdef'), 6, Counter('cefg'), 4) == 3)
+    rng = Random(2)
+    for _ in range(300):
+        s1 = ''.join(rng.choice('<p>ab') for _ in range(rng.randint(0, 60)))
+        s2 = ''.join(rng.choice('<p>ab') for _ in range(rng.randint(0, 60)))
+        lower_bound = get_histogram_lower_bound(Counter(s1), len(s1), Counter(s2), len(s2))
+        assert(abs(len(s1) - len(s2)) <= lower_bound <= get_edit_distance_dp(s1, s2))
+
+def test_is_similar():
+    assert(is_similar(b'<p>a</p>', b'<p>a</p>'))
+    assert(not is_similar('<p>Updated 10:41</p>', '<p>Updated 10:42</p>'))
+    assert(is_similar(b'<p>Updated 10:41</p>', b'<p>Updated 10:42</p>', min_similarity = 0.9))
+    assert(is_similar('<p>Updated 10:41</p>', '<p>Updated 9:42</p>', min_similarity = 0.85))
+    assert(not is_similar('<p>Updated 10:41</p>', '<p>Updated 9:42</p>', min_similarity = 0.86))
+    rng = Random(3)
+    for _ in range(300):
+        s1 = ''.join(rng.choice('<p>ab') for _ in range(rng.randint(0, 30)))
+        s2 = ''.join(rng.choice('<p>ab') for _ in range(rng.randint(0, 30)))
+        min_similarity = rng.choice([0.5, 0.8, 0.95, 1.0])
+        similarity = 1 - get_edit_distance_dp(s1, s2) / max(len(s1), len(s2), 1)
+        assert(is_similar(s1, s2, min_similarity) == (similarity >= min_similarity - 1e-9))
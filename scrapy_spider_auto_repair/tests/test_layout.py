@@ -0,0 +1,61 @@
+from ..spider_auto_repair.layout import get_tag_path_shingles
+from ..spider_auto_repair.layout import get_shingle_hash
+from ..spider_auto_repair.layout import get_simhash
+from ..spider_auto_repair.layout import get_layout_signature
+from ..spider_auto_repair.layout import get_hamming_distance
+from ..spider_auto_repair.layout import get_root
+from ..spider_auto_repair.layout import cluster_layouts
+from lxml.etree import fromstring
+from random import Random
+
+
+def test_get_tag_path_shingles():
+    assert(get_tag_path_shingles(fromstring('<div><p>a</p><p>b</p></div>')) == {'div', 'div/p'})
+    tree = fromstring('<div id="a"><p><b>a</b></p><!--c--><span/></div>')
+    assert(get_tag_path_shingles(tree) == {'div', 'div/p', 'div/p/b', 'div/span'})
+    assert(get_tag_path_shingles(tree.getroottree()) == get_tag_path_shingles(tree))
+
+def test_get_shingle_hash():
+    assert(get_shingle_hash('div/p') == 7524050632858181621)
+    assert(get_shingle_hash('div/p') < 1 << 64)
+
+def test_get_simhash():
+    assert(get_simhash({'div', 'div/p', 'div/p/b'}) == 7802693198867373813)
+    assert(get_simhash({'div/p'}) == get_shingle_hash('div/p'))
+    assert(get_simhash(set()) == 0)
+
+def test_get_layout_signature():
+    tree1 = fromstring('<div><p>a</p><p>b</p></div>')
+    tree2 = fromstring('<div class="x"><p>c</p></div>')
+    assert(get_layout_signature(tree1) == 4613942263800667877)
+    assert(get_layout_signature(tree1) == get_layout_signature(tree2))
+
+def test_get_hamming_distance():
+    assert(get_hamming_distance(0b1011, 0b0110) == 3)
+    assert(get_hamming_distance(1 << 63, 1 << 63) == 0)
+
+def test_get_root():
+    parents = [0, 0, 1, 2]
+    assert(get_root(parents, 3) == 0)
+    assert(parents[3] == 1)
+
+def test_cluster_layouts():
+    assert(cluster_layouts([0b1111, 0b0111, 1 << 40, 0b1111]) == [0, 0, 1, 0])
+    assert(cluster_layouts([0b1111, 0b0111, 1 << 40, 0b1111], max_distance = 0) == [0, 1, 2, 0])
+    assert(cluster_layouts([0, 0b111, 0b111111]) == [0, 0, 0])
+    assert(cluster_layouts([]) == [])
+    assert(cluster_layouts([0b1111 ^ (1 << i) ^ (1 << j) for i in range(64) for j in range(i)]) == [0]*2016)
+    rng = Random(0)
+    signatures = [rng.getrandbits(64) for _ in range(60)]
+    signatures += [signature ^ (1 << rng.randrange(64)) for signature in signatures]
+    max_distance = 3
+    labels = cluster_layouts(signatures, max_distance)
+    n = len(signatures)
+    parents = list(range(n))
+    for i in range(n):
+        for j in range(i):
+            if get_hamming_distance(signatures[i], signatures[j]) <= max_distance:
+                parents[get_root(parents, i)] = get_root(parents, j)
+    for i in range(n):
+        for j in range(n):
+            assert((labels[i] == labels[j]) == (get_root(parents, i) == get_root(parents, j)))
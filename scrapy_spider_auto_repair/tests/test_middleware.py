@@ -0,0 +1,201 @@
+from ..spider_auto_repair.auto_repair_code import Page
+from ..spider_auto_repair.auto_repair_code import auto_repair
+from ..spider_auto_repair.middleware import get_layout_rules
+from ..spider_auto_repair.middleware import get_page_fingerprint
+from ..spider_auto_repair.middleware import META_KEY
+from ..spider_auto_repair.middleware import DONT_REPAIR_META_KEY
+from ..spider_auto_repair.middleware import AutoRepairMiddleware
+from ..spider_auto_repair.rule_store import RuleStore
+from ..spider_auto_repair import middleware as middleware_module
+from ..spider_auto_repair.rule_store import get_layout_fingerprint
+from lxml.etree import tostring
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future
+from threading import Event
+from collections import namedtuple
+from types import ModuleType
+from sys import modules
+from asyncio import get_running_loop
+from asyncio import wrap_future
+from asyncio import gather
+from asyncio import sleep
+from asyncio import run
+from pytest import raises
+from pytest import fixture
+
+
+OLD_PAGE_PATH = '../spider_auto_repair/Examples/Autorepair_Old_Page.html'
+NEW_PAGE_PATH = '../spider_auto_repair/Examples/Autorepair_New_page.html'
+RULES = [([0, 0], [0, 0, 0]), ([0, 1], [0, 0, 1])]
+Request = namedtuple('Request', ['meta'])
+Response = namedtuple('Response', ['status', 'body', 'encoding'])
+
+
+def get_middleware(rule_store = None, executor = None):
+    old_page = Page(OLD_PAGE_PATH, 'html')
+    if executor is None:
+        executor = ThreadPoolExecutor(1)
+    return AutoRepairMiddleware(old_page, [old_page.tree.getroot()[0][1][0][0]],
+                                rule_store = rule_store, executor = executor)
+
+def get_new_page():
+    with open(NEW_PAGE_PATH, 'rb') as file:
+        return Page.from_bytes(file.read(), 'html')
+
+def get_response(status = 200):
+    with open(NEW_PAGE_PATH, 'rb') as file:
+        return Response(status, file.read(), 'utf-8')
+
+@fixture
+def reactor(monkeypatch):
+    # process_response is run by asyncio instead of the reactor: deferToThread
+    # runs its function in the default executor of the loop and the futures of
+    # the pool are awaited directly, so neither Twisted nor Scrapy is needed.
+    threads = ModuleType('twisted.internet.threads')
+    threads.deferToThread = lambda function, *args: get_running_loop().run_in_executor(None, function, *args)
+    defer = ModuleType('scrapy.utils.defer')
+    defer.maybe_deferred_to_future = lambda deferred: deferred
+    for name in ['twisted', 'twisted.internet', 'scrapy', 'scrapy.utils']:
+        monkeypatch.setitem(modules, name, ModuleType(name))
+    monkeypatch.setitem(modules, 'twisted.internet.threads', threads)
+    monkeypatch.setitem(modules, 'scrapy.utils.defer', defer)
+    monkeypatch.setattr(middleware_module, 'get_deferred', wrap_future)
+
+def test_get_layout_rules():
+    assert(get_layout_rules((OLD_PAGE_PATH, None, 'html', None),
+                            (NEW_PAGE_PATH, None, 'html', None), [[0, 1, 0, 0]]) == [RULES])
+
+def test_init():
+    middleware = get_middleware()
+    assert(middleware.prefix_paths == [[0, 1, 0, 0]])
+    old_page = Page.from_string('<p>a</p>', 'html')
+    extracted_old_subtree = old_page.tree.getroot()[0][0]
+    old_page.buffer = None
+    with raises(ValueError):
+        AutoRepairMiddleware(old_page, [extracted_old_subtree], executor = ThreadPoolExecutor(1))
+
+def test_get_page_fingerprint():
+    new_page = get_new_page()
+    assert(get_page_fingerprint(new_page) == get_layout_fingerprint(new_page.tree))
+    with ThreadPoolExecutor(1) as executor:
+        new_page = get_new_page()
+        assert(executor.submit(get_page_fingerprint, new_page).result() ==
+               get_layout_fingerprint(new_page.tree))
+
+def test_get_known_rules():
+    rule_store = RuleStore()
+    middleware = get_middleware(rule_store)
+    new_page = get_new_page()
+    fingerprint = get_page_fingerprint(new_page)
+    assert(middleware.get_known_rules(fingerprint) is None)
+    rule_store.put_rules(middleware.old_fingerprint, fingerprint, middleware.subtree_signatures[0], RULES)
+    assert(middleware.get_known_rules(fingerprint) == [RULES])
+    assert(middleware.rules == {fingerprint: [RULES]})
+
+def test_apply_rules():
+    middleware = get_middleware()
+    new_page = get_new_page()
+    with ThreadPoolExecutor(1) as executor:
+        lst_repaired_subtrees = executor.submit(middleware.apply_rules, new_page, [RULES]).result()
+    expected = auto_repair(middleware.old_page, new_page, middleware.lst_extracted_old_subtrees[0])[1]
+    assert(tostring(lst_repaired_subtrees[0]) == tostring(expected))
+    assert(middleware.apply_rules(new_page, [[([0, 0], [0, 9])]]) is None)
+
+def test_schedule_repair():
+    started = Event()
+    release = Event()
+    executor = ThreadPoolExecutor(1)
+    executor.submit(lambda: started.set() or release.wait())
+    rule_store = RuleStore()
+    middleware = get_middleware(rule_store, executor)
+    new_page = get_new_page()
+    fingerprint = get_page_fingerprint(new_page)
+    started.wait()
+    future = middleware.schedule_repair(fingerprint, new_page)
+    assert(middleware.schedule_repair(fingerprint, get_new_page()) is future)
+    assert(middleware.pending == {fingerprint: future})
+    release.set()
+    future.result()
+    assert(middleware.set_rules(fingerprint, future) == [RULES])
+    assert(middleware.set_rules(fingerprint, future) == [RULES])
+    assert(middleware.pending == dict())
+    assert(rule_store.get_rules(middleware.old_fingerprint, fingerprint,
+                                middleware.subtree_signatures[0]) == RULES)
+    assert(middleware.get_known_rules(fingerprint) == [RULES])
+    assert(middleware.stats == {'inline': 0, 'scheduled': 1, 'deduplicated': 1, 'failed': 0})
+    middleware.close()
+
+def test_set_rules_failed():
+    middleware = get_middleware()
+    future = Future()
+    future.set_exception(ValueError('repair failed'))
+    middleware.pending['new'] = future
+    with raises(ValueError):
+        middleware.set_rules('new', future)
+    assert(middleware.pending == dict() and middleware.rules == dict())
+    assert(middleware.stats['failed'] == 1)
+
+
+def test_process_response_known_rules(reactor):
+    rule_store = RuleStore()
+    middleware = get_middleware(rule_store)
+    new_page = get_new_page()
+    fingerprint = get_page_fingerprint(new_page)
+    rule_store.put_rules(middleware.old_fingerprint, fingerprint, middleware.subtree_signatures[0], RULES)
+    request = Request(dict())
+    response = get_response()
+    assert(run(middleware.process_response(request, response)) is response)
+    expected = auto_repair(middleware.old_page, new_page, middleware.lst_extracted_old_subtrees[0])[1]
+    assert(request.meta[META_KEY]['fingerprint'] == fingerprint)
+    assert(request.meta[META_KEY]['rules'] == [RULES])
+    assert([tostring(subtree) for subtree in request.meta[META_KEY]['subtrees']] == [tostring(expected)])
+    assert(middleware.stats == {'inline': 1, 'scheduled': 0, 'deduplicated': 0, 'failed': 0})
+    for request in [Request({DONT_REPAIR_META_KEY: True}), Request(dict())]:
+        response = get_response(404 if not request.meta else 200)
+        assert(run(middleware.process_response(request, response)) is response)
+        assert(META_KEY not in request.meta)
+    assert(middleware.stats['inline'] == 1)
+    middleware.close()
+
+def test_process_response_scheduled(reactor):
+    rule_store = RuleStore()
+    middleware = get_middleware(rule_store)
+    request = Request(dict())
+    run(middleware.process_response(request, get_response()))
+    fingerprint = get_page_fingerprint(get_new_page())
+    assert(request.meta[META_KEY]['fingerprint'] == fingerprint)
+    assert(request.meta[META_KEY]['rules'] == [RULES])
+    assert(middleware.stats == {'inline': 0, 'scheduled': 1, 'deduplicated': 0, 'failed': 0})
+    assert(middleware.pending == dict() and middleware.rules == {fingerprint: [RULES]})
+    assert(rule_store.get_rules(middleware.old_fingerprint, fingerprint,
+                                middleware.subtree_signatures[0]) == RULES)
+    request = Request(dict())
+    run(middleware.process_response(request, get_response()))
+    assert(request.meta[META_KEY]['rules'] == [RULES])
+    assert(middleware.stats == {'inline': 1, 'scheduled': 1, 'deduplicated': 0, 'failed': 0})
+    middleware.close()
+
+def test_process_response_pending(reactor):
+    started = Event()
+    release = Event()
+    middleware = get_middleware()
+    middleware.executor.submit(lambda: started.set() or release.wait())
+    requests = [Request(dict()), Request(dict())]
+
+    async def process_responses():
+        responses = gather(*[middleware.process_response(request, get_response()) for request in requests])
+        while middleware.stats['scheduled'] + middleware.stats['deduplicated'] < 2 and not responses.done():
+            await sleep(0.01)
+        assert(len(middleware.pending) == 1)
+        release.set()
+        return await responses
+
+    started.wait()
+    try:
+        run(process_responses())
+    finally:
+        release.set()
+    assert([request.meta[META_KEY]['rules'] for request in requests] == [[RULES], [RULES]])
+    assert(middleware.stats == {'inline': 0, 'scheduled': 1, 'deduplicated': 1, 'failed': 0})
+    assert(middleware.pending == dict())
+    middleware.close()
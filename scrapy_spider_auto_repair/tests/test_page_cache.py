@@ -0,0 +1,62 @@
+from ..spider_auto_repair.page_cache import PageCache
+from ..spider_auto_repair.auto_repair_code import Page
+from lxml.etree import tostring
+from concurrent.futures import ThreadPoolExecutor
+
+
+def test_get_key():
+    cache = PageCache()
+    assert(cache.get_key(b'<p>Hello World</p>', 'html', 'utf-8') ==
+           ('bbd70c34dab0701cc764584515cac775109dbbe3819ac73b45ebb99a2858e3aa', 'html', 'utf-8'))
+    assert(cache.get_key(b'<p>Hello World</p>', 'XML', None)[1:] == ('xml', None))
+
+def test_get_page():
+    cache = PageCache()
+    page = cache.get_page(b'<p>Hello World</p>')
+    assert(tostring(page.tree.getroot()) == b'<html><body><p>Hello World</p></body></html>')
+    assert(cache.get_page(b'<p>Hello World</p>') is page)
+    assert(cache.get_page(b'<p>Hello World</p>', 'xml') is not page)
+    assert(cache.get_page(b'<p>Hello World</p>', 'html', 'latin-1') is not page)
+    assert((cache.hits, cache.misses) == (1, 3))
+    cache = PageCache(max_bytes = 10)
+    page = cache.get_page(b'<p>Hello World</p>')
+    assert(cache.get_page(b'<p>Hello World</p>') is not page)
+    assert(cache.get_stats() == {'hits': 0, 'misses': 2, 'evictions': 0, 'pages': 0, 'bytes': 0})
+
+def test_evict():
+    cache = PageCache(max_bytes = 40)
+    page1 = cache.get_page(b'<p>Hello World</p>')
+    page2 = cache.get_page(b'<p>Hello World!</p>')
+    assert(cache.get_page(b'<p>Hello World</p>') is page1)
+    page3 = cache.get_page(b'<p>Hello World!!</p>')
+    assert(cache.evictions == 1)
+    assert(cache.get_page(b'<p>Hello World</p>') is page1)
+    assert(cache.get_page(b'<p>Hello World!</p>') is not page2)
+    assert(cache.get_stats() == {'hits': 2, 'misses': 4, 'evictions': 2, 'pages': 2, 'bytes': 37})
+
+def test_get_page_path():
+    path = '../spider_auto_repair/Examples/Hello_World.html'
+    cache = PageCache()
+    with open(path, 'rb') as file:
+        data = file.read()
+    page = cache.get_page(data, 'html', path = path)
+    assert((page.path_to_data, page.buffer) == (path, None))
+    assert(page.broken_code == Page(path, 'html').broken_code)
+    assert(cache.get_page(data, 'html', path = path) is page)
+    assert(cache.get_page(data, 'html') is not page)
+    with ThreadPoolExecutor(4) as executor:
+        pages = list(executor.map(lambda _: cache.get_page(data, 'xml', path = path), range(20)))
+    assert(all(other is pages[0] for other in pages))
+    assert((cache.hits, cache.misses) == (20, 3))
+
+def test_clear():
+    cache = PageCache()
+    page = cache.get_page(b'<p>Hello World</p>')
+    cache.clear()
+    assert(cache.get_stats() == {'hits': 0, 'misses': 1, 'evictions': 0, 'pages': 0, 'bytes': 0})
+    assert(cache.get_page(b'<p>Hello World</p>') is not page)
+
+def test_get_stats():
+    cache = PageCache()
+    page = cache.get_page(b'<p>Hello World</p>')
+    assert(cache.get_stats() == {'hits': 0, 'misses': 1, 'evictions': 0, 'pages': 1, 'bytes': 18})
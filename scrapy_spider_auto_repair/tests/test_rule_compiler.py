@@ -0,0 +1,107 @@
+from ..spider_auto_repair.auto_repair_code import Page
+from ..spider_auto_repair.auto_repair_code import auto_repair
+from ..spider_auto_repair.rule_compiler import get_xpath_literal
+from ..spider_auto_repair.rule_compiler import get_node_test
+from ..spider_auto_repair.rule_compiler import XPathCompiler
+from ..spider_auto_repair.rule_compiler import compile_rules
+from ..spider_auto_repair.rule_compiler import get_xpath_rules
+from ..spider_auto_repair.rule_compiler import apply_xpath_rules
+from lxml.etree import tostring
+from lxml.etree import fromstring
+from lxml.etree import Element
+from lxml.etree import SubElement
+from lxml.etree import Comment
+from lxml.etree import ElementTree
+from lxml.etree import XPath
+from random import Random
+from pytest import raises
+
+
+def get_random_tree(rng, n_nodes):
+    root = Element('div')
+    nodes = [root]
+    for i in range(n_nodes):
+        parent = rng.choice(nodes)
+        kind = rng.randrange(10)
+        if kind == 0:
+            parent.append(Comment('comment %d' % i))
+            continue
+        node = SubElement(parent, rng.choice(['div', 'p', 'span', '{urn:x}item']))
+        if kind < 4:
+            node.set('id', rng.choice(['a', 'b', "it's", 'say "x"', 'both \'x\' "y"']))
+        nodes.append(node)
+    return ElementTree(root)
+
+def get_all_paths(node, path = ()):
+    yield list(path)
+    for idx, child in enumerate(node):
+        yield from get_all_paths(child, path + (idx,))
+
+def test_get_xpath_literal():
+    for value in ['main', "it's", 'say "x"', 'both \'x\' "y"', '']:
+        assert(XPath('string(%s)' % get_xpath_literal(value))(fromstring('<div/>')) == value)
+
+def test_get_node_test():
+    tree = fromstring('<div xmlns:x="urn:x"><p>a</p><!--b--><?pi c?><x:item/></div>')
+    assert([get_node_test(node) for node in tree] ==
+           ['p', 'comment()', 'processing-instruction()',
+            "*[local-name()='item' and namespace-uri()='urn:x']"])
+
+def test_get_xpath():
+    rng = Random(0)
+    page = Page.from_string('<p>a</p>', 'html')
+    for _ in range(50):
+        tree = get_random_tree(rng, rng.randint(1, 60))
+        for attributes in [(), ('id',)]:
+            compiler = XPathCompiler(tree, attributes)
+            for path in get_all_paths(tree.getroot()):
+                node = page.retrieve_subtree(tree, path, cpy = False)
+                xpath = compiler.get_xpath(path)
+                assert(XPath(xpath)(tree) == [node])
+                if not attributes:
+                    assert(xpath.startswith('/') and '@' not in xpath)
+
+def test_get_xpath_anchor():
+    tree = fromstring('<html><body><div id="main"><p id="a">a</p><p id="a">b</p><p>c</p></div>'
+                      '<div><p id="a">d</p></div></body></html>').getroottree()
+    compiler = XPathCompiler(tree)
+    assert(compiler.get_xpath([0, 0, 1]) == "//div[@id='main']/p[2]")
+    assert(compiler.get_xpath([0, 0, 2]) == "//div[@id='main']/p[3]")
+    assert(compiler.get_xpath([0, 1, 0]) == "/html/body/div[2]/p")
+    assert(compiler.get_xpath([0, 0]) == "//div[@id='main']")
+    tree.getroot()[0].insert(0, Element('div'))
+    assert(XPath("//div[@id='main']/p[2]")(tree)[0].text == 'b')
+
+def test_compile_rules():
+    old_page = Page('../spider_auto_repair/Examples/Autorepair_Old_Page.html', 'html')
+    new_page = Page('../spider_auto_repair/Examples/Autorepair_New_page.html', 'html')
+    extracted_old_subtree = old_page.tree.getroot()[0][1][0][0]
+    rules, repaired_subtree = auto_repair(old_page, new_page, extracted_old_subtree)
+    compiled_rules = compile_rules(rules, new_page.tree)
+    assert([rule[0] for rule in compiled_rules] == [rule[0] for rule in rules])
+    for rule, compiled_rule in zip(rules, compiled_rules):
+        assert(new_page.tree.xpath(compiled_rule[1]) ==
+               [new_page.retrieve_subtree(new_page.tree, rule[1], cpy = False)])
+    xpath_rules = get_xpath_rules(compiled_rules)
+    repaired_tree = apply_xpath_rules(xpath_rules, ElementTree(extracted_old_subtree), new_page.tree)
+    assert(tostring(repaired_tree) == tostring(repaired_subtree))
+
+def test_apply_xpath_rules():
+    rng = Random(1)
+    page = Page.from_string('<p>a</p>', 'html')
+    for _ in range(30):
+        tree = get_random_tree(rng, 40)
+        query_tree = get_random_tree(rng, 40)
+        query_paths = list(get_all_paths(query_tree.getroot()))[1:]
+        paths = list(get_all_paths(tree.getroot()))
+        rules = [(rng.choice(query_paths), rng.choice(paths)) for _ in range(rng.randint(0, 5))]
+        try:
+            expected = tostring(page.get_repaired_subtree(rules, query_tree, tree))
+        except IndexError:
+            continue
+        xpath_rules = get_xpath_rules(compile_rules(rules, tree))
+        assert(tostring(apply_xpath_rules(xpath_rules, query_tree, tree)) == expected)
+    query_tree = fromstring('<div><p>a</p></div>').getroottree()
+    assert(apply_xpath_rules([], query_tree, query_tree) is query_tree)
+    with raises(IndexError):
+        apply_xpath_rules([([0], XPath('/div/span'))], query_tree, query_tree)
@@ -0,0 +1,43 @@
+from ..spider_auto_repair.rule_store import get_layout_fingerprint
+from ..spider_auto_repair.rule_store import get_subtree_signature
+from ..spider_auto_repair.rule_store import RuleStore
+from lxml.etree import fromstring
+from tempfile import TemporaryDirectory
+from os.path import join
+
+
+def test_get_layout_fingerprint():
+    tree1 = fromstring('<div id="a"><p>Hello</p><p>World</p></div>')
+    tree2 = fromstring('<div><p>Foo</p><!--comment--><p>Bar</p></div>')
+    tree3 = fromstring('<div><p>Foo<p>Bar</p></p></div>')
+    assert(get_layout_fingerprint(tree1) == get_layout_fingerprint(tree2))
+    assert(get_layout_fingerprint(tree1) != get_layout_fingerprint(tree3))
+    assert(get_layout_fingerprint(tree1) == get_layout_fingerprint(tree1.getroottree()))
+    assert(get_layout_fingerprint(tree1) ==
+           '5be7d27316f96f9e03d9c12f5ec66780509a2b3c38cb6bc2269d06b76fe42a7c')
+
+def test_get_subtree_signature():
+    tree = fromstring('<div><div>child1</div><div>child1</div></div>')
+    assert(get_subtree_signature(tree[0]) != get_subtree_signature(tree[1]))
+    tree[0].tail = 'tail'
+    assert(get_subtree_signature(tree[0]) == get_subtree_signature(fromstring('<div><div>child1</div></div>')[0]))
+
+def test_get_rules():
+    store = RuleStore()
+    assert(store.get_rules('old', 'new', 'subtree') is None)
+    store.put_rules('old', 'new', 'subtree', [([0, 0], [0, 0, 0]), ([0, 1], [0, 0, 1])])
+    assert(store.get_rules('old', 'new', 'subtree') == [([0, 0], [0, 0, 0]), ([0, 1], [0, 0, 1])])
+    assert(store.get_rules('old', 'other', 'subtree') is None)
+    assert((store.hits, store.misses) == (1, 2))
+
+def test_put_rules():
+    with TemporaryDirectory() as directory:
+        path = join(directory, 'rules.sqlite3')
+        store = RuleStore(path)
+        store.put_rules('old', 'new', 'subtree', [([0], [1])])
+        store.put_rules('old', 'new', 'subtree', [([0], [2])])
+        assert(len(store) == 1)
+        store.close()
+        store = RuleStore(path)
+        assert(store.get_rules('old', 'new', 'subtree') == [([0], [2])])
+        store.close()